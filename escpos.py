@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+LocalFirst YYC - ESC/POS printer support
+Builds raw thermal printer commands so kitchen tickets can be printed
+without rendering and rasterizing a PDF first
+"""
+
+import re
+import socket
+import socketserver
+import textwrap
+import threading
+
+ESC = b'\x1b'
+GS = b'\x1d'
+
+INIT = ESC + b'@'
+BOLD_ON = ESC + b'E\x01'
+BOLD_OFF = ESC + b'E\x00'
+ALIGN = {'left': ESC + b'a\x00', 'center': ESC + b'a\x01', 'right': ESC + b'a\x02'}
+FEED_AND_CUT = GS + b'V\x42\x00'  # Feed to the cutter, then partial cut
+
+# Character sizes (GS ! n) and how many times wider than normal each one prints
+NORMAL = 0x00
+DOUBLE_HEIGHT = 0x01
+DOUBLE_WIDTH = 0x10
+DOUBLE = DOUBLE_WIDTH | DOUBLE_HEIGHT
+
+# 80mm paper fits 48 characters per line in the default font
+COLUMNS_80MM = 48
+
+# Symbols used on receipts that thermal code pages cannot print
+_REPLACEMENTS = {
+    '⚠️': '!!',
+    '⚠': '!!',
+    '✓': '*',
+    '🍕': '',
+    '️': '',
+}
+
+# Matches the commands this module emits, for turning captured jobs back into text
+_COMMAND_RE = re.compile(rb'\x1b@|\x1b[Ea].|\x1d!.|\x1dV..', re.S)
+
+
+class EscPosBuilder:
+    """Accumulate ESC/POS commands for one print job"""
+    
+    def __init__(self, columns=COLUMNS_80MM, encoding='cp437', init=True):
+        """init=False leaves out the printer reset, for part of a job built on its own"""
+        self.columns = columns
+        self.encoding = encoding
+        self._buffer = bytearray(INIT if init else b'')
+    
+    def text(self, text, size=NORMAL, bold=False, align='left', indent=''):
+        """Print text, word-wrapped to the paper width at the given size"""
+        width = self.columns // 2 if size & DOUBLE_WIDTH else self.columns
+        lines = textwrap.wrap(self._printable(text).strip(), width,
+                              initial_indent=indent, subsequent_indent=indent) or ['']
+        
+        self._buffer += ALIGN[align] + GS + b'!' + bytes([size])
+        if bold:
+            self._buffer += BOLD_ON
+        for line in lines:
+            self._buffer += line.encode(self.encoding, 'replace') + b'\n'
+        if bold:
+            self._buffer += BOLD_OFF
+        if size != NORMAL:
+            self._buffer += GS + b'!\x00'
+        return self
+    
+    def rule(self, char='-'):
+        """Full-width dashed line"""
+        return self.text(char * self.columns)
+    
+    def feed(self, lines=1):
+        """Blank lines"""
+        self._buffer += b'\n' * lines
+        return self
+    
+    def cut(self):
+        """Feed the paper past the cutter and cut it"""
+        self._buffer += FEED_AND_CUT
+        return self
+    
+    def getvalue(self):
+        """The finished job as bytes"""
+        return bytes(self._buffer)
+    
+    def _printable(self, text):
+        """Swap out symbols the printer's code page has no glyph for"""
+        for symbol, replacement in _REPLACEMENTS.items():
+            text = text.replace(symbol, replacement)
+        return text
+
+
+def strip_commands(data, encoding='cp437'):
+    """Text content of an ESC/POS job, without the control commands"""
+    return _COMMAND_RE.sub(b'', data).decode(encoding)
+
+
+def send_to_printer(data, host, port=9100, timeout=10):
+    """Send a job to a network printer's raw port"""
+    with socket.create_connection((host, port), timeout=timeout) as conn:
+        conn.sendall(data)
+
+
+class FakePrinter:
+    """
+    Local stand-in for a network thermal printer
+    Listens on a raw print port and keeps every job it receives,
+    so tickets can be checked without real hardware. keep=False only
+    counts jobs and bytes, for load tests that send thousands.
+    """
+    
+    def __init__(self, host='127.0.0.1', port=0, keep=True):
+        self.jobs = []
+        self.job_count = 0
+        self.bytes_received = 0
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._received = threading.Condition(self._lock)
+        printer = self
+        
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                chunks = []
+                while True:
+                    chunk = self.request.recv(65536)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                job = b''.join(chunks)
+                with printer._received:
+                    if printer.keep:
+                        printer.jobs.append(job)
+                    printer.job_count += 1
+                    printer.bytes_received += len(job)
+                    printer._received.notify_all()
+        
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+    
+    @property
+    def address(self):
+        """(host, port) to send jobs to"""
+        return self._server.server_address
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def wait_for_jobs(self, count, timeout=5):
+        """Block until at least count jobs have arrived; returns the jobs (kept ones)"""
+        with self._received:
+            self._received.wait_for(lambda: self.job_count >= count, timeout)
+            return list(self.jobs)
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+LocalFirst YYC - Order Model
+Parses, normalizes and checks orders once, so receipts render from
+ready-to-print values instead of re-reading the raw order dict
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+import json
+import math
+import re
+
+try:
+    import orjson  # Several times faster than json on big batches
+except ImportError:
+    orjson = None
+
+# Largest difference between the stated total and the sum of its parts, in cents
+TOTAL_TOLERANCE_CENTS = 1
+
+
+class OrderError(ValueError):
+    """An order that is malformed or whose amounts do not add up"""
+
+
+def parse_json(data):
+    """Decode JSON text or bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)  # orjson.JSONDecodeError is a ValueError too
+    return json.loads(data)
+
+
+def to_cents(value, what='amount'):
+    """Dollar amount (number or numeric string) as integer cents"""
+    try:
+        cents = float(value) * 100
+    except (TypeError, ValueError):
+        cents = math.nan
+    # "Infinity" and "NaN" parse as floats, but are no amount of money
+    if not math.isfinite(cents):
+        raise OrderError(f"{what} is not an amount: {value!r}")
+    return round(cents)
+
+
+def format_money(cents):
+    """Integer cents as $12.34"""
+    return f"${cents / 100:.2f}"
+
+
+def safe_filename(text):
+    """Text safe to use as one path component: no separators, no '..', never empty"""
+    return re.sub(r'[^\w.-]+', '-', str(text)).strip('-.') or '_'
+
+
+def format_phone(phone):
+    """Format phone number for display"""
+    if not phone:
+        return ''
+    digits = ''.join(filter(str.isdigit, str(phone)))
+    if len(digits) == 10:
+        return f"({digits[:3]}) {digits[3:6]}-{digits[6:]}"
+    elif len(digits) == 11 and digits[0] == '1':
+        return f"+1 ({digits[1:4]}) {digits[4:7]}-{digits[7:]}"
+    return phone
+
+
+@dataclass(frozen=True, slots=True)
+class Person:
+    """Restaurant owner or driver shown on the receipt (name/story None when not given)"""
+    name: str = None
+    image: str = ''
+    story: str = None
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Person from the app's dict, or None when there is nobody to show"""
+        if not data:
+            return None
+        if not isinstance(data, dict):
+            raise OrderError(f"person is not a JSON object: {data!r}")
+        return cls(data.get('name'), data.get('image') or '', data.get('story'))
+
+
+@dataclass(frozen=True, slots=True)
+class Item:
+    """One order line; price is the unit price in cents, category the menu section ('' if none)"""
+    name: str = 'Item'
+    quantity: int = 1
+    price: int = 0
+    toppings: tuple = ()
+    instructions: str = ''
+    category: str = ''
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Item from the app's dict; malformed values raise OrderError"""
+        if not isinstance(data, dict):
+            raise OrderError(f"item is not a JSON object: {data!r}")
+        try:
+            quantity = int(data.get('quantity', 1))
+        except (TypeError, ValueError, OverflowError):
+            raise OrderError(f"item quantity is not a number: {data.get('quantity')!r}") from None
+        return cls(
+            data.get('name', 'Item'),
+            quantity,
+            to_cents(data.get('price', 0), 'item price'),
+            tuple(data.get('toppings') or ()),
+            data.get('instructions') or '',
+            data.get('category') or '',
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Order:
+    """A parsed order: amounts in cents, phone already formatted for display, created_at as a datetime"""
+    order_number: str = 'N/A'
+    customer_name: str = 'Guest'
+    customer_phone: str = ''
+    customer_address: str = 'N/A'
+    restaurant_name: str = 'Restaurant'
+    restaurant_owner: Person = None
+    driver: Person = None
+    items: tuple = ()
+    subtotal: int = 0
+    discount: int = 0
+    discount_type: str = None
+    delivery_fee: int = 0
+    tip: int = 0
+    total: int = 0
+    payment_method: str = 'card'
+    created_at: datetime = field(default_factory=datetime.now)
+    # False when the app sent no created_at and the time of parsing stands in
+    created_at_given: bool = field(default=True, repr=False, compare=False)
+    
+    @classmethod
+    def from_dict(cls, data, validate=True):
+        """
+        Build an order from the app's JSON object
+        validate=True also checks that the amounts add up (see validate()).
+        Malformed values (a price that is not a number, a bad timestamp)
+        always raise OrderError.
+        """
+        if not isinstance(data, dict):
+            raise OrderError("order is not a JSON object")
+        
+        subtotal = to_cents(data.get('subtotal', 0), 'subtotal')
+        discount = to_cents(data.get('discount', 0), 'discount')
+        delivery_fee = to_cents(data.get('delivery_fee', 0), 'delivery_fee')
+        tip = to_cents(data.get('tip', 0), 'tip')
+        total = data.get('total')
+        total = subtotal - discount + delivery_fee + tip if total is None else to_cents(total, 'total')
+        
+        created_at = data.get('created_at')
+        try:
+            created_at = datetime.fromisoformat(created_at) if created_at else datetime.now()
+        except (TypeError, ValueError):
+            raise OrderError(f"created_at is not an ISO timestamp: {created_at!r}") from None
+        
+        order = cls(
+            order_number=str(data.get('order_number', 'N/A')),
+            customer_name=data.get('customer_name', 'Guest'),
+            customer_phone=format_phone(data.get('customer_phone', '')),
+            customer_address=data.get('customer_address', 'N/A'),
+            restaurant_name=data.get('restaurant_name', 'Restaurant'),
+            restaurant_owner=Person.from_dict(data.get('restaurant_owner')),
+            driver=Person.from_dict(data.get('driver')),
+            items=tuple(Item.from_dict(item) for item in data.get('items') or ()),
+            subtotal=subtotal,
+            discount=discount,
+            discount_type=data.get('discount_type'),
+            delivery_fee=delivery_fee,
+            tip=tip,
+            total=total,
+            payment_method=data.get('payment_method', 'card'),
+            created_at=created_at,
+            created_at_given=bool(data.get('created_at')),
+        )
+        if validate:
+            order.validate()
+        return order
+    
+    @classmethod
+    def from_json(cls, text, validate=True):
+        """Order from one JSON document (str or bytes)"""
+        try:
+            data = parse_json(text)
+        except ValueError as e:
+            raise OrderError(f"invalid JSON: {e}") from None
+        return cls.from_dict(data, validate)
+    
+    def validate(self):
+        """Raise OrderError unless the amounts are sane and total = subtotal - discount + fee + tip"""
+        problems = []
+        for name in ('subtotal', 'discount', 'delivery_fee', 'tip', 'total'):
+            if getattr(self, name) < 0:
+                problems.append(f"{name} is negative")
+        for item in self.items:
+            if item.quantity < 1:
+                problems.append(f"{item.name} has quantity {item.quantity}")
+        expected = self.subtotal - self.discount + self.delivery_fee + self.tip
+        if abs(self.total - expected) > TOTAL_TOLERANCE_CENTS:
+            problems.append(f"total {format_money(self.total)} should be {format_money(expected)} "
+                            f"(subtotal - discount + delivery fee + tip)")
+        if problems:
+            raise OrderError(f"order {self.order_number}: " + '; '.join(problems))
+    
+    def to_dict(self):
+        """
+        The order as the app's JSON object, rebuilt from the parsed fields
+        The receipt cache hashes this, so two orders that print the same
+        share a key however their raw JSON differed. created_at is left out
+        when the app sent none, as it is then only the time of parsing.
+        """
+        person = lambda p: p and {'name': p.name, 'image': p.image, 'story': p.story}
+        data = {
+            'order_number': self.order_number,
+            'customer_name': self.customer_name,
+            'customer_phone': self.customer_phone,
+            'customer_address': self.customer_address,
+            'restaurant_name': self.restaurant_name,
+            'restaurant_owner': person(self.restaurant_owner),
+            'driver': person(self.driver),
+            'items': [
+                {'name': item.name, 'quantity': item.quantity, 'price': item.price / 100,
+                 'toppings': list(item.toppings), 'instructions': item.instructions,
+                 'category': item.category}
+                for item in self.items
+            ],
+            'subtotal': self.subtotal / 100,
+            'discount': self.discount / 100,
+            'discount_type': self.discount_type,
+            'delivery_fee': self.delivery_fee / 100,
+            'tip': self.tip / 100,
+            'total': self.total / 100,
+            'payment_method': self.payment_method,
+        }
+        if self.created_at_given:
+            data['created_at'] = self.created_at.isoformat()
+        return data
+
+
+def as_order(order_data, validate=False):
+    """Pass an Order through, or parse a raw order dict into one"""
+    if isinstance(order_data, Order):
+        return order_data
+    return Order.from_dict(order_data, validate)
+
+
+def iter_orders(lines, validate=True):
+    """Orders from JSON Lines (an iterable of str or bytes lines); blank lines are skipped"""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield Order.from_json(line, validate)
+        except OrderError as e:
+            raise OrderError(f"line {number}: {e}") from None
+
+
+def load_orders(path, validate=True):
+    """
+    Parse and check a whole file of orders before anything is rendered
+    Accepts a JSON array, a single JSON object, or JSON Lines.
+    Raises OrderError naming the first bad order.
+    """
+    with open(path, 'rb') as f:
+        return parse_orders(f.read(), path, validate)
+
+
+def parse_orders(data, source='<input>', validate=True):
+    """load_orders for bytes already read, e.g. from stdin; source names them in errors"""
+    parsed = None
+    start = data.lstrip()[:1]
+    if start in (b'[', b'{'):
+        try:
+            parsed = parse_json(data)
+        except ValueError as e:
+            if start == b'[':
+                raise OrderError(f"{source}: invalid JSON: {e}") from None
+            # Several objects, one per line
+    
+    if parsed is not None:
+        if isinstance(parsed, dict):
+            parsed = [parsed]
+        orders = []
+        for number, order_data in enumerate(parsed, 1):
+            try:
+                orders.append(Order.from_dict(order_data, validate))
+            except OrderError as e:
+                raise OrderError(f"{source}: order {number}: {e}") from None
+        return orders
+    
+    try:
+        return list(iter_orders(data.splitlines(), validate))
+    except OrderError as e:
+        raise OrderError(f"{source}: {e}") from None
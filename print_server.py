@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+LocalFirst YYC - Local Print Server
+Long-running process for the restaurant's Raspberry Pi: reads orders as
+JSON lines, keeps warm receipt generators and prints each order once
+
+Examples:
+    python print_server.py --stdin --output-dir /var/receipts
+    python print_server.py --listen /run/localfirst.sock --printer 192.168.1.50:9100 --format escpos
+    python print_server.py --tail /var/log/orders.jsonl --output-dir /var/receipts --metrics-port 9464
+    python print_server.py --stdin --archive /var/receipt-archive
+"""
+
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
+import os
+import queue
+import signal
+import socketserver
+import sys
+import threading
+import time
+
+import escpos
+from order_model import parse_json, safe_filename
+from receipt_archive import ReceiptArchive
+from receipt_generator import ReceiptGenerator, call_worker, init_worker
+from receipt_metrics import JsonLinesExporter, PrometheusExporter, serve_metrics
+
+# Marks the end of the order stream for the dispatcher threads
+_STOP = object()
+
+class PrintServer:
+    """
+    Render orders with a fixed number of workers behind a bounded queue
+    submit() blocks while the queue is full, which pushes back on whatever
+    is feeding orders in (stdin, socket clients or the tailed file).
+    """
+    
+    def __init__(self, output_dir=None, printer=None, kind='kitchen', output_format='pdf',
+                 workers=2, queue_size=32, remember=10000, metrics=(), archive=None, sinks=(), verbose=True):
+        """
+        metrics: hooks (see receipt_metrics) given each render's stage timings
+        archive: a ReceiptArchive to append every receipt to
+        sinks: callables given (order_data, data) for every receipt, e.g. to send it on
+        verbose=False drops the line printed per order
+        """
+        self.output_dir = output_dir
+        self.archive = archive
+        self.sinks = list(sinks)
+        self.verbose = verbose
+        self.printer = printer
+        self.kind = kind
+        self.output_format = output_format
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        
+        # Recently seen order numbers, oldest first, for dropping duplicates
+        self._seen = OrderedDict()
+        self._remember = remember
+        self._lock = threading.Lock()
+        
+        self.received = 0
+        self.rendered = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self._latencies = deque(maxlen=1000)
+        self._queue_waits = deque(maxlen=1000)
+        
+        self.metrics = list(metrics)
+        self._pool = None
+        self._threads = []
+    
+    def start(self):
+        """Start the render processes and the threads feeding them"""
+        # Each worker holds a warm generator that collects its render metrics
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                         initargs=(ReceiptGenerator, {'metrics': True}))
+        # Fork the workers now, before any input is read: a child forked while
+        # the main thread is blocked reading stdin deadlocks closing its copy
+        self._pool.submit(os.getpid).result()
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._dispatch, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+    
+    def submit(self, order_data):
+        """
+        Queue an order for printing, blocking while the queue is full
+        Returns False if the order number was already seen, unless that
+        order failed to render or deliver
+        """
+        order_number = order_data.get('order_number')
+        with self._lock:
+            self.received += 1
+            if order_number is not None:
+                # As text: the number comes from the client and may be any JSON value
+                order_number = str(order_number)
+                if order_number in self._seen:
+                    self.duplicates += 1
+                    return False
+                self._seen[order_number] = True
+                if len(self._seen) > self._remember:
+                    self._seen.popitem(last=False)
+        
+        self.queue.put((time.monotonic(), order_data))
+        return True
+    
+    def reject(self, reason):
+        """Count and report an input line that could not be queued"""
+        with self._lock:
+            self.invalid += 1
+        print(f"❌ Skipping bad order line: {reason}", file=sys.stderr, flush=True)
+    
+    def shutdown(self):
+        """Finish everything already queued, then stop the workers"""
+        for _ in self._threads:
+            self.queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self._pool:
+            self._pool.shutdown()
+            self._pool = None
+    
+    def _dispatch(self):
+        """Take orders off the queue and wait for each one to render"""
+        while True:
+            job = self.queue.get()
+            if job is _STOP:
+                return
+            
+            queued_at, order_data = job
+            started_at = time.monotonic()
+            order_number = order_data.get('order_number', 'N/A')
+            try:
+                data, renders = self._pool.submit(call_worker, f'generate_{self.kind}_receipt', (order_data,),
+                                                  {'output_format': self.output_format}).result()
+                self._deliver(order_data, data)
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                    # Forget the order so a corrected copy sent again still prints
+                    if order_data.get('order_number') is not None:
+                        self._seen.pop(str(order_data['order_number']), None)
+                print(f"❌ Order {order_number} failed: {type(e).__name__}: {e}", file=sys.stderr, flush=True)
+                continue
+            
+            finished_at = time.monotonic()
+            with self._lock:
+                self.rendered += 1
+                self._latencies.append(finished_at - queued_at)
+                self._queue_waits.append(started_at - queued_at)
+            if self.verbose:
+                print(f"✅ Order {order_number} printed in {(finished_at - queued_at) * 1000:.0f} ms "
+                      f"(queued {(started_at - queued_at) * 1000:.0f} ms, depth {self.queue.qsize()})",
+                      file=sys.stderr, flush=True)
+            self._export(renders[-1] if renders else None, queued_at, started_at, finished_at)
+    
+    def _export(self, render_metrics, queued_at, started_at, finished_at):
+        """Pass a worker's render metrics, plus queueing figures, to the metrics hooks"""
+        if not self.metrics or not render_metrics:
+            return
+        render_metrics = dict(render_metrics, queue_wait=started_at - queued_at,
+                              latency=finished_at - queued_at, queue_depth=self.queue.qsize())
+        for hook in self.metrics:
+            if isinstance(hook, PrometheusExporter):
+                hook.gauge('print_server_queue_depth', self.queue.qsize(), 'Orders waiting to render')
+            try:
+                hook(render_metrics)
+            except Exception as e:
+                print(f"Error reporting receipt metrics: {e}", file=sys.stderr, flush=True)
+    
+    def _deliver(self, order_data, data):
+        """Write a rendered receipt to the output directory, archive, printer and sinks"""
+        if self.output_dir:
+            extension = {'escpos': 'bin', 'jpeg': 'jpg'}.get(self.output_format, self.output_format)
+            # The order number comes from the client: keep it to one file name inside output_dir
+            order_number = safe_filename(order_data.get('order_number', 'N/A'))
+            path = os.path.join(self.output_dir, f"{self.kind}_{order_number}.{extension}")
+            with open(path, 'wb') as f:
+                f.write(data)
+        if self.archive is not None:
+            self.archive.add(order_data, data, self.kind, self.output_format)
+        if self.printer:
+            escpos.send_to_printer(data, *self.printer)
+        for sink in self.sinks:
+            sink(order_data, data)
+    
+    def stats(self):
+        """Queue depth, counters and latency percentiles (milliseconds)"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            waits = sorted(self._queue_waits)
+            stats = {
+                'queue_depth': self.queue.qsize(),
+                'received': self.received,
+                'rendered': self.rendered,
+                'failed': self.failed,
+                'duplicates': self.duplicates,
+                'invalid': self.invalid,
+            }
+        stats['latency_ms'] = _percentiles(latencies)
+        stats['queue_wait_ms'] = _percentiles(waits)
+        return stats
+
+
+def _percentiles(values):
+    """p50/p95/max of a sorted list of seconds, in milliseconds"""
+    if not values:
+        return {'p50': None, 'p95': None, 'max': None}
+    pick = lambda q: round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 1)
+    return {'p50': pick(0.50), 'p95': pick(0.95), 'max': round(values[-1] * 1000, 1)}
+
+
+def _submit_line(server, line):
+    """Parse one JSON line and queue it; returns a short status"""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        order_data = parse_json(line)
+        if not isinstance(order_data, dict):
+            server.reject("not a JSON object")
+            return 'invalid'
+        return 'queued' if server.submit(order_data) else 'duplicate'
+    except Exception as e:
+        # One bad line must not take down the reader, or the client's connection
+        server.reject(f"{type(e).__name__}: {e}")
+        return 'invalid'
+
+
+def read_stdin(server):
+    """Feed orders from standard input until it closes"""
+    for line in sys.stdin:
+        _submit_line(server, line)
+
+
+def tail_file(server, path, from_start=False, poll_interval=0.5, stop=None):
+    """Follow a JSONL file like tail -f, reopening it if it is rotated or truncated"""
+    stop = stop or threading.Event()
+    f = open(path, 'r')
+    if not from_start:
+        f.seek(0, os.SEEK_END)
+    partial = ''
+    try:
+        while not stop.is_set():
+            line = f.readline()
+            if line:
+                partial += line
+                if partial.endswith('\n'):
+                    _submit_line(server, partial)
+                    partial = ''
+                continue
+            
+            # No new data: check for rotation (new inode) or truncation before sleeping
+            try:
+                current = os.stat(path)
+            except FileNotFoundError:
+                current = None
+            if current and (current.st_ino != os.fstat(f.fileno()).st_ino or current.st_size < f.tell()):
+                f.close()
+                f = open(path, 'r')
+                partial = ''
+                continue
+            stop.wait(poll_interval)
+    finally:
+        f.close()
+
+
+def listen(server, address):
+    """
+    Accept orders on a local socket, one JSON object per line
+    address is a Unix socket path or host:port. Each line gets a
+    JSON reply with its status.
+    """
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                status = _submit_line(server, line.decode('utf-8', 'replace'))
+                if status:
+                    self.wfile.write(json.dumps({'status': status}).encode('utf-8') + b'\n')
+    
+    if ':' in address:
+        host, port = address.rsplit(':', 1)
+        listener = socketserver.ThreadingTCPServer((host, int(port)), Handler)
+    else:
+        if os.path.exists(address):
+            os.unlink(address)
+        listener = socketserver.ThreadingUnixStreamServer(address, Handler)
+    listener.daemon_threads = True
+    return listener
+
+
+def _report_stats(server, interval, stop):
+    """Print a stats line every interval seconds"""
+    while not stop.wait(interval):
+        print(f"📊 {json.dumps(server.stats())}", file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='LocalFirst YYC local print server')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--stdin', action='store_true', help='read order JSON lines from stdin')
+    source.add_argument('--listen', metavar='ADDRESS', help='Unix socket path or host:port to accept orders on')
+    source.add_argument('--tail', metavar='FILE', help='follow a JSONL file of orders')
+    parser.add_argument('--from-start', action='store_true', help='with --tail, also print orders already in the file')
+    parser.add_argument('--output-dir', help='directory to write receipts to')
+    parser.add_argument('--archive', metavar='DIR', help='receipt archive to append receipts to')
+    parser.add_argument('--printer', metavar='HOST:PORT', help='network printer raw port to send receipts to')
+    parser.add_argument('--kind', choices=['kitchen', 'customer'], default='kitchen')
+    parser.add_argument('--format', dest='output_format', choices=['pdf', 'escpos', 'png', 'jpeg'], default='pdf',
+                        help='escpos only applies to kitchen receipts, png/jpeg only to customer receipts')
+    parser.add_argument('--workers', type=int, default=2, help='orders rendered at the same time')
+    parser.add_argument('--queue-size', type=int, default=32, help='orders waiting before input is paused')
+    parser.add_argument('--stats-interval', type=float, default=60, help='seconds between stats lines')
+    parser.add_argument('--metrics-port', type=int, help='serve Prometheus metrics at :PORT/metrics')
+    parser.add_argument('--metrics-log', metavar='FILE', help='append per-render metrics as JSON lines')
+    args = parser.parse_args(argv)
+    
+    if not args.output_dir and not args.printer and not args.archive:
+        parser.error('give --output-dir, --archive and/or --printer')
+    if args.output_format == 'escpos' and args.kind != 'kitchen':
+        parser.error('--format escpos is only available for kitchen receipts')
+    if args.output_format in ('png', 'jpeg') and args.kind != 'customer':
+        parser.error(f'--format {args.output_format} is only available for customer receipts')
+    printer = None
+    if args.printer:
+        host, port = args.printer.rsplit(':', 1)
+        printer = (host, int(port))
+    
+    metrics = []
+    if args.metrics_port:
+        metrics.append(PrometheusExporter())
+        serve_metrics(metrics[-1], args.metrics_port)
+    if args.metrics_log:
+        metrics.append(JsonLinesExporter(open(args.metrics_log, 'a')))
+    
+    archive = ReceiptArchive(args.archive) if args.archive else None
+    server = PrintServer(output_dir=args.output_dir, printer=printer, kind=args.kind,
+                         output_format=args.output_format, workers=args.workers,
+                         queue_size=args.queue_size, metrics=metrics, archive=archive).start()
+    stop = threading.Event()
+    threading.Thread(target=_report_stats, args=(server, args.stats_interval, stop), daemon=True).start()
+    print(f"🖨️  Print server ready ({args.workers} workers, queue {args.queue_size})", file=sys.stderr, flush=True)
+    
+    # Stop reading new orders on SIGTERM/Ctrl-C; whatever is queued still prints
+    def request_stop(signum, frame):
+        stop.set()
+        if listener:
+            threading.Thread(target=listener.shutdown, daemon=True).start()
+        if args.stdin:
+            raise KeyboardInterrupt
+    listener = None
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    
+    try:
+        if args.stdin:
+            read_stdin(server)
+        elif args.tail:
+            tail_file(server, args.tail, from_start=args.from_start, stop=stop)
+        else:
+            listener = listen(server, args.listen)
+            with listener:
+                listener.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.shutdown()
+        if archive is not None:
+            archive.close()
+        print(f"📊 {json.dumps(server.stats())}", file=sys.stderr, flush=True)
+
+
+if __name__ == '__main__':
+    main()
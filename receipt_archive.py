@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+LocalFirst YYC - Receipt Archive
+Keeps rendered receipts in a few large tar shards with an SQLite index,
+instead of one loose file per order, so months of receipts stay quick to
+list, back up and search
+
+Examples:
+    with ReceiptArchive('/var/receipts') as archive:
+        archive.add(order, pdf)
+        pdf = archive.get('LF-4829')
+        archive.export('ab-king-march.zip', restaurant='AB King Pizza', start='2025-03-01', end='2025-03-31')
+    
+    python receipt_archive.py export /var/receipts march.zip --restaurant 'AB King Pizza' --from 2025-03-01
+"""
+
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+import argparse
+import csv
+import io
+import os
+import sqlite3
+import sys
+import tarfile
+import threading
+import time
+import zipfile
+
+from order_model import as_order, safe_filename
+
+# A shard is closed once the next receipt would take it past this size
+SHARD_BYTES = 256 * 1024 * 1024
+
+# File extension inside the shards, where it differs from the format name
+EXTENSIONS = {'escpos': 'bin', 'jpeg': 'jpg'}
+
+# Tar ends with two zero blocks; they are written on close and dropped on reopen
+_TAR_END = b'\0' * (2 * tarfile.BLOCKSIZE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS receipts (
+    order_number TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    restaurant TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    format TEXT NOT NULL,
+    shard TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (order_number, kind, format)
+);
+CREATE INDEX IF NOT EXISTS receipts_by_restaurant ON receipts (restaurant, created_at);
+CREATE INDEX IF NOT EXISTS receipts_by_date ON receipts (created_at);
+CREATE TABLE IF NOT EXISTS shards (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    closed INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# Moves an index from before the format was part of a receipt's key onto _SCHEMA
+_REKEY = """
+BEGIN;
+DROP INDEX receipts_by_restaurant;
+DROP INDEX receipts_by_date;
+ALTER TABLE receipts RENAME TO receipts_by_kind;
+""" + _SCHEMA + """
+INSERT INTO receipts SELECT * FROM receipts_by_kind;
+DROP TABLE receipts_by_kind;
+COMMIT;
+"""
+
+# Where one archived receipt lives: offset and size locate its bytes in the shard
+ArchiveEntry = namedtuple('ArchiveEntry', ['order_number', 'kind', 'restaurant', 'created_at', 'format',
+                                           'shard', 'offset', 'size', 'name'])
+
+
+class ReceiptArchive:
+    """
+    Append-only receipt store: tar shards of at most max_shard_bytes plus an
+    index of order number, restaurant and date -> shard and byte offset
+    Shards are plain uncompressed tars (the PDFs and images inside are already
+    compressed), so `tar -xf` can read them without this module. A receipt's
+    bytes are on disk before its index row is committed; anything written
+    after the last commit, e.g. by a crash, is cut off when the archive is
+    reopened. Adding the same order, kind and format again, as on a reprint,
+    points the index at the new copy; the old bytes stay in their shard.
+    """
+    
+    def __init__(self, directory, max_shard_bytes=SHARD_BYTES):
+        self.directory = directory
+        self.max_shard_bytes = max_shard_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, 'index.sqlite'), check_same_thread=False)
+        # WAL commits without syncing on every receipt; a power cut can lose the
+        # last few rows, and their bytes are then cut off the shard on reopen
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        key = [name for _, name, _, _, _, in_key in self._db.execute("PRAGMA table_info(receipts)") if in_key]
+        if 'format' not in key:
+            self._db.executescript(_REKEY)
+        self._shard = None  # Name of the shard being appended to
+        self._size = 0      # Its committed size
+        self._file = None
+        self.added = 0
+        self.fetched = 0
+        
+        row = self._db.execute("SELECT name, size FROM shards WHERE closed = 0 "
+                               "ORDER BY name DESC LIMIT 1").fetchone()
+        if row:
+            self._shard, self._size = row
+    
+    def add(self, order_data, data, kind='customer', output_format='pdf'):
+        """Append one rendered receipt for an order (dict or Order); returns its ArchiveEntry"""
+        order = as_order(order_data)
+        extension = EXTENSIONS.get(output_format, output_format)
+        name = (f"{safe_filename(order.restaurant_name)}/{order.created_at:%Y-%m-%d}/"
+                f"{kind}_{safe_filename(order.order_number)}.{extension}")
+        
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        header = info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape')
+        member = header + bytes(data) + b'\0' * (-len(data) % tarfile.BLOCKSIZE)
+        
+        with self._lock:
+            if self._shard is None or (self._size and self._size + len(member) > self.max_shard_bytes):
+                self._next_shard()
+            f = self._writer()
+            f.write(member)
+            f.flush()
+            entry = ArchiveEntry(order.order_number, kind, order.restaurant_name, order.created_at.isoformat(),
+                                 output_format, self._shard, self._size + len(header), len(data), name)
+            self._size += len(member)
+            with self._db:
+                self._db.execute("INSERT OR REPLACE INTO receipts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", entry)
+                self._db.execute("UPDATE shards SET size = ? WHERE name = ?", (self._size, self._shard))
+            self.added += 1
+        return entry
+    
+    def get(self, order_number, kind='customer', output_format=None):
+        """An archived receipt's bytes, or None: one index lookup and one read (see entry)"""
+        entry = self.entry(order_number, kind, output_format)
+        if entry is None:
+            return None
+        with open(os.path.join(self.directory, entry.shard), 'rb') as f:
+            f.seek(entry.offset)
+            data = f.read(entry.size)
+        with self._lock:
+            self.fetched += 1
+        return data
+    
+    def entry(self, order_number, kind='customer', output_format=None):
+        """
+        Index entry for one receipt, or None
+        output_format=None takes whichever format of the receipt was added last.
+        """
+        sql = "SELECT * FROM receipts WHERE order_number = ? AND kind = ?"
+        params = [str(order_number), kind]
+        if output_format is not None:
+            sql += " AND format = ?"
+            params.append(output_format)
+        with self._lock:
+            row = self._db.execute(sql + " ORDER BY rowid DESC LIMIT 1", params).fetchone()
+        return ArchiveEntry(*row) if row else None
+    
+    def find(self, restaurant=None, start=None, end=None, kind=None):
+        """
+        Index entries oldest first, filtered by restaurant name, kind and
+        created_at range. start and end are dates, datetimes or ISO strings;
+        a date (or 'YYYY-MM-DD') end includes that whole day.
+        """
+        where, params = [], []
+        if restaurant is not None:
+            where.append("restaurant = ?")
+            params.append(restaurant)
+        if kind is not None:
+            where.append("kind = ?")
+            params.append(kind)
+        if start is not None:
+            where.append("created_at >= ?")
+            params.append(_bound(start))
+        if end is not None:
+            end = _bound(end)
+            if len(end) == 10:
+                where.append("created_at < ?")
+                params.append((date.fromisoformat(end) + timedelta(days=1)).isoformat())
+            else:
+                where.append("created_at <= ?")
+                params.append(end)
+        sql = "SELECT * FROM receipts"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        with self._lock:
+            rows = self._db.execute(sql + " ORDER BY created_at, order_number", params).fetchall()
+        return [ArchiveEntry(*row) for row in rows]
+    
+    def export(self, output, restaurant=None, start=None, end=None, kind=None):
+        """
+        Copy matching receipts (see find) into one zip, with a manifest.csv
+        listing them; output is a path or a writable file. Receipts are read
+        shard by shard in offset order, so a big export is one sequential
+        pass per shard. Returns the number of receipts exported.
+        """
+        entries = self.find(restaurant, start, end, kind)
+        manifest = io.StringIO()
+        writer = csv.writer(manifest)
+        writer.writerow(['order_number', 'kind', 'restaurant', 'created_at', 'format', 'name'])
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_STORED) as bundle:
+            shard, f = None, None
+            try:
+                for entry in sorted(entries, key=lambda entry: (entry.shard, entry.offset)):
+                    if entry.shard != shard:
+                        if f:
+                            f.close()
+                        shard = entry.shard
+                        f = open(os.path.join(self.directory, shard), 'rb')
+                    f.seek(entry.offset)
+                    bundle.writestr(entry.name, f.read(entry.size))
+            finally:
+                if f:
+                    f.close()
+            for entry in entries:
+                writer.writerow([entry.order_number, entry.kind, entry.restaurant, entry.created_at,
+                                 entry.format, entry.name])
+            bundle.writestr('manifest.csv', manifest.getvalue(), zipfile.ZIP_DEFLATED)
+        return len(entries)
+    
+    def stats(self):
+        """Receipt and shard counts, bytes on disk, and this session's counters"""
+        with self._lock:
+            receipts, receipt_bytes = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM receipts").fetchone()
+            shards, shard_bytes = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM shards").fetchone()
+            return {
+                'receipts': receipts,
+                'receipt_bytes': receipt_bytes,
+                'shards': shards,
+                'shard_bytes': shard_bytes,
+                'added': self.added,
+                'fetched': self.fetched,
+            }
+    
+    def close(self):
+        """Finish the open shard as a complete tar and close the index"""
+        with self._lock:
+            if self._file:
+                self._file.write(_TAR_END)
+                self._file.close()
+                self._file = None
+            self._db.close()
+    
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM receipts").fetchone()[0]
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def _writer(self):
+        """The open shard, cut back to its committed size the first time"""
+        if self._file is None:
+            self._file = open(os.path.join(self.directory, self._shard), 'ab')
+            self._file.truncate(self._size)
+        return self._file
+    
+    def _next_shard(self):
+        """Close the current shard for good and start the next one"""
+        if self._shard is not None:
+            self._writer().write(_TAR_END)
+            self._file.close()
+            self._file = None
+            with self._db:
+                self._db.execute("UPDATE shards SET closed = 1 WHERE name = ?", (self._shard,))
+        number = self._db.execute("SELECT COUNT(*) FROM shards").fetchone()[0] + 1
+        self._shard = f"receipts-{number:06d}.tar"
+        self._size = 0
+        with self._db:
+            self._db.execute("INSERT INTO shards (name, size) VALUES (?, 0)", (self._shard,))
+
+
+def _bound(value):
+    """A find() date bound as a string that compares against stored ISO timestamps"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fetch or export receipts from a LocalFirst YYC receipt archive')
+    commands = parser.add_subparsers(dest='command', required=True)
+    get = commands.add_parser('get', help='write one receipt to stdout or a file')
+    get.add_argument('directory')
+    get.add_argument('order_number')
+    get.add_argument('--kind', default='customer')
+    get.add_argument('--format', dest='output_format', help='pdf, escpos, png or jpeg (default: the latest added)')
+    get.add_argument('-o', '--output', help='output file (default: stdout)')
+    export = commands.add_parser('export', help='copy receipts into one zip')
+    export.add_argument('directory')
+    export.add_argument('output', help='zip file to write')
+    export.add_argument('--restaurant')
+    export.add_argument('--kind')
+    export.add_argument('--from', dest='start', metavar='DATE', help='first day (YYYY-MM-DD) or ISO timestamp')
+    export.add_argument('--to', dest='end', metavar='DATE', help='last day, included, or ISO timestamp')
+    commands.add_parser('stats', help='receipt and shard counts').add_argument('directory')
+    args = parser.parse_args(argv)
+    
+    if not os.path.isfile(os.path.join(args.directory, 'index.sqlite')):
+        print(f"❌ {args.directory} is not a receipt archive", file=sys.stderr)
+        return 1
+    with ReceiptArchive(args.directory) as archive:
+        if args.command == 'get':
+            data = archive.get(args.order_number, args.kind, args.output_format)
+            if data is None:
+                print(f"❌ No {args.kind} receipt for order {args.order_number}", file=sys.stderr)
+                return 1
+            if args.output:
+                with open(args.output, 'wb') as f:
+                    f.write(data)
+            else:
+                sys.stdout.buffer.write(data)
+        elif args.command == 'export':
+            count = archive.export(args.output, args.restaurant, args.start, args.end, args.kind)
+            print(f"✅ {count} receipt{'s' if count != 1 else ''} exported to {args.output}", file=sys.stderr)
+        else:
+            for name, value in archive.stats().items():
+                print(f"{name}: {value}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+LocalFirst YYC - Async Receipt API
+asyncio front end for ReceiptGenerator: renders run on a thread or process
+pool, so webhook and notification handlers keep serving while receipts build
+
+Example:
+    async with AsyncReceiptGenerator(max_concurrent=4, timeout=10) as receipts:
+        pdf = await receipts.generate_customer_receipt(order)
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import functools
+import os
+import threading
+
+from receipt_generator import ReceiptGenerator, call_worker, init_worker
+
+# Marks "use the instance's default timeout" (None means no timeout)
+_DEFAULT = object()
+
+
+class AsyncReceiptGenerator:
+    """
+    Awaitable versions of the ReceiptGenerator generate_* methods
+    
+    executor='thread' shares one generator between worker threads and suits
+    renders that are mostly Pillow and zlib work; executor='process' gives each
+    worker process its own generator set up like this one (see
+    ReceiptGenerator.worker_config), for full CPU parallelism. With processes,
+    arguments and results are pickled: pass file paths or output_path=None
+    rather than open files.
+    
+    At most max_concurrent renders are handed to the pool at once; the rest
+    wait their turn on the event loop, where cancelling them costs nothing.
+    timeout (seconds, None for no limit) bounds each call, time spent waiting
+    for a turn included, and raises TimeoutError. A call that is cancelled or
+    times out before its render starts never runs. A render already running
+    cannot be interrupted: it finishes in the background, its result is
+    dropped, and it keeps its slot until then so the cap stays honest.
+    """
+    
+    def __init__(self, generator=None, executor='thread', workers=None, max_concurrent=None, timeout=None):
+        if executor not in ('thread', 'process'):
+            raise ValueError(f"Unknown executor: {executor}")
+        self.generator = generator or ReceiptGenerator()
+        self.executor = executor
+        self.workers = workers or os.cpu_count() or 1
+        self.max_concurrent = max_concurrent or self.workers
+        self.timeout = timeout
+        
+        if executor == 'process':
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                             initargs=(type(self.generator), self.generator.worker_config()))
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='receipt')
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._closed = False
+        self._lock = threading.Lock()
+        self._running = set()
+        self.rendered = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.cancelled = 0
+    
+    async def generate_customer_receipt(self, order_data, output_path=None, *, timeout=_DEFAULT, **options):
+        """See ReceiptGenerator.generate_customer_receipt"""
+        return await self._call('generate_customer_receipt', (order_data, output_path), options, timeout)
+    
+    async def generate_kitchen_receipt(self, order_data, output_path=None, *, timeout=_DEFAULT, **options):
+        """See ReceiptGenerator.generate_kitchen_receipt"""
+        return await self._call('generate_kitchen_receipt', (order_data, output_path), options, timeout)
+    
+    async def generate_station_tickets(self, order_data, stations, output_path=None, *, timeout=_DEFAULT,
+                                       **options):
+        """See ReceiptGenerator.generate_station_tickets"""
+        return await self._call('generate_station_tickets', (order_data, stations, output_path), options, timeout)
+    
+    async def generate_order_card(self, order_data, output_path=None, *, timeout=_DEFAULT, **options):
+        """See ReceiptGenerator.generate_order_card"""
+        return await self._call('generate_order_card', (order_data, output_path), options, timeout)
+    
+    async def generate_statement(self, orders, output_path=None, *, timeout=_DEFAULT, **options):
+        """
+        See ReceiptGenerator.generate_statement
+        On a thread pool the orders iterable is read lazily by the worker
+        thread, so it must not need the event loop; on a process pool it is
+        read into a list first.
+        """
+        if self.executor == 'process' and not isinstance(orders, (list, tuple)):
+            orders = list(orders)
+        return await self._call('generate_statement', (orders, output_path), options, timeout)
+    
+    async def _call(self, method, args, kwargs, timeout):
+        """Run one generator method on the pool, within the cap and the timeout"""
+        if self._closed:
+            raise RuntimeError("AsyncReceiptGenerator is closed")
+        timeout = self.timeout if timeout is _DEFAULT else timeout
+        try:
+            return await asyncio.wait_for(self._render(method, args, kwargs), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise TimeoutError(f"{method} did not finish within {timeout}s") from None
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+    
+    async def _render(self, method, args, kwargs):
+        await self._slots.acquire()
+        release = True
+        try:
+            if self._closed:
+                raise RuntimeError("AsyncReceiptGenerator is closed")
+            if self.executor == 'process':
+                future = self._pool.submit(call_worker, method, args, kwargs)
+            else:
+                future = self._pool.submit(functools.partial(getattr(self.generator, method), *args, **kwargs))
+            with self._lock:
+                self._running.add(future)
+            future.add_done_callback(self._forget)
+            try:
+                # Cancelling the wrapper also cancels the pool future if it has not started
+                result = await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                if not future.done():
+                    # Still running: hold the slot until the render really ends
+                    release = False
+                    loop = asyncio.get_running_loop()
+                    future.add_done_callback(lambda _: self._release_from_pool(loop))
+                raise
+            except Exception:
+                self.failed += 1
+                raise
+            self.rendered += 1
+            if self.executor == 'process':
+                result, metrics = result
+                self.generator.replay_metrics(metrics)
+            return result
+        finally:
+            if release:
+                self._slots.release()
+    
+    def _forget(self, future):
+        with self._lock:
+            self._running.discard(future)
+    
+    def _release_from_pool(self, loop):
+        """Give back a slot from a pool thread, once an abandoned render finishes"""
+        try:
+            loop.call_soon_threadsafe(self._slots.release)
+        except RuntimeError:
+            pass  # The loop is gone, and the semaphore with it
+    
+    def stats(self):
+        """Renders running or queued on the pool, and outcome counters"""
+        with self._lock:
+            in_pool = len(self._running)
+        return {
+            'in_pool': in_pool,
+            'rendered': self.rendered,
+            'failed': self.failed,
+            'timeouts': self.timeouts,
+            'cancelled': self.cancelled,
+        }
+    
+    async def close(self, cancel_pending=False):
+        """
+        Stop taking new renders and wait for the pool to finish
+        cancel_pending=True drops renders queued on the pool that have not
+        started yet (their callers see CancelledError) instead of running them.
+        Calls still waiting for a slot fail with RuntimeError.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, functools.partial(self._pool.shutdown, wait=True,
+                                                           cancel_futures=cancel_pending))
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        await self.close(cancel_pending=exc[0] is not None)
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+LocalFirst YYC - Receipt Benchmark
+Times generate_customer_receipt and generate_kitchen_receipt over a set of
+realistic orders and saves the results as JSON so runs can be compared
+
+Examples:
+    python receipt_benchmark.py --output before.json
+    python receipt_benchmark.py --output after.json --compare before.json
+    python receipt_benchmark.py --scenarios large_100_photos --iterations 10
+    python receipt_benchmark.py --scaling --output scaling.json
+    python receipt_benchmark.py --startup
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Phone-camera sized photos, like the ones owners and drivers upload
+PHOTO_PIXELS = (3024, 4032)
+
+MENU = [
+    ('Pepperoni Classic (Large)', 20.99),
+    ('Margherita (Medium)', 16.49),
+    ('Garlic Bread', 5.99),
+    ('Caesar Salad', 9.99),
+    ('Chicken Wings (12pc)', 15.99),
+    ('Coca-Cola (2L)', 3.99),
+    ('Tiramisu', 7.49),
+]
+TOPPINGS = ['Extra Cheese', 'Mushrooms', 'Green Peppers', 'Black Olives', 'Jalapeños',
+            'Pineapple', 'Red Onion', 'Bacon', 'Feta', 'Spinach']
+
+
+def make_order(item_count=3, toppings=0, instructions=False, photos=None, payment_method='visa',
+               order_number='LF-1000'):
+    """
+    Build an order shaped like the ones the app sends
+    photos is a (owner_path, driver_path) pair, or None for text-only cards
+    """
+    items = []
+    for i in range(item_count):
+        name, price = MENU[i % len(MENU)]
+        item = {'name': name, 'quantity': 1 + i % 3, 'price': price}
+        if toppings:
+            item['toppings'] = [TOPPINGS[(i + t) % len(TOPPINGS)] for t in range(toppings)]
+        if instructions:
+            item['instructions'] = 'Well done, cut in squares, no garlic on half please'
+        items.append(item)
+    
+    subtotal = round(sum(item['price'] * item['quantity'] for item in items), 2)
+    discount = round(subtotal * 0.10, 2)
+    delivery_fee = 3.99 if item_count < 5 else 0
+    tip = round(subtotal * 0.15, 2)
+    order = {
+        'order_number': order_number,
+        'customer_name': 'Sarah Johnson',
+        'customer_phone': '14035551234',
+        'customer_address': '123 Main St NW, Calgary, AB T2N 1A1',
+        'restaurant_name': 'AB King Pizza',
+        'restaurant_owner': {
+            'name': 'Fatima Al-Hassan',
+            'image': photos[0] if photos else '',
+            'story': "I came to Calgary from Jordan 12 years ago with nothing but my grandmother's recipes "
+                     "and a dream. Every pizza we make carries four generations of love.",
+        },
+        'driver': {
+            'name': 'Ahmed Hassan',
+            'image': photos[1] if photos else '',
+            'story': "I'm a Computer Science student at the University of Calgary. Every tip goes straight "
+                     "into my education fund.",
+        },
+        'items': items,
+        'subtotal': subtotal,
+        'discount': discount,
+        'discount_type': 'first_order',
+        'delivery_fee': delivery_fee,
+        'tip': tip,
+        'total': round(subtotal - discount + delivery_fee + tip, 2),
+        'payment_method': payment_method,
+        'created_at': '2026-03-13T18:45:00',
+    }
+    return order
+
+
+def make_photos(directory):
+    """Write an owner and a driver photo at phone resolution; returns their paths"""
+    from PIL import Image, ImageDraw
+    
+    paths = []
+    for name, color in (('owner.jpg', (224, 112, 32)), ('driver.jpg', (37, 211, 102))):
+        path = os.path.join(directory, name)
+        im = Image.new('RGB', PHOTO_PIXELS, color)
+        draw = ImageDraw.Draw(im)
+        # Some detail so the JPEG is not trivially small
+        for x in range(0, PHOTO_PIXELS[0], 48):
+            draw.line([(x, 0), (PHOTO_PIXELS[0] - x, PHOTO_PIXELS[1])], fill=(x % 256, 80, 160), width=9)
+        im.save(path, 'JPEG', quality=90)
+        paths.append(path)
+    return tuple(paths)
+
+
+# name -> make_order() arguments; photos=True is replaced with real fixture photos
+SCENARIOS = {
+    'single_item_card': dict(item_count=1),
+    'single_item_cash_photos': dict(item_count=1, photos=True, payment_method='cash'),
+    'typical_photos': dict(item_count=3, toppings=1, photos=True),
+    'toppings_heavy': dict(item_count=12, toppings=8, instructions=True),
+    'large_100_photos': dict(item_count=100, photos=True),
+    'large_100_toppings_cash': dict(item_count=100, toppings=3, instructions=True, payment_method='cash'),
+}
+
+KINDS = ('customer', 'kitchen')
+
+# Item counts for the scaling run, from a family dinner up to a large catering order
+SCALING_ITEM_COUNTS = (10, 25, 50, 100, 200, 400)
+
+# Cold start runs per command; each one is a fresh interpreter
+STARTUP_RUNS = 10
+
+
+def _percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _peak_rss_mb():
+    """Peak resident memory of this process in MB (ru_maxrss is in kilobytes on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _run_scenario(name, kind, iterations, warmup, photos):
+    """Time one scenario/kind pair; runs in its own process so peak RSS is per scenario"""
+    from receipt_generator import ReceiptGenerator
+    
+    options = dict(SCENARIOS[name])
+    if options.get('photos'):
+        options['photos'] = photos
+    order = make_order(**options)
+    
+    generator = ReceiptGenerator()
+    render = getattr(generator, f'generate_{kind}_receipt')
+    for _ in range(warmup):
+        render(order)
+    
+    latencies = []
+    sizes = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        pdf = render(order)
+        latencies.append(time.perf_counter() - t0)
+        sizes.append(len(pdf))
+    elapsed = time.perf_counter() - started
+    
+    latencies.sort()
+    return {
+        'scenario': name,
+        'kind': kind,
+        'items': len(order['items']),
+        'iterations': iterations,
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies) * 1000, 3),
+            'p50': round(_percentile(latencies, 0.50) * 1000, 3),
+            'p90': round(_percentile(latencies, 0.90) * 1000, 3),
+            'p99': round(_percentile(latencies, 0.99) * 1000, 3),
+            'max': round(latencies[-1] * 1000, 3),
+        },
+        'throughput_per_s': round(iterations / elapsed, 2),
+        'peak_rss_mb': _peak_rss_mb(),
+        'output_bytes': round(statistics.mean(sizes)),
+    }
+
+
+def _run_scaling(kind, item_counts, iterations, options):
+    """Time one receipt kind at each item count, in a single warm process"""
+    from receipt_generator import ReceiptGenerator
+    
+    generator = ReceiptGenerator()
+    render = getattr(generator, f'generate_{kind}_receipt')
+    points = []
+    for count in item_counts:
+        order = make_order(count, toppings=3, instructions=True, payment_method='cash')
+        render(order, **options)
+        latencies = []
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            render(order, **options)
+            latencies.append(time.perf_counter() - t0)
+        p50 = statistics.median(latencies) * 1000
+        points.append({'items': count, 'p50_ms': round(p50, 3), 'ms_per_item': round(p50 / count, 4)})
+    return points
+
+
+def run_scaling(item_counts=SCALING_ITEM_COUNTS, kinds=KINDS, iterations=5):
+    """
+    Render time against item count for each receipt kind (kitchen tickets
+    with continuous=True and fast=True as well), with a least-squares line through the
+    points. An r_squared near 1 means render time grows linearly with items.
+    """
+    runs = [(kind, {}) for kind in kinds]
+    if 'kitchen' in kinds:
+        runs.append(('kitchen', {'continuous': True}))
+        runs.append(('kitchen', {'fast': True}))
+    
+    results = []
+    for kind, options in runs:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            points = pool.submit(_run_scaling, kind, item_counts, iterations, options).result()
+        items = [point['items'] for point in points]
+        times = [point['p50_ms'] for point in points]
+        slope, intercept = statistics.linear_regression(items, times)
+        label = kind + ''.join(f' ({option})' for option in options)
+        results.append({
+            'kind': label,
+            'points': points,
+            'fit': {
+                'ms_per_item': round(slope, 4),
+                'intercept_ms': round(intercept, 3),
+                'r_squared': round(statistics.correlation(items, times) ** 2, 5),
+            },
+        })
+        for point in points:
+            print(f"  {label:<22} {point['items']:>5} items  p50 {point['p50_ms']:>9.2f} ms  "
+                  f"{point['ms_per_item']:>7.3f} ms/item", file=sys.stderr, flush=True)
+        print(f"  {label:<22} fit {slope:.3f} ms/item + {intercept:.1f} ms, "
+              f"r² {results[-1]['fit']['r_squared']:.4f}", file=sys.stderr, flush=True)
+    
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': _environment(),
+        'iterations': iterations,
+        'scaling': results,
+    }
+
+
+def measure_startup(runs=STARTUP_RUNS):
+    """
+    Cold start of receipt_cli.py: median wall time over fresh processes, and
+    how much of it is ours rather than the interpreter's (a bare python -c pass).
+    --help and check are held to receipt_cli.STARTUP_BUDGET_MS; the full import
+    and the renders show what reportlab and Pillow add once there is work.
+    """
+    from receipt_cli import STARTUP_BUDGET_MS
+    
+    cli = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'receipt_cli.py')
+    with tempfile.TemporaryDirectory() as directory:
+        order_path = os.path.join(directory, 'order.json')
+        with open(order_path, 'w') as f:
+            json.dump(make_order(3), f)
+        commands = {
+            'interpreter': ['-c', 'pass'],
+            'help': [cli, '--help'],
+            'check': [cli, 'check', order_path],
+            'import_generator': ['-c', 'import receipt_generator'],
+            'kitchen_escpos': [cli, 'kitchen', order_path, '--format', 'escpos', '-o', os.devnull],
+            'customer_pdf': [cli, 'customer', order_path, '-o', os.devnull],
+        }
+        times = {name: [] for name in commands}
+        for _ in range(runs):
+            for name, args in commands.items():
+                t0 = time.perf_counter()
+                subprocess.run([sys.executable] + args, check=True, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, cwd=os.path.dirname(cli))
+                times[name].append(time.perf_counter() - t0)
+    
+    interpreter = statistics.median(times['interpreter']) * 1000
+    results = {}
+    for name, samples in times.items():
+        total = statistics.median(samples) * 1000
+        result = {'ms': round(total, 1), 'over_interpreter_ms': round(total - interpreter, 1)}
+        if name in STARTUP_BUDGET_MS:
+            result['budget_ms'] = STARTUP_BUDGET_MS[name]
+            result['within_budget'] = total - interpreter <= STARTUP_BUDGET_MS[name]
+        results[name] = result
+        budget = ''
+        if 'budget_ms' in result:
+            budget = f"  budget {result['budget_ms']} ms {'✅' if result['within_budget'] else '❌ OVER'}"
+        print(f"  startup {name:<18} {total:>8.1f} ms  (+{total - interpreter:.1f} ms){budget}",
+              file=sys.stderr, flush=True)
+    return results
+
+
+def _environment():
+    import reportlab
+    return {
+        'python': platform.python_version(),
+        'reportlab': reportlab.Version,
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run_benchmark(scenarios=None, kinds=KINDS, iterations=30, warmup=3):
+    """Run every scenario for every receipt kind; returns the results document"""
+    scenarios = scenarios or list(SCENARIOS)
+    results = []
+    with tempfile.TemporaryDirectory() as photo_dir:
+        photos = make_photos(photo_dir)
+        for name in scenarios:
+            for kind in kinds:
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    result = pool.submit(_run_scenario, name, kind, iterations, warmup, photos).result()
+                results.append(result)
+                print(f"  {name:<26} {kind:<9} p50 {result['latency_ms']['p50']:>8.2f} ms  "
+                      f"p99 {result['latency_ms']['p99']:>8.2f} ms  "
+                      f"{result['throughput_per_s']:>7.1f}/s  {result['peak_rss_mb']:>6.1f} MB  "
+                      f"{result['output_bytes']:>8} B", file=sys.stderr, flush=True)
+    
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': _environment(),
+        'iterations': iterations,
+        'startup': measure_startup(),
+        'results': results,
+    }
+
+
+def compare(baseline, current):
+    """Print p50 latency, throughput and size changes against a saved run"""
+    before = {(r['scenario'], r['kind']): r for r in baseline['results']}
+    print(f"{'scenario':<26} {'kind':<9} {'p50 ms':>18} {'throughput/s':>20} {'bytes':>20}")
+    for result in current['results']:
+        old = before.get((result['scenario'], result['kind']))
+        if not old:
+            continue
+        change = lambda a, b: f"{(b - a) / a * 100:+.1f}%" if a else 'n/a'
+        print(f"{result['scenario']:<26} {result['kind']:<9} "
+              f"{result['latency_ms']['p50']:>9.2f} {change(old['latency_ms']['p50'], result['latency_ms']['p50']):>8} "
+              f"{result['throughput_per_s']:>11.1f} {change(old['throughput_per_s'], result['throughput_per_s']):>8} "
+              f"{result['output_bytes']:>11} {change(old['output_bytes'], result['output_bytes']):>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark LocalFirst YYC receipt rendering')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), help='default: all')
+    parser.add_argument('--kinds', nargs='+', choices=KINDS, default=list(KINDS))
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--output', help='save results as JSON')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON results from an earlier run')
+    parser.add_argument('--scaling', action='store_true', help='time renders against item count instead')
+    parser.add_argument('--item-counts', nargs='+', type=int, default=list(SCALING_ITEM_COUNTS),
+                        help='item counts for --scaling')
+    parser.add_argument('--startup', action='store_true',
+                        help='only time CLI cold starts; exits 1 if one is over its budget')
+    args = parser.parse_args(argv)
+    
+    if args.startup:
+        startup = measure_startup()
+        json.dump({'environment': _environment(), 'startup': startup}, sys.stdout, indent=2)
+        print()
+        return 0 if all(result.get('within_budget', True) for result in startup.values()) else 1
+    
+    if args.scaling:
+        report = run_scaling(args.item_counts, args.kinds, min(args.iterations, 5))
+    else:
+        report = run_benchmark(args.scenarios, args.kinds, args.iterations, args.warmup)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results saved: {args.output}", file=sys.stderr)
+    if args.compare and not args.scaling:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+    if not args.output and not (args.compare and not args.scaling):
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
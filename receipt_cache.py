@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+LocalFirst YYC - Receipt Cache
+Keeps rendered receipts keyed by a hash of the order, so reprints and
+WhatsApp re-sends of the same order skip the layout work entirely
+"""
+
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+class SizedLRU:
+    """
+    Thread-safe LRU that keeps the total size of its values under max_bytes
+    The building block for the photo, region and receipt caches; subclasses
+    override _size() for values that are not bytes. A value bigger than
+    max_bytes on its own is handed back but not kept.
+    """
+    
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def _size(self, value):
+        return len(value)
+    
+    def get(self, key, create=None):
+        """
+        The value stored under key, or None on a miss
+        With create, a miss stores and returns create() instead. It runs
+        outside the lock, so a slow decode does not hold up other threads.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        if create is None:
+            return None
+        value = create()
+        if value is not None:
+            self.put(key, value)
+        return value
+    
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entries past max_bytes"""
+        size = self._size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= self._size(old)
+            self._entries[key] = value
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= self._size(old)
+                self.evictions += 1
+    
+    def stats(self):
+        """Hit/miss counters and current memory use"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+    
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+    
+    def __reduce__(self):
+        # Sent to another process as an empty cache with the same limit
+        return type(self), (self.max_bytes,)
+
+
+class ReceiptCache:
+    """
+    Size-bounded LRU of rendered receipts, with an optional on-disk tier
+    Keys cover the order, the receipt kind, the template version and output
+    options, plus the mtimes of any owner/driver photos, so a changed order,
+    template or photo never returns stale bytes. The generator keys on
+    Order.to_dict(), which holds only what a receipt shows: status fields
+    and print counters never reach the key.
+    Nothing cached may depend on when it was rendered: the generator keeps
+    the kitchen ticket's print time out of the cache (see
+    ReceiptGenerator.generate_kitchen_receipt).
+    """
+    
+    def __init__(self, max_bytes=64 * 1024 * 1024, directory=None, max_disk_bytes=1024 * 1024 * 1024):
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = SizedLRU(max_bytes)
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_evictions = 0
+        
+        self._disk_bytes = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._disk_bytes = sum(size for _, _, size in self._disk_files())
+    
+    def key(self, kind, order_data, template_version, **options):
+        """Canonical hash of everything that affects the rendered bytes"""
+        photos = []
+        for person in ('restaurant_owner', 'driver'):
+            path = (order_data.get(person) or {}).get('image')
+            if path:
+                try:
+                    photos.append((path, os.stat(path).st_mtime_ns))
+                except OSError:
+                    photos.append((path, None))
+        canonical = json.dumps(
+            [kind, template_version, options, order_data, photos],
+            sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+    
+    def get(self, key):
+        """Cached bytes for a key, or None"""
+        data = self._memory.get(key)
+        if data is not None:
+            return data
+        
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._memory.put(key, data)
+        return data
+    
+    def put(self, key, data):
+        """Store rendered bytes under a key"""
+        data = bytes(data)
+        self._memory.put(key, data)
+        self._write_disk(key, data)
+    
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+    
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # Mark as recently used for eviction
+        except OSError:
+            return None
+        return data
+    
+    def _write_disk(self, key, data):
+        """Write atomically so a reader never sees half a receipt"""
+        if not self.directory:
+            return
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        
+        with self._lock:
+            self._disk_bytes += len(data)
+            over = self._disk_bytes > self.max_disk_bytes
+        if over:
+            self._evict_disk()
+    
+    def _disk_files(self):
+        """(mtime, path, size) for every cached file"""
+        files = []
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, entry.path, stat.st_size))
+        return files
+    
+    def _evict_disk(self):
+        """Delete least recently used files until the disk tier is down to 90% of its budget"""
+        files = sorted(self._disk_files())
+        total = sum(size for _, _, size in files)
+        target = self.max_disk_bytes * 0.9
+        for _, path, size in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.disk_evictions += 1
+        with self._lock:
+            self._disk_bytes = total
+    
+    def stats(self):
+        """Hit/miss counters and memory/disk use"""
+        memory = self._memory.stats()
+        with self._lock:
+            return {
+                'hits': memory['hits'],
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': memory['evictions'] + self.disk_evictions,
+                'entries': memory['entries'],
+                'bytes': memory['bytes'],
+                'disk_bytes': self._disk_bytes,
+            }
+    
+    def clear(self):
+        """Forget everything held in memory and reset the counters (the disk tier is left alone)"""
+        self._memory.clear()
+        with self._lock:
+            self.disk_hits = self.misses = self.disk_evictions = 0
+    
+    def __reduce__(self):
+        # Sent to another process with the same settings: the disk tier is
+        # shared, the memory tier starts empty
+        return type(self), (self._memory.max_bytes, self.directory, self.max_disk_bytes)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+LocalFirst YYC - Receipt CLI
+Render one order's receipt from a JSON file or stdin, or just check orders
+
+Examples:
+    python receipt_cli.py kitchen order.json -o ticket.pdf
+    python receipt_cli.py kitchen order.json --format escpos > /dev/usb/lp0
+    python receipt_cli.py kitchen order.json --stations stations.json -o 'tickets/{station}.pdf'
+    cat order.json | python receipt_cli.py customer --format png -o receipt.png
+    python receipt_cli.py customer orders.jsonl -o 'receipts/{order_number}.pdf'
+    python receipt_cli.py kitchen orders.jsonl --combined -o backlog.pdf
+    python receipt_cli.py check orders.jsonl
+
+Startup budget: reportlab and Pillow take a few hundred milliseconds to
+import on a Pi, so they are only imported once there is something to render.
+--help and check stay within STARTUP_BUDGET_MS of a bare `python -c pass`;
+receipt_benchmark.py --startup measures this and fails when they do not.
+"""
+
+import argparse
+import os
+import sys
+
+# Milliseconds each light path may add to a bare interpreter start
+STARTUP_BUDGET_MS = {
+    'help': 60,
+    'check': 120,
+}
+
+FORMATS = {
+    'customer': ('pdf', 'png', 'jpeg'),
+    'kitchen': ('pdf', 'escpos'),
+    'card': ('png', 'jpeg'),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description='Render LocalFirst YYC receipts, or check orders without rendering them')
+    parser.add_argument('kind', choices=['customer', 'kitchen', 'card', 'check'],
+                        help='receipt to render, or check to only validate the orders')
+    parser.add_argument('input', nargs='?', default='-',
+                        help='order JSON, JSON array or JSON Lines file (default: stdin)')
+    parser.add_argument('-o', '--output', default='-',
+                        help="output file (default: stdout); with several orders use a pattern "
+                             "such as 'receipts/{order_number}.pdf'")
+    parser.add_argument('--format', dest='output_format',
+                        help='pdf, escpos (kitchen), png or jpeg (customer, card); default pdf, png for card')
+    parser.add_argument('--compact', action='store_true', help='small customer PDF for WhatsApp')
+    parser.add_argument('--continuous', action='store_true', help='kitchen PDF sized for roll-fed printers')
+    parser.add_argument('--fast', action='store_true', help='kitchen PDF drawn straight on the canvas')
+    parser.add_argument('--stations', metavar='FILE',
+                        help='JSON object mapping item names or categories to stations: one kitchen ticket '
+                             "per station, -o needs {station}")
+    parser.add_argument('--combined', action='store_true',
+                        help='all orders in one PDF, a page or ticket each (customer, kitchen)')
+    parser.add_argument('--width', type=int, help='image width in pixels')
+    parser.add_argument('--no-validate', dest='validate', action='store_false',
+                        help='render orders whose amounts do not add up')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    
+    if args.kind != 'check':
+        args.output_format = args.output_format or FORMATS[args.kind][0]
+        if args.output_format not in FORMATS[args.kind]:
+            parser.error(f"--format {args.output_format} is not available for {args.kind} receipts "
+                         f"(use {', '.join(FORMATS[args.kind])})")
+    
+    from order_model import OrderError, parse_json, parse_orders
+    
+    source = '<stdin>' if args.input == '-' else args.input
+    try:
+        if args.input == '-':
+            data = sys.stdin.buffer.read()
+        else:
+            with open(args.input, 'rb') as f:
+                data = f.read()
+        orders = parse_orders(data, source, validate=args.validate or args.kind == 'check')
+    except (OSError, OrderError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    
+    if args.kind == 'check':
+        print(f"✅ {len(orders)} order{'s' if len(orders) != 1 else ''} OK", file=sys.stderr)
+        return 0
+    if not orders:
+        print(f"❌ {source}: no orders", file=sys.stderr)
+        return 1
+    
+    to_stdout = args.output == '-'
+    if args.combined and (args.kind == 'card' or args.output_format != 'pdf' or args.stations):
+        parser.error('--combined makes one PDF of customer receipts or kitchen tickets (without --stations)')
+    if len(orders) > 1 and not args.combined and (to_stdout or '{' not in args.output):
+        parser.error(f"{source} has {len(orders)} orders: give -o a pattern such as '{{order_number}}.pdf'")
+    if args.stations:
+        if args.kind != 'kitchen':
+            parser.error('--stations is only available for kitchen tickets')
+        if '{station}' not in args.output and not (to_stdout and args.output_format == 'escpos'):
+            parser.error("--stations writes one ticket per station: give -o a pattern such as "
+                         "'{station}.pdf' (or send --format escpos to stdout)")
+        try:
+            with open(args.stations, 'rb') as f:
+                stations = parse_json(f.read())
+        except (OSError, ValueError) as e:
+            print(f"❌ {args.stations}: {e}", file=sys.stderr)
+            return 1
+        if not isinstance(stations, dict):
+            print(f"❌ {args.stations}: not a JSON object of item or category -> station", file=sys.stderr)
+            return 1
+        args.stations = stations
+    if to_stdout and sys.stdout.isatty():
+        parser.error('not writing a binary receipt to a terminal: redirect stdout or use -o')
+    
+    return render(args, orders)
+
+
+def render(args, orders):
+    """Render each order; reportlab and Pillow are imported here, not at startup"""
+    from receipt_generator import ReceiptGenerator
+    
+    generator = ReceiptGenerator()
+    if args.kind == 'customer':
+        render_order = generator.generate_customer_receipt
+        options = {'compact': args.compact, 'output_format': args.output_format}
+    elif args.kind == 'kitchen':
+        render_order = generator.generate_kitchen_receipt
+        options = {'continuous': args.continuous, 'fast': args.fast, 'output_format': args.output_format}
+    else:
+        render_order = generator.generate_order_card
+        options = {'output_format': args.output_format}
+    if args.width and args.output_format in ('png', 'jpeg'):
+        options['width'] = args.width
+    
+    if args.combined:
+        options = {'compact': args.compact} if args.kind == 'customer' else {}
+        if args.output == '-':
+            write(args, orders[0], generator.generate_combined_pdf(orders, kind=args.kind, **options))
+        else:
+            path = output_path(args, orders[0])
+            generator.generate_combined_pdf(orders, path, args.kind, **options)
+            print(f"✅ {path} ({len(orders)} orders)", file=sys.stderr)
+        return 0
+    
+    for order in orders:
+        if args.stations:
+            tickets = generator.generate_station_tickets(order, args.stations, **options)
+            for station, data in tickets.items():
+                write(args, order, data, station=station)
+        elif args.output == '-':
+            write(args, order, render_order(order, **options))
+        else:
+            path = output_path(args, order)
+            render_order(order, path, **options)
+            print(f"✅ {path}", file=sys.stderr)
+    return 0
+
+
+def output_path(args, order, **fields):
+    """Fill in the -o pattern for one order, creating its directory"""
+    from order_model import safe_filename
+    
+    fields = {name: safe_filename(value) for name, value in fields.items()}
+    path = args.output.format(order_number=safe_filename(order.order_number), kind=args.kind, **fields)
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def write(args, order, data, **fields):
+    """Send an already-rendered receipt to stdout or to its file"""
+    if args.output == '-':
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+        return
+    path = output_path(args, order, **fields)
+    with open(path, 'wb') as f:
+        f.write(data)
+    print(f"✅ {path}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
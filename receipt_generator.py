@@ -7,46 +7,510 @@ Creates PDF receipts for customers and kitchen/store
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.units import inch, mm
 from reportlab.lib import colors
+from reportlab.lib.utils import ImageReader
 from reportlab.pdfgen import canvas
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, HRFlowable
+from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer, Table, LongTable, TableStyle, Image,
+                                HRFlowable, Flowable, PageBreak)
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.lib.fonts import addMapping
+from reportlab import rl_config
+from PIL import Image as PILImage
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, wait
 from datetime import datetime
+from functools import lru_cache
+import io
+import itertools
 import os
+import threading
+
+import escpos
+from order_model import Order, as_order, format_money, safe_filename
+from receipt_cache import SizedLRU
+from receipt_image import SYMBOL_JOINERS, SYMBOL_RE, ImageReceiptBuilder, shared_region_cache
+from receipt_metrics import StageTimer
 
 # Receipt dimensions (80mm thermal printer width)
 THERMAL_WIDTH = 80 * mm
 THERMAL_HEIGHT = 200 * mm  # Variable, will extend
 
+# Tallest page PDF viewers and print drivers accept (14400pt); longer
+# continuous tickets are split into pages of this height
+MAX_PAGE_HEIGHT = 200 * inch
+
+# Orders with at least this many items (catering) take the large-order layout
+LARGE_ORDER_ITEMS = 40
+
+# Station for items the station map does not mention
+DEFAULT_STATION = 'kitchen'
+
+# Stands in for the print time on a cached kitchen PDF until it is served: as
+# wide in Helvetica as any real time ('#' and digits match, and A and P do), and
+# as long in bytes, so stamping the time in moves neither the text nor the xref
+PRINT_TIME_PLACEHOLDER = '##:##:## AM'
+
+# Bump whenever a template's output changes, so cached receipts are not reused
+TEMPLATE_VERSION = 3
+
+# Owner/driver photo card size, and the resolution photos are downscaled to
+PHOTO_SIZE = 1.2 * inch
+PHOTO_DPI = 200
+
+# Compact receipts (WhatsApp and the archive): photo (dpi, quality) steps, tried
+# in order until the PDF fits its size target, and the default target in bytes
+COMPACT_PHOTO_STEPS = ((150, 70), (120, 55), (96, 40))
+COMPACT_SIZE_TARGET = 24 * 1024
+
+# Fonts that have the emoji/symbol glyphs used on receipts, tried in order
+# (LOCALFIRST_SYMBOL_FONT overrides). Only the glyphs a receipt uses are embedded.
+SYMBOL_FONT_PATHS = [
+    '/usr/share/fonts/truetype/noto/NotoEmoji-Regular.ttf',
+    '/usr/share/fonts/truetype/ancient-scripts/Symbola_hint.ttf',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+]
+SYMBOL_FONT_NAME = 'ReceiptSymbols'
+
+# Receipt images for WhatsApp: output formats and default widths in pixels
+IMAGE_FORMATS = ('png', 'jpeg')
+IMAGE_WIDTH = 720
+CARD_IMAGE_WIDTH = 540
+
+
+class _BinaryStreams:
+    """
+    While held, reportlab writes streams as binary instead of ASCII85 text: a
+    quarter smaller, and skips its pure-Python encoder, which was most of the
+    time spent on photos. rl_config is process-wide, so the setting is only
+    changed while a receipt builds and restored once the last build ends.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._saved = None
+    
+    def __enter__(self):
+        with self._lock:
+            if not self._depth:
+                self._saved = rl_config.useA85
+                rl_config.useA85 = 0
+            self._depth += 1
+    
+    def __exit__(self, *exc):
+        with self._lock:
+            self._depth -= 1
+            if not self._depth:
+                rl_config.useA85 = self._saved
+
+
+_binary_streams = _BinaryStreams()
+
+
+class PhotoCache:
+    """
+    Process-wide LRU cache of owner/driver photos, downscaled to card size
+    Keyed by path + mtime + target pixels, so an edited photo is picked up
+    on the next receipt. Entries are stored as small JPEGs, which reportlab
+    embeds as-is, and the total size is kept under max_bytes.
+    """
+    
+    def __init__(self, max_bytes=32 * 1024 * 1024, quality=85):
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self._photos = SizedLRU(max_bytes)
+    
+    def get(self, path, size_px, quality=None):
+        """Return the downscaled JPEG bytes for a photo, or None if the file is missing"""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        
+        quality = quality or self.quality
+        return self._photos.get((path, mtime, size_px, quality),
+                                lambda: self._downscale(path, size_px, quality))
+    
+    def _downscale(self, path, size_px, quality):
+        """Decode a photo and shrink it to the square card size"""
+        with PILImage.open(path) as im:
+            im.draft('RGB', (size_px, size_px))  # Let the JPEG decoder skip detail we throw away
+            im = im.convert('RGB').resize((size_px, size_px), PILImage.LANCZOS)
+        buffer = io.BytesIO()
+        im.save(buffer, 'JPEG', quality=quality, optimize=True)
+        return buffer.getvalue()
+    
+    def stats(self):
+        """Hit/miss counters and current memory use"""
+        return self._photos.stats()
+    
+    def clear(self):
+        """Drop every cached photo and reset the counters"""
+        self._photos.clear()
+    
+    def __reduce__(self):
+        # Sent to a worker process as an empty cache with the same limits
+        return type(self), (self.max_bytes, self.quality)
+
+
+# Used by every ReceiptGenerator that is not given its own
+shared_photo_cache = PhotoCache()
+
+
+# (font name, covered code points, path) once registered, False if no font was found
+_symbol_font = None
+_symbol_font_lock = threading.Lock()
+
+
+def _register_symbol_font():
+    """Register the first available symbol font with reportlab, once per process"""
+    global _symbol_font
+    with _symbol_font_lock:
+        if _symbol_font is None:
+            _symbol_font = False
+            paths = [os.environ.get('LOCALFIRST_SYMBOL_FONT')] + SYMBOL_FONT_PATHS
+            for path in filter(None, paths):
+                if not os.path.exists(path):
+                    continue
+                try:
+                    font = TTFont(SYMBOL_FONT_NAME, path, asciiReadable=False)
+                except Exception as e:
+                    print(f"Error loading symbol font {path}: {e}")
+                    continue
+                pdfmetrics.registerFont(font)
+                # Symbols inside <b>/<i> use the same face
+                for bold in (0, 1):
+                    for italic in (0, 1):
+                        addMapping(SYMBOL_FONT_NAME, bold, italic, SYMBOL_FONT_NAME)
+                _symbol_font = (SYMBOL_FONT_NAME, frozenset(font.face.charToGlyph), path)
+                break
+        return _symbol_font
+
+
+def symbol_markup(text):
+    """
+    Paragraph markup that draws emoji with the symbol font instead of Helvetica
+    Symbols the font has no glyph for are dropped rather than printed as boxes.
+    """
+    font = _register_symbol_font()
+    
+    def replace(match):
+        chars = ''.join(c for c in match.group() if font and c not in SYMBOL_JOINERS and ord(c) in font[1])
+        return f'<font name="{font[0]}">{chars}</font>' if chars else ''
+    
+    return SYMBOL_RE.sub(replace, text)
+
+
+# Result of one order in a batch render (error is None on success,
+# pdf holds the bytes when the batch is rendered in memory)
+ReceiptResult = namedtuple('ReceiptResult', ['index', 'order_number', 'output_path', 'error', 'pdf'],
+                           defaults=(None,))
+
+# Table styles never change between receipts, so they are built once and shared
+ITEMS_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f0f0f0')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#333333')),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('ALIGN', (1, 0), (1, -1), 'CENTER'),
+    ('ALIGN', (2, 0), (2, -1), 'RIGHT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+    ('TOPPADDING', (0, 0), (-1, 0), 8),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
+    ('TOPPADDING', (0, 1), (-1, -1), 6),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#dddddd')),
+])
+
+TOTALS_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+    ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+    ('FONTSIZE', (0, 0), (-1, -2), 10),
+    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, -1), (-1, -1), 14),
+    ('TEXTCOLOR', (1, -1), (1, -1), colors.HexColor('#25D366')),
+    ('TOPPADDING', (0, -1), (-1, -1), 8),
+    ('LINEABOVE', (0, -1), (-1, -1), 1, colors.HexColor('#25D366')),
+])
+
+
+def _card_table_style(background, border):
+    """Style for a photo + story card"""
+    return TableStyle([
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LEFTPADDING', (1, 0), (1, 0), 12),
+        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor(background)),
+        ('BOX', (0, 0), (-1, -1), 2, colors.HexColor(border)),
+        ('TOPPADDING', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+        ('LEFTPADDING', (0, 0), (0, 0), 10),
+        ('RIGHTPADDING', (-1, 0), (-1, 0), 10),
+    ])
+
+
+OWNER_CARD_STYLE = _card_table_style('#fff8f0', '#e07020')
+DRIVER_CARD_STYLE = _card_table_style('#f0fff4', '#25D366')
+
+PAYMENT_DISPLAY = {
+    'cash': '💵 Cash on Delivery',
+    'visa': '💳 Visa',
+    'mastercard': '💳 Mastercard',
+    'debit': '🏦 Debit Card',
+    'amex': '💳 American Express',
+    'card': '💳 Card',
+}
+
+# Order card images list this many items, then "+ N more"
+CARD_ITEM_LINES = 3
+
+# Restaurant statements: one line per order, laid out this many orders per table
+STATEMENT_CHUNK_ROWS = 200
+STATEMENT_COLUMNS = ['Order', 'Time', 'Customer', 'Payment', 'Subtotal', 'Discount', 'Delivery', 'Tip', 'Total']
+STATEMENT_COL_WIDTHS = [0.9*inch, 1.2*inch, 1.6*inch, 0.7*inch, 0.7*inch, 0.65*inch, 0.6*inch, 0.5*inch, 0.65*inch]
+
+STATEMENT_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f0f0f0')),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('ALIGN', (4, 0), (-1, -1), 'RIGHT'),
+    ('TOPPADDING', (0, 0), (-1, -1), 2),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+    ('LINEBELOW', (0, 0), (-1, -1), 0.25, colors.HexColor('#dddddd')),
+])
+
+STATEMENT_TOTALS_STYLE = TableStyle([
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('LINEBELOW', (0, 0), (-1, 0), 1, colors.HexColor('#25D366')),
+    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ('LINEABOVE', (0, -1), (-1, -1), 1, colors.HexColor('#25D366')),
+])
+
+# One style sheet per generator class, shared by every instance in the process
+_style_sheets = {}
+_style_sheets_lock = threading.Lock()
+
+# Constant flowables are reused between receipts, but each thread keeps its own
+# copies because reportlab stores layout state on a flowable while drawing it
+_thread_static = threading.local()
+
+
+def _clear_postponed(flowables):
+    """
+    Ready flowables for reuse in another document: reportlab flags a flowable
+    it had to push to the next page and never clears the flag, so a reused one
+    would then fail as "too large"
+    """
+    for flowable in flowables:
+        flowable.__dict__.pop('_postponed', None)
+
+
+class _LazyStory(list):
+    """
+    Story list that pulls flowables from an iterator as the build consumes them
+    doc.build() only ever looks at the head of its list, so this lets it lay
+    out a story that is never held in memory all at once.
+    """
+    
+    def __init__(self, flowables):
+        super().__init__()
+        self._source = iter(flowables)
+    
+    def _fill(self):
+        if not list.__len__(self):
+            for flowable in self._source:
+                self.append(flowable)
+                break
+    
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+    
+    def __getitem__(self, index):
+        self._fill()
+        return list.__getitem__(self, index)
+
+
+class _StatementTotals:
+    """Running totals for a restaurant statement, in cents, gathered in one pass"""
+    __slots__ = ('orders', 'items', 'subtotal', 'discount', 'delivery_fee', 'tip', 'total',
+                 'cash_orders', 'cash_total', 'by_day')
+    
+    def __init__(self):
+        self.orders = self.items = 0
+        self.subtotal = self.discount = self.delivery_fee = self.tip = self.total = 0
+        self.cash_orders = self.cash_total = 0
+        self.by_day = OrderedDict()  # date -> [orders, total]
+    
+    def add(self, order):
+        self.orders += 1
+        self.items += sum(item.quantity for item in order.items)
+        self.subtotal += order.subtotal
+        self.discount += order.discount
+        self.delivery_fee += order.delivery_fee
+        self.tip += order.tip
+        self.total += order.total
+        if order.payment_method == 'cash':
+            self.cash_orders += 1
+            self.cash_total += order.total
+        day = self.by_day.setdefault(order.created_at.date(), [0, 0])
+        day[0] += 1
+        day[1] += order.total
+
+
+class _TicketRows:
+    """
+    Lines of a kitchen ticket for the canvas fast path, wrapped and ready to
+    draw: (font, size, text, align, indent, colour, space above)
+    """
+    __slots__ = ('width', 'rows', 'gap')
+    
+    def __init__(self, width):
+        self.width = width
+        self.rows = []
+        self.gap = 0  # Space owed above the next line
+    
+    def line(self, text, font='Helvetica', size=10, align='left', indent=0, colour=colors.black, space_after=2):
+        for wrapped in _wrap_text(text, font, size, self.width - indent):
+            self.rows.append((font, size, wrapped, align, indent, colour, self.gap))
+            self.gap = 0
+        self.gap = space_after
+    
+    def space(self, height):
+        self.gap += height
+    
+    def extend(self, other):
+        """Append another part of the ticket, keeping the space owed between them"""
+        if not other.rows:
+            self.gap += other.gap
+            return
+        first = other.rows[0]
+        self.rows.append(first[:6] + (first[6] + self.gap,))
+        self.rows.extend(other.rows[1:])
+        self.gap = other.gap
+
+
+class _SharedImage(Image):
+    """
+    Image flowable drawing an ImageReader that other flowables share
+    Image only takes a path or file and opens its own reader from it; handing
+    it the shared one first means every receipt draws the same decoded photo.
+    """
+    
+    def __init__(self, reader, width=None, height=None):
+        self._img = reader
+        super().__init__(reader.fp, width, height)
+
+
+def _card_image(photo):
+    """Card-sized Image flowable for a photo from _load_card_photo"""
+    if isinstance(photo, ImageReader):
+        return _SharedImage(photo, width=PHOTO_SIZE, height=PHOTO_SIZE)
+    return Image(photo, width=PHOTO_SIZE, height=PHOTO_SIZE)
+
+
+class _OrderBookmark(Flowable):
+    """Zero-size flowable marking where an order starts in a combined PDF"""
+    
+    def __init__(self, key, title):
+        super().__init__()
+        self.key = key
+        self.title = title
+    
+    def wrap(self, available_width, available_height):
+        return 0, 0
+    
+    def draw(self):
+        self.canv.bookmarkPage(self.key)
+        self.canv.addOutlineEntry(self.title, self.key)
+
+
 class ReceiptGenerator:
     """Generate PDF receipts for LocalFirst YYC"""
     
-    def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self._create_custom_styles()
+    def __init__(self, photo_cache=None, metrics=None, receipt_cache=None, region_cache=None):
+        """
+        photo_cache: PhotoCache to use instead of the process-wide one
+        metrics: called with a dict of stage timings, page count, byte size
+        and photo cache stats after every render (see receipt_metrics)
+        receipt_cache: ReceiptCache that serves repeat renders of the same order
+        region_cache: receipt_image.RegionCache for drawn owner/driver cards,
+        instead of the process-wide one
+        """
+        self.photo_cache = photo_cache or shared_photo_cache
+        self.region_cache = region_cache or shared_region_cache
+        self.metrics = metrics
+        self.receipt_cache = receipt_cache
+        self._styles = None
+    
+    def worker_config(self):
+        """
+        Constructor arguments for init_worker, so a worker process's generator
+        is set up like this one. Caches arrive empty with the same settings (a
+        receipt_cache directory is shared with the worker) and metrics=True
+        stands in for the hook: call_worker hands the metrics back instead, for
+        replay_metrics. Subclasses with their own arguments extend this.
+        """
+        return {
+            'photo_cache': None if self.photo_cache is shared_photo_cache else self.photo_cache,
+            'region_cache': None if self.region_cache is shared_region_cache else self.region_cache,
+            'receipt_cache': self.receipt_cache,
+            'metrics': bool(self.metrics),
+        }
+    
+    def replay_metrics(self, metrics):
+        """Pass metrics a worker process gathered (see call_worker) to this generator's hook"""
+        if not self.metrics:
+            return
+        for render_metrics in metrics:
+            try:
+                self.metrics(render_metrics)
+            except Exception as e:
+                print(f"Error reporting receipt metrics: {e}")
+    
+    @property
+    def styles(self):
+        """
+        Paragraph styles, built when the first PDF is laid out and shared by
+        every generator of this class; ESC/POS, image and cached renders never
+        pay for them
+        """
+        if self._styles is None:
+            with _style_sheets_lock:
+                styles = _style_sheets.get(type(self))
+                if styles is None:
+                    # Finished before it is published, so no thread sees a half-built sheet
+                    styles = getSampleStyleSheet()
+                    self._create_custom_styles(styles)
+                    _style_sheets[type(self)] = styles
+            self._styles = styles
+        return self._styles
     
-    def _create_custom_styles(self):
-        """Create custom paragraph styles"""
-        self.styles.add(ParagraphStyle(
+    def _create_custom_styles(self, styles):
+        """Add the custom paragraph styles to a sample style sheet"""
+        styles.add(ParagraphStyle(
             'ReceiptTitle',
-            parent=self.styles['Heading1'],
+            parent=styles['Heading1'],
             fontSize=18,
             alignment=TA_CENTER,
             spaceAfter=6,
             textColor=colors.HexColor('#25D366')
         ))
         
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             'ReceiptSubtitle',
-            parent=self.styles['Normal'],
+            parent=styles['Normal'],
             fontSize=10,
             alignment=TA_CENTER,
             textColor=colors.grey
         ))
         
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             'StoryText',
-            parent=self.styles['Normal'],
+            parent=styles['Normal'],
             fontSize=9,
             alignment=TA_LEFT,
             textColor=colors.HexColor('#444444'),
@@ -55,417 +519,1517 @@ class ReceiptGenerator:
             spaceAfter=6
         ))
         
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             'ItemName',
-            parent=self.styles['Normal'],
+            parent=styles['Normal'],
             fontSize=11,
             alignment=TA_LEFT
         ))
         
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             'SectionHeader',
-            parent=self.styles['Heading2'],
+            parent=styles['Heading2'],
             fontSize=12,
             textColor=colors.HexColor('#25D366'),
             spaceBefore=12,
             spaceAfter=6
         ))
-
-    def generate_customer_receipt(self, order_data, output_path):
+        
+        styles.add(ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=9,
+            alignment=TA_CENTER,
+            textColor=colors.grey
+        ))
+        
+        styles.add(ParagraphStyle(
+            'ThankYou',
+            parent=styles['Normal'],
+            fontSize=12,
+            alignment=TA_CENTER,
+            textColor=colors.HexColor('#25D366')
+        ))
+        
+        styles.add(ParagraphStyle(
+            'TotalsLabel',
+            parent=styles['Normal'],
+            fontSize=10,
+            alignment=TA_RIGHT
+        ))
+        
+        # Styles for kitchen receipt (larger, clearer)
+        styles.add(ParagraphStyle(
+            'KitchenTitle',
+            fontSize=16,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold',
+            spaceAfter=4
+        ))
+        
+        styles.add(ParagraphStyle(
+            'KitchenOrder',
+            fontSize=24,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold',
+            spaceAfter=8,
+            textColor=colors.black
+        ))
+        
+        styles.add(ParagraphStyle(
+            'KitchenItem',
+            fontSize=14,
+            alignment=TA_LEFT,
+            fontName='Helvetica-Bold',
+            spaceAfter=4
+        ))
+        
+        styles.add(ParagraphStyle(
+            'KitchenNormal',
+            fontSize=10,
+            alignment=TA_LEFT,
+            spaceAfter=2
+        ))
+        
+        # One paragraph per item on large kitchen tickets: the item line is
+        # taller than its details, and is never left alone at the foot of a page
+        styles.add(ParagraphStyle(
+            'KitchenItemBlock',
+            parent=styles['KitchenNormal'],
+            autoLeading='max',
+            allowOrphans=0,
+            spaceAfter=10
+        ))
+        
+        styles.add(ParagraphStyle(
+            'PrintTime',
+            fontSize=8,
+            alignment=TA_CENTER,
+            textColor=colors.grey
+        ))
+    
+    def _static_flowables(self, compact=False):
+        """Header, impact and footer flowables that are the same on every receipt"""
+        by_styles = _thread_static.__dict__.setdefault('by_styles', {})
+        static = by_styles.get((id(self.styles), compact))
+        if static is None:
+            styles = self.styles
+            text = symbol_markup if compact else str
+            static = {
+                # Customer receipt
+                'title': Paragraph(text("🍕 LocalFirst YYC"), styles['ReceiptTitle']),
+                'tagline': Paragraph("Support Local. Eat Amazing.", styles['ReceiptSubtitle']),
+                'rule': HRFlowable(width="100%", thickness=1, color=colors.HexColor('#25D366')),
+                'delivery_header': Paragraph(text("📋 <b>DELIVERY DETAILS</b>"), styles['SectionHeader']),
+                'impact_rule': HRFlowable(width="100%", thickness=2, color=colors.HexColor('#25D366')),
+                'impact_header': Paragraph(text("💚 <b>YOUR IMPACT TODAY</b>"), styles['SectionHeader']),
+                'impact_intro': Paragraph(
+                    "<b>By ordering through LocalFirst YYC, you've helped:</b>",
+                    styles['Normal']
+                ),
+                'impact_list': Paragraph(
+                    "• Keep 100% of your dollars in Calgary<br/>"
+                    "• Support a family-owned business<br/>"
+                    "• Help a local driver earn fair wages<br/>"
+                    "• Build a stronger community",
+                    styles['StoryText']
+                ),
+                'footer_rule': HRFlowable(width="100%", thickness=1, color=colors.grey),
+                'contact': Paragraph(
+                    "Questions? Contact us at (403) 826-5529<br/>"
+                    "or message us on WhatsApp",
+                    styles['Footer']
+                ),
+                'thank_you': Paragraph(text("<b>Thank you for supporting local! 💚</b>"), styles['ThankYou']),
+                
+                # Kitchen receipt
+                'kitchen_brand': Paragraph(text("🍕 LOCALFIRST YYC"), styles['KitchenTitle']),
+                'kitchen_banner': Paragraph("*** KITCHEN ORDER ***", styles['KitchenTitle']),
+                'kitchen_dashes': Paragraph("-" * 30, styles['KitchenNormal']),
+                'kitchen_items_header': Paragraph("ORDER ITEMS:", styles['KitchenItem']),
+                'kitchen_delivery_header': Paragraph("DELIVERY TO:", styles['KitchenItem']),
+                'kitchen_cod': Paragraph(text("⚠️ CASH ON DELIVERY ⚠️"), styles['KitchenItem']),
+                'kitchen_paid': Paragraph(text("✓ PAID ONLINE"), styles['KitchenItem']),
+            }
+            by_styles[(id(self.styles), compact)] = static
+        else:
+            _clear_postponed(static.values())
+        return static
+    
+    def generate_customer_receipt(self, order_data, output_path=None, use_cache=True, compact=False,
+                                  size_target=COMPACT_SIZE_TARGET, output_format='pdf', width=IMAGE_WIDTH):
         """
         Generate customer receipt with story and PHOTOS
+        output_path can be a file path, a writable binary file object,
+        or None to get the PDF back as bytes
+        order_data can be the app's order dict or an order_model.Order
+        use_cache=False renders fresh even when a receipt_cache is set
+        compact=True makes a small PDF for WhatsApp and the archive: photos are
+        re-encoded at a lower resolution and quality (stepping down through
+        COMPACT_PHOTO_STEPS until the PDF is at most size_target bytes; None
+        keeps the first step) and emoji are drawn with a subsetted symbol font
+        output_format='png' or 'jpeg' draws the receipt straight to an image
+        width pixels wide, for WhatsApp image messages (compact does not apply)
         """
-        doc = SimpleDocTemplate(
-            output_path,
+        if output_format != 'pdf' and output_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unknown output format: {output_format}")
+        order = as_order(order_data)
+        if use_cache and self.receipt_cache is not None:
+            if output_format != 'pdf':
+                options = {'width': width}
+            else:
+                options = {'compact': True, 'size_target': size_target} if compact else {}
+            return self._render_cached('customer', order, output_path, output_format,
+                                       lambda: self.generate_customer_receipt(order, use_cache=False,
+                                                                              compact=compact,
+                                                                              size_target=size_target,
+                                                                              output_format=output_format,
+                                                                              width=width),
+                                       **options)
+        if output_format != 'pdf':
+            return self._customer_receipt_image(order, output_path, output_format, width)
+        if not compact:
+            return self._customer_receipt(order, output_path)
+        
+        steps = COMPACT_PHOTO_STEPS if size_target else COMPACT_PHOTO_STEPS[:1]
+        for photo_dpi, photo_quality in steps:
+            data = self._customer_receipt(order, None, compact=True, photo_dpi=photo_dpi,
+                                          photo_quality=photo_quality)
+            if not size_target or len(data) <= size_target:
+                break
+        else:
+            print(f"⚠️ Compact receipt for order {order.order_number} is "
+                  f"{len(data)} bytes, over the {size_target} byte target")
+        return self._write_output(data, output_path)
+    
+    def _customer_receipt(self, order, output_path, compact=False, photo_dpi=PHOTO_DPI, photo_quality=None):
+        """Lay out and build one customer receipt (see generate_customer_receipt)"""
+        timer = StageTimer()
+        doc = self._customer_doc(output_path)
+        story = self._customer_story(order, timer, compact, photo_dpi, photo_quality)
+        
+        # Build PDF
+        return self._build(doc, story, output_path, timer, 'customer', order, compact=compact)
+    
+    def _customer_doc(self, output_path):
+        """Document template for customer receipts on letter pages"""
+        return SimpleDocTemplate(
+            self._output_target(output_path),
             pagesize=letter,
             rightMargin=0.5*inch,
             leftMargin=0.5*inch,
             topMargin=0.5*inch,
-            bottomMargin=0.5*inch
+            bottomMargin=0.5*inch,
+            pageCompression=1
         )
-        
+    
+    def _customer_story(self, order, timer, compact=False, photo_dpi=PHOTO_DPI, photo_quality=None, photos=None):
+        """
+        Customer receipt flowables for one order
+        photos, when given, is a dict shared by every receipt in one document
+        (see _load_card_photo)
+        """
+        static = self._static_flowables(compact)
+        text = symbol_markup if compact else str
         story = []
         
         # Header
-        story.append(Paragraph("🍕 LocalFirst YYC", self.styles['ReceiptTitle']))
-        story.append(Paragraph("Support Local. Eat Amazing.", self.styles['ReceiptSubtitle']))
+        story.append(static['title'])
+        story.append(static['tagline'])
         story.append(Spacer(1, 12))
         
         # Order info
-        story.append(Paragraph(f"<b>Order #{order_data.get('order_number', 'N/A')}</b>", self.styles['Normal']))
-        story.append(Paragraph(
-            datetime.fromisoformat(order_data.get('created_at', datetime.now().isoformat())).strftime('%B %d, %Y at %I:%M %p'),
-            self.styles['ReceiptSubtitle']
-        ))
+        story.append(Paragraph(f"<b>Order #{order.order_number}</b>", self.styles['Normal']))
+        story.append(Paragraph(order.created_at.strftime('%B %d, %Y at %I:%M %p'), self.styles['ReceiptSubtitle']))
         story.append(Spacer(1, 12))
         
         # Horizontal line
-        story.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor('#25D366')))
+        story.append(static['rule'])
         story.append(Spacer(1, 12))
         
         # Customer info
-        story.append(Paragraph("📋 <b>DELIVERY DETAILS</b>", self.styles['SectionHeader']))
-        story.append(Paragraph(f"<b>{order_data.get('customer_name', 'Guest')}</b>", self.styles['Normal']))
-        story.append(Paragraph(f"📱 {self._format_phone(order_data.get('customer_phone', ''))}", self.styles['Normal']))
-        story.append(Paragraph(f"📍 {order_data.get('customer_address', 'N/A')}", self.styles['Normal']))
+        story.append(static['delivery_header'])
+        story.append(Paragraph(f"<b>{order.customer_name}</b>", self.styles['Normal']))
+        story.append(Paragraph(text(f"📱 {order.customer_phone}"), self.styles['Normal']))
+        story.append(Paragraph(text(f"📍 {order.customer_address}"), self.styles['Normal']))
         story.append(Spacer(1, 12))
         
         # Restaurant info
-        story.append(Paragraph(f"🍽️ <b>FROM: {order_data.get('restaurant_name', 'Restaurant')}</b>", self.styles['SectionHeader']))
+        story.append(Paragraph(text(f"🍽️ <b>FROM: {order.restaurant_name}</b>"), self.styles['SectionHeader']))
         story.append(Spacer(1, 6))
         
         # Order items table
+        items = order.items
         items_data = [['Item', 'Qty', 'Price']]
-        for item in order_data.get('items', []):
-            items_data.append([
-                item.get('name', 'Item'),
-                str(item.get('quantity', 1)),
-                f"${item.get('price', 0):.2f}"
-            ])
+        for item in items:
+            items_data.append([item.name, str(item.quantity), format_money(item.price)])
         
-        items_table = Table(items_data, colWidths=[4*inch, 0.5*inch, 1*inch])
-        items_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f0f0f0')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#333333')),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('ALIGN', (1, 0), (1, -1), 'CENTER'),
-            ('ALIGN', (2, 0), (2, -1), 'RIGHT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('TOPPADDING', (0, 0), (-1, 0), 8),
-            ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
-            ('TOPPADDING', (0, 1), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#dddddd')),
-        ]))
+        with timer.stage('tables'):
+            # Catering orders run over several pages: LongTable lays rows out without
+            # re-measuring the whole table at every split, and the header repeats
+            table_class = LongTable if len(items) >= LARGE_ORDER_ITEMS else Table
+            items_table = table_class(items_data, colWidths=[4*inch, 0.5*inch, 1*inch], repeatRows=1)
+            items_table.setStyle(ITEMS_TABLE_STYLE)
         story.append(items_table)
         story.append(Spacer(1, 12))
         
         # Totals
-        subtotal = order_data.get('subtotal', 0)
-        discount = order_data.get('discount', 0)
-        delivery_fee = order_data.get('delivery_fee', 0)
-        tip = order_data.get('tip', 0)
-        total = order_data.get('total', subtotal)
-        
         totals_data = [
-            ['Subtotal', f"${subtotal:.2f}"],
+            ['Subtotal', format_money(order.subtotal)],
         ]
         
-        if discount > 0:
-            discount_type = order_data.get('discount_type', 'Discount')
-            if discount_type == 'first_order':
-                totals_data.append(['🎉 First Order (10% OFF)', f"-${discount:.2f}"])
+        if order.discount > 0:
+            if order.discount_type == 'first_order':
+                label = '🎉 First Order (10% OFF)'
+                if compact:
+                    label = Paragraph(text(label), self.styles['TotalsLabel'])
+                totals_data.append([label, f"-{format_money(order.discount)}"])
             else:
-                totals_data.append([f'Discount', f"-${discount:.2f}"])
+                totals_data.append([f'Discount', f"-{format_money(order.discount)}"])
         
-        if delivery_fee > 0:
-            totals_data.append(['Delivery Fee', f"${delivery_fee:.2f}"])
+        if order.delivery_fee > 0:
+            totals_data.append(['Delivery Fee', format_money(order.delivery_fee)])
         else:
             totals_data.append(['Delivery', 'FREE'])
         
-        if tip > 0:
-            totals_data.append(['Driver Tip', f"${tip:.2f}"])
+        if order.tip > 0:
+            totals_data.append(['Driver Tip', format_money(order.tip)])
         
         totals_data.append(['', ''])  # Spacer row
-        totals_data.append(['TOTAL', f"${total:.2f}"])
-        
-        totals_table = Table(totals_data, colWidths=[4.5*inch, 1*inch])
-        totals_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-            ('FONTSIZE', (0, 0), (-1, -2), 10),
-            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, -1), (-1, -1), 14),
-            ('TEXTCOLOR', (1, -1), (1, -1), colors.HexColor('#25D366')),
-            ('TOPPADDING', (0, -1), (-1, -1), 8),
-            ('LINEABOVE', (0, -1), (-1, -1), 1, colors.HexColor('#25D366')),
-        ]))
+        totals_data.append(['TOTAL', format_money(order.total)])
+        
+        with timer.stage('tables'):
+            totals_table = Table(totals_data, colWidths=[4.5*inch, 1*inch])
+            totals_table.setStyle(TOTALS_TABLE_STYLE)
         story.append(totals_table)
         story.append(Spacer(1, 12))
         
         # Payment method
-        payment_method = order_data.get('payment_method', 'card')
-        payment_display = {
-            'cash': '💵 Cash on Delivery',
-            'visa': '💳 Visa',
-            'mastercard': '💳 Mastercard',
-            'debit': '🏦 Debit Card',
-            'amex': '💳 American Express'
-        }.get(payment_method, '💳 Card')
-        
-        story.append(Paragraph(f"<b>Payment:</b> {payment_display}", self.styles['Normal']))
+        payment_display = PAYMENT_DISPLAY.get(order.payment_method, PAYMENT_DISPLAY['card'])
+        story.append(Paragraph(text(f"<b>Payment:</b> {payment_display}"), self.styles['Normal']))
         story.append(Spacer(1, 20))
         
         # Horizontal line
-        story.append(HRFlowable(width="100%", thickness=2, color=colors.HexColor('#25D366')))
+        story.append(static['impact_rule'])
         story.append(Spacer(1, 12))
         
         # THE STORY SECTION - This is what makes LocalFirst special!
-        story.append(Paragraph("💚 <b>YOUR IMPACT TODAY</b>", self.styles['SectionHeader']))
+        story.append(static['impact_header'])
         story.append(Spacer(1, 10))
         
         # Restaurant owner story WITH PHOTO
-        owner = order_data.get('restaurant_owner', {})
+        owner = order.restaurant_owner
         if owner:
-            owner_image_path = owner.get('image', '')
-            owner_name = owner.get('name', 'the Owner')
-            owner_story = owner.get('story', 'Thank you for supporting our local restaurant!')
+            owner_image_path = owner.image
+            owner_name = owner.name or 'the Owner'
+            owner_story = owner.story or 'Thank you for supporting our local restaurant!'
             
             # Create owner card with photo
-            if owner_image_path and os.path.exists(owner_image_path):
+            with timer.stage('images'):
+                owner_photo = self._load_card_photo(owner_image_path, 'owner', photo_dpi, photo_quality, photos)
+            if owner_photo:
                 try:
-                    owner_img = Image(owner_image_path, width=1.2*inch, height=1.2*inch)
+                    owner_img = _card_image(owner_photo)
                     owner_img.hAlign = 'LEFT'
                     
                     owner_text = f'''<b>👩‍🍳 Meet {owner_name}</b><br/><br/>
                     <i>"{owner_story}"</i>'''
                     
-                    owner_data = [[owner_img, Paragraph(owner_text, self.styles['StoryText'])]]
+                    owner_data = [[owner_img, Paragraph(text(owner_text), self.styles['StoryText'])]]
                     
-                    owner_table = Table(owner_data, colWidths=[1.4*inch, 4.1*inch])
-                    owner_table.setStyle(TableStyle([
-                        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                        ('LEFTPADDING', (1, 0), (1, 0), 12),
-                        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#fff8f0')),
-                        ('BOX', (0, 0), (-1, -1), 2, colors.HexColor('#e07020')),
-                        ('TOPPADDING', (0, 0), (-1, -1), 10),
-                        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-                        ('LEFTPADDING', (0, 0), (0, 0), 10),
-                        ('RIGHTPADDING', (-1, 0), (-1, 0), 10),
-                    ]))
+                    with timer.stage('tables'):
+                        owner_table = Table(owner_data, colWidths=[1.4*inch, 4.1*inch])
+                        owner_table.setStyle(OWNER_CARD_STYLE)
                     story.append(owner_table)
                 except Exception as e:
                     print(f"Error loading owner image: {e}")
-                    story.append(Paragraph(f"<b>👩‍🍳 Meet {owner_name}</b>", self.styles['Normal']))
-                    story.append(Paragraph(f"<i>\"{owner_story}\"</i>", self.styles['StoryText']))
+                    story.append(Paragraph(text(f"<b>👩‍🍳 Meet {owner_name}</b>"), self.styles['Normal']))
+                    story.append(Paragraph(text(f"<i>\"{owner_story}\"</i>"), self.styles['StoryText']))
             else:
-                story.append(Paragraph(f"<b>👩‍🍳 Meet {owner_name}</b>", self.styles['Normal']))
-                story.append(Paragraph(f"<i>\"{owner_story}\"</i>", self.styles['StoryText']))
+                story.append(Paragraph(text(f"<b>👩‍🍳 Meet {owner_name}</b>"), self.styles['Normal']))
+                story.append(Paragraph(text(f"<i>\"{owner_story}\"</i>"), self.styles['StoryText']))
             
             story.append(Spacer(1, 12))
         
         # Driver story WITH PHOTO
-        driver = order_data.get('driver', {})
+        driver = order.driver
         if driver:
-            driver_image_path = driver.get('image', '')
-            driver_name = driver.get('name', 'Driver')
-            driver_story = driver.get('story', 'Thank you for the tip!')
+            driver_image_path = driver.image
+            driver_name = driver.name or 'Driver'
+            driver_story = driver.story or 'Thank you for the tip!'
             
-            if driver_image_path and os.path.exists(driver_image_path):
+            with timer.stage('images'):
+                driver_photo = self._load_card_photo(driver_image_path, 'driver', photo_dpi, photo_quality, photos)
+            if driver_photo:
                 try:
-                    driver_img = Image(driver_image_path, width=1.2*inch, height=1.2*inch)
+                    driver_img = _card_image(driver_photo)
                     driver_img.hAlign = 'LEFT'
                     
                     driver_text = f'''<b>🚗 Your Driver: {driver_name}</b><br/><br/>
                     <i>"{driver_story}"</i>'''
                     
-                    driver_data = [[driver_img, Paragraph(driver_text, self.styles['StoryText'])]]
+                    driver_data = [[driver_img, Paragraph(text(driver_text), self.styles['StoryText'])]]
                     
-                    driver_table = Table(driver_data, colWidths=[1.4*inch, 4.1*inch])
-                    driver_table.setStyle(TableStyle([
-                        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                        ('LEFTPADDING', (1, 0), (1, 0), 12),
-                        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f0fff4')),
-                        ('BOX', (0, 0), (-1, -1), 2, colors.HexColor('#25D366')),
-                        ('TOPPADDING', (0, 0), (-1, -1), 10),
-                        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-                        ('LEFTPADDING', (0, 0), (0, 0), 10),
-                        ('RIGHTPADDING', (-1, 0), (-1, 0), 10),
-                    ]))
+                    with timer.stage('tables'):
+                        driver_table = Table(driver_data, colWidths=[1.4*inch, 4.1*inch])
+                        driver_table.setStyle(DRIVER_CARD_STYLE)
                     story.append(driver_table)
                 except Exception as e:
                     print(f"Error loading driver image: {e}")
-                    story.append(Paragraph(f"<b>🚗 Your Driver: {driver_name}</b>", self.styles['Normal']))
-                    story.append(Paragraph(f"<i>\"{driver_story}\"</i>", self.styles['StoryText']))
+                    story.append(Paragraph(text(f"<b>🚗 Your Driver: {driver_name}</b>"), self.styles['Normal']))
+                    story.append(Paragraph(text(f"<i>\"{driver_story}\"</i>"), self.styles['StoryText']))
             else:
-                story.append(Paragraph(f"<b>🚗 Your Driver: {driver_name}</b>", self.styles['Normal']))
-                story.append(Paragraph(f"<i>\"{driver_story}\"</i>", self.styles['StoryText']))
+                story.append(Paragraph(text(f"<b>🚗 Your Driver: {driver_name}</b>"), self.styles['Normal']))
+                story.append(Paragraph(text(f"<i>\"{driver_story}\"</i>"), self.styles['StoryText']))
             
             story.append(Spacer(1, 12))
         
         # Community impact message
         story.append(Spacer(1, 8))
-        story.append(Paragraph(
-            "<b>By ordering through LocalFirst YYC, you've helped:</b>",
-            self.styles['Normal']
-        ))
-        story.append(Paragraph(
-            "• Keep 100% of your dollars in Calgary<br/>"
-            "• Support a family-owned business<br/>"
-            "• Help a local driver earn fair wages<br/>"
-            "• Build a stronger community",
-            self.styles['StoryText']
-        ))
+        story.append(static['impact_intro'])
+        story.append(static['impact_list'])
         
         story.append(Spacer(1, 20))
         
         # Footer
-        story.append(HRFlowable(width="100%", thickness=1, color=colors.grey))
+        story.append(static['footer_rule'])
         story.append(Spacer(1, 8))
-        story.append(Paragraph(
-            "Questions? Contact us at (403) 826-5529<br/>"
-            "or message us on WhatsApp",
-            ParagraphStyle('Footer', parent=self.styles['Normal'], fontSize=9, alignment=TA_CENTER, textColor=colors.grey)
-        ))
+        story.append(static['contact'])
         story.append(Spacer(1, 8))
-        story.append(Paragraph(
-            "<b>Thank you for supporting local! 💚</b>",
-            ParagraphStyle('ThankYou', parent=self.styles['Normal'], fontSize=12, alignment=TA_CENTER, textColor=colors.HexColor('#25D366'))
-        ))
+        story.append(static['thank_you'])
+        return story
+    
+    def _customer_receipt_image(self, order, output_path, image_format, width):
+        """Draw the customer receipt straight to PNG/JPEG (see generate_customer_receipt)"""
+        timer = StageTimer()
+        receipt = ImageReceiptBuilder(width, self._image_symbol_font())
+        green = '#25D366'
         
-        # Build PDF
-        doc.build(story)
-        return output_path
-
-    def generate_kitchen_receipt(self, order_data, output_path):
+        # Header
+        receipt.region(self._static_region(receipt, 'header'), full_width=True, space_after=12)
+        
+        # Order info
+        receipt.text(f"Order #{order.order_number}", bold=True)
+        receipt.text(order.created_at.strftime('%B %d, %Y at %I:%M %p'), size=10, color='#808080', align='center')
+        receipt.rule(green, space=10)
+        
+        # Customer info
+        receipt.text("📋 DELIVERY DETAILS", size=12, bold=True, color=green, space_after=6)
+        receipt.text(order.customer_name, bold=True)
+        receipt.text(f"📱 {order.customer_phone}")
+        receipt.text(f"📍 {order.customer_address}", space_after=12)
+        
+        # Restaurant info
+        receipt.text(f"🍽️ FROM: {order.restaurant_name}", size=12, bold=True, color=green, space_after=8)
+        
+        # Order items table
+        with timer.stage('tables'):
+            widths = (0.66, 0.12, 0.22)
+            aligns = ('left', 'center', 'right')
+            receipt.columns(['Item', 'Qty', 'Price'], widths, aligns, bold=True, color='#333333',
+                            background='#f0f0f0', padding=8, line_below=('#dddddd', 1))
+            for item in order.items:
+                receipt.columns([item.name, str(item.quantity), format_money(item.price)], widths, aligns,
+                                line_below=('#dddddd', 1))
+            receipt.space(12)
+            
+            # Totals
+            widths = (0.8, 0.2)
+            aligns = ('right', 'right')
+            receipt.columns(['Subtotal', format_money(order.subtotal)], widths, aligns, padding=3)
+            if order.discount > 0:
+                label = '🎉 First Order (10% OFF)' if order.discount_type == 'first_order' else 'Discount'
+                receipt.columns([label, f"-{format_money(order.discount)}"], widths, aligns, padding=3)
+            if order.delivery_fee > 0:
+                receipt.columns(['Delivery Fee', format_money(order.delivery_fee)], widths, aligns, padding=3)
+            else:
+                receipt.columns(['Delivery', 'FREE'], widths, aligns, padding=3)
+            if order.tip > 0:
+                receipt.columns(['Driver Tip', format_money(order.tip)], widths, aligns, padding=3)
+            receipt.space(6)
+            receipt.columns(['TOTAL', format_money(order.total)], widths, aligns, size=14, bold=True,
+                            colors=['#000000', green], padding=8, line_above=(green, 1))
+        receipt.space(12)
+        
+        # Payment method
+        receipt.text(f"Payment: {PAYMENT_DISPLAY.get(order.payment_method, PAYMENT_DISPLAY['card'])}",
+                     space_after=12)
+        
+        # THE STORY SECTION
+        receipt.rule(green, thickness=2, space=6)
+        receipt.text("💚 YOUR IMPACT TODAY", size=12, bold=True, color=green, space_after=10)
+        with timer.stage('images'):
+            for card in self._person_card_regions(receipt, order):
+                receipt.region(card, space_after=12)
+        
+        # Community impact message and footer
+        receipt.region(self._static_region(receipt, 'footer'), full_width=True, space_after=0)
+        
+        with timer.stage('build'):
+            data = receipt.getvalue(image_format)
+        self._report_metrics(timer, 'customer', order, output_format=image_format, size=len(data))
+        return self._write_output(data, output_path)
+    
+    def generate_order_card(self, order_data, output_path=None, output_format='png', width=CARD_IMAGE_WIDTH,
+                            use_cache=True):
+        """
+        Small order summary image for a WhatsApp confirmation message:
+        restaurant, items at a glance, total, payment and the driver
+        order_data, output_path and use_cache work the same as in generate_customer_receipt
+        """
+        if output_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unknown output format: {output_format}")
+        order = as_order(order_data)
+        if use_cache and self.receipt_cache is not None:
+            return self._render_cached('card', order, output_path, output_format,
+                                       lambda: self.generate_order_card(order, output_format=output_format,
+                                                                        width=width, use_cache=False),
+                                       width=width)
+        
+        timer = StageTimer()
+        green = '#25D366'
+        card = ImageReceiptBuilder(width, self._image_symbol_font(), margin=24)
+        card.region(self._static_region(card, 'banner'), full_width=True, space_after=12)
+        card.text(f"Order #{order.order_number}", size=16, bold=True, align='center', space_after=2)
+        card.text(order.created_at.strftime('%B %d, %Y at %I:%M %p'), size=10, color='#808080', align='center',
+                  space_after=10)
+        card.text(f"🍽️ {order.restaurant_name}", size=13, bold=True, color=green, space_after=6)
+        
+        # The first few items; the full list is on the receipt
+        for item in order.items[:CARD_ITEM_LINES]:
+            card.text(f"{item.quantity}x {item.name}", size=11, space_after=2)
+        if len(order.items) > CARD_ITEM_LINES:
+            more = len(order.items) - CARD_ITEM_LINES
+            card.text(f"+ {more} more item{'s' if more > 1 else ''}", size=10, color='#808080', space_after=2)
+        card.space(6)
+        
+        card.columns(['TOTAL', format_money(order.total)], (0.6, 0.4), ('left', 'right'), size=16, bold=True,
+                     colors=['#000000', green], padding=8, line_above=(green, 1))
+        card.text(PAYMENT_DISPLAY.get(order.payment_method, PAYMENT_DISPLAY['card']), size=11, space_after=10)
+        
+        if order.driver:
+            with timer.stage('images'):
+                card.region(self._driver_badge_region(card, order.driver), space_after=10)
+        card.text("Thank you for supporting local! 💚", size=12, bold=True, color=green, align='center',
+                  space_after=0)
+        
+        with timer.stage('build'):
+            data = card.getvalue(output_format)
+        self._report_metrics(timer, 'card', order, output_format=output_format, size=len(data))
+        return self._write_output(data, output_path)
+    
+    def _image_symbol_font(self):
+        """(path, covered code points) of the symbol font, for ImageReceiptBuilder"""
+        font = _register_symbol_font()
+        return (font[2], font[1]) if font else None
+    
+    def _static_region(self, builder, name):
+        """Header/footer region that is the same on every receipt image of this width"""
+        def render():
+            region = ImageReceiptBuilder(builder.width, builder.symbol_font, builder.margin / builder.scale)
+            if name == 'header':
+                region.text("🍕 LocalFirst YYC", size=22, bold=True, color='#25D366', align='center', space_after=6)
+                region.text("Support Local. Eat Amazing.", size=10, color='#808080', align='center', space_after=0)
+            elif name == 'banner':
+                region.text("🍕 LocalFirst YYC", size=18, bold=True, color='#ffffff', align='center',
+                            background='#25D366', space_after=0)
+            else:
+                region.space(8)
+                region.text("By ordering through LocalFirst YYC, you've helped:", bold=True, space_after=6)
+                for line in ("Keep 100% of your dollars in Calgary", "Support a family-owned business",
+                             "Help a local driver earn fair wages", "Build a stronger community"):
+                    region.text(f"• {line}", size=9, color='#444444', space_after=2)
+                region.space(16)
+                region.rule('#808080', space=8)
+                region.text("Questions? Contact us at (403) 826-5529\nor message us on WhatsApp", size=9,
+                            color='#808080', align='center', space_after=8)
+                region.text("Thank you for supporting local! 💚", size=12, bold=True, color='#25D366',
+                            align='center', space_after=0)
+            return region.image(trim=True)
+        
+        return self.region_cache.get((name, builder.width, builder.margin), render)
+    
+    def _person_card_regions(self, builder, order):
+        """Owner and driver story cards, drawn once per person and width"""
+        cards = []
+        for person, who, title, default_story, background, border in (
+            (order.restaurant_owner, 'owner', "👩‍🍳 Meet {}", 'Thank you for supporting our local restaurant!',
+             '#fff8f0', '#e07020'),
+            (order.driver, 'driver', "🚗 Your Driver: {}", 'Thank you for the tip!', '#f0fff4', '#25D366'),
+        ):
+            if not person:
+                continue
+            name = person.name or ('the Owner' if who == 'owner' else 'Driver')
+            story = f'"{person.story or default_story}"'
+            photo = self._load_photo(person.image, who, builder.px(110))
+            key = (who, builder.width, builder.content_width, name, story, photo)
+            cards.append(self.region_cache.get(key, lambda: builder.card(
+                photo, title.format(name), story, background, border)))
+        return cards
+    
+    def _driver_badge_region(self, builder, driver):
+        """Small driver photo and name for the order card"""
+        name = driver.name or 'TBD'
+        photo = self._load_photo(driver.image, 'driver', builder.px(56))
+        key = ('driver_badge', builder.width, builder.content_width, name, photo)
+        return self.region_cache.get(key, lambda: builder.card(
+            photo, f"🚗 Your driver: {name}", '', '#f0fff4', '#25D366', photo_size=56, title_size=12))
+    
+    def generate_kitchen_receipt(self, order_data, output_path=None, output_format='pdf', use_cache=True,
+                                 continuous=False, fast=False):
         """
         Generate kitchen/store receipt for printing
         Optimized for thermal printers (80mm width)
         Clear, large text for kitchen staff
+        order_data, output_path and use_cache work the same as in generate_customer_receipt,
+        except that the cache holds tickets without their "Printed:" time, which
+        is filled in each time one is served: ESC/POS tickets get it appended,
+        PDFs are cached with PRINT_TIME_PLACEHOLDER in its place
+        output_format='escpos' writes printer commands instead of a PDF
+        continuous=True sizes the PDF page to the ticket, for roll-fed printers,
+        instead of using 11in pages (up to MAX_PAGE_HEIGHT per page)
+        fast=True draws the same ticket straight onto a canvas, skipping
+        platypus layout, on a page sized exactly to it (continuous is implied)
         """
-        doc = SimpleDocTemplate(
-            output_path,
-            pagesize=(THERMAL_WIDTH, 11*inch),  # Thermal width, long page
-            rightMargin=5*mm,
-            leftMargin=5*mm,
-            topMargin=5*mm,
-            bottomMargin=5*mm
-        )
+        order = as_order(order_data)
+        if output_format == 'escpos':
+            if use_cache and self.receipt_cache is not None:
+                ticket = self._render_cached('kitchen', order, None, 'escpos',
+                                             lambda: self._kitchen_escpos(order, print_time=False))
+                return self._write_output(ticket + self._print_time_escpos(), output_path)
+            return self._write_output(self._kitchen_escpos(order), output_path)
         
-        story = []
+        if output_format != 'pdf':
+            raise ValueError(f"Unknown output format: {output_format}")
+        if use_cache and self.receipt_cache is not None:
+            ticket = self._render_cached('kitchen', order, None, 'pdf',
+                                         lambda: self._kitchen_pdf(order, None, continuous, fast,
+                                                                   PRINT_TIME_PLACEHOLDER),
+                                         continuous=continuous or fast, fast=fast)
+            return self._write_output(_stamp_print_time(ticket), output_path)
+        return self._kitchen_pdf(order, output_path, continuous, fast)
+    
+    def _kitchen_pdf(self, order, output_path, continuous=False, fast=False, print_time=None):
+        """
+        Kitchen ticket PDF, platypus or canvas
+        print_time=PRINT_TIME_PLACEHOLDER leaves the page content uncompressed,
+        so _stamp_print_time can fill in the time later
+        """
+        timer = StageTimer()
+        page_compression = 0 if print_time == PRINT_TIME_PLACEHOLDER else None
+        if fast:
+            return self._draw_kitchen_rows(self._kitchen_rows(order, print_time), order, output_path, timer,
+                                           page_compression=page_compression)
         
-        # Styles for kitchen receipt (larger, clearer)
-        kitchen_title = ParagraphStyle(
-            'KitchenTitle',
-            fontSize=16,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold',
-            spaceAfter=4
-        )
+        doc = self._kitchen_doc(output_path, page_compression)
+        story = self._kitchen_header_story(order)
+        story += self._kitchen_items_story(order.items)
+        story += self._kitchen_footer_story(order, print_time)
         
-        kitchen_order = ParagraphStyle(
-            'KitchenOrder',
-            fontSize=24,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold',
-            spaceAfter=8,
-            textColor=colors.black
-        )
+        if continuous:
+            doc.pagesize = (THERMAL_WIDTH, self._continuous_page_height(doc, story))
         
-        kitchen_item = ParagraphStyle(
-            'KitchenItem',
-            fontSize=14,
-            alignment=TA_LEFT,
-            fontName='Helvetica-Bold',
-            spaceAfter=4
-        )
+        # Build PDF
+        return self._build(doc, story, output_path, timer, 'kitchen', order)
+    
+    def generate_station_tickets(self, order_data, stations, output_path=None, output_format='pdf',
+                                 continuous=False, fast=False, default_station=DEFAULT_STATION):
+        """
+        One kitchen ticket per station (pizza oven, fryer, drinks fridge...) for
+        an order, all rendered in one call
+        stations maps item names or categories to station names (see
+        group_by_station). Each ticket lists only its station's items and names
+        the other stations, so whoever plates the order knows what else to wait
+        for. The header, customer, delivery and payment parts are laid out once
+        and shared by every ticket.
+        output_path is None to get bytes, a pattern such as
+        'tickets/{order_number}-{station}.pdf', or a dict of station -> path or
+        file object, e.g. one socket per station printer. output_format,
+        continuous and fast work the same as in generate_kitchen_receipt; station
+        tickets are not cached.
+        Returns a dict of station -> bytes, path or file object, in printing order.
+        """
+        timer = StageTimer()
+        order = as_order(order_data)
+        groups = group_by_station(order.items, stations, default_station) or {default_station: []}
+        outputs = _station_outputs(output_path, groups, order)
         
-        kitchen_normal = ParagraphStyle(
-            'KitchenNormal',
-            fontSize=10,
-            alignment=TA_LEFT,
-            spaceAfter=2
+        # Parts every ticket shares
+        if output_format == 'escpos':
+            header, footer = self._kitchen_header_escpos(order), self._kitchen_footer_escpos(order)
+        elif output_format != 'pdf':
+            raise ValueError(f"Unknown output format: {output_format}")
+        elif fast:
+            header, footer = self._kitchen_header_rows(order), self._kitchen_footer_rows(order)
+        else:
+            header, footer = self._kitchen_header_story(order), self._kitchen_footer_story(order)
+        
+        tickets = {}
+        for index, (station, items) in enumerate(groups.items(), 1):
+            heading = f"{station.upper()} ITEMS ({index} of {len(groups)}):" if len(groups) > 1 else None
+            others = [other for other in groups if other != station]
+            target = outputs[station]
+            if output_format == 'escpos':
+                data = escpos.INIT + header + self._kitchen_items_escpos(items, heading, others) + footer
+                self._report_metrics(timer, 'kitchen', order, output_format='escpos', size=len(data),
+                                     station=station)
+                tickets[station] = self._write_output(data, target)
+            elif fast:
+                rows = _TicketRows(header.width)
+                rows.extend(header)
+                rows.extend(self._kitchen_items_rows(items, heading, others))
+                rows.extend(footer)
+                tickets[station] = self._draw_kitchen_rows(rows, order, target, timer, station=station)
+            else:
+                _clear_postponed(header + footer)
+                story = header + self._kitchen_items_story(items, heading, others) + footer
+                doc = self._kitchen_doc(target)
+                if continuous:
+                    doc.pagesize = (THERMAL_WIDTH, self._continuous_page_height(doc, story))
+                tickets[station] = self._build(doc, story, target, timer, 'kitchen', order, station=station)
+            timer = StageTimer()
+        return tickets
+    
+    def _kitchen_doc(self, output_path, page_compression=None):
+        """Document template for a kitchen ticket on 11in thermal pages"""
+        return SimpleDocTemplate(
+            self._output_target(output_path),
+            pagesize=(THERMAL_WIDTH, 11*inch),  # Thermal width, long page
+            rightMargin=5*mm,
+            leftMargin=5*mm,
+            topMargin=5*mm,
+            bottomMargin=5*mm,
+            pageCompression=page_compression
         )
+    
+    def _kitchen_header_story(self, order):
+        """Kitchen ticket flowables down to the items: brand, order number, time and customer"""
+        static = self._static_flowables()
+        kitchen_normal = self.styles['KitchenNormal']
+        story = []
         
         # Header
-        story.append(Paragraph("🍕 LOCALFIRST YYC", kitchen_title))
-        story.append(Paragraph("*** KITCHEN ORDER ***", kitchen_title))
+        story.append(static['kitchen_brand'])
+        story.append(static['kitchen_banner'])
         story.append(Spacer(1, 8))
         
         # Order number - BIG
-        story.append(Paragraph(f"#{order_data.get('order_number', 'N/A')}", kitchen_order))
+        story.append(Paragraph(f"#{order.order_number}", self.styles['KitchenOrder']))
         
         # Time
-        created_at = order_data.get('created_at', datetime.now().isoformat())
-        order_time = datetime.fromisoformat(created_at).strftime('%I:%M %p')
-        story.append(Paragraph(f"Time: {order_time}", kitchen_normal))
+        story.append(Paragraph(f"Time: {order.created_at.strftime('%I:%M %p')}", kitchen_normal))
         story.append(Spacer(1, 8))
         
         # Dashed line
-        story.append(Paragraph("-" * 30, kitchen_normal))
+        story.append(static['kitchen_dashes'])
         story.append(Spacer(1, 4))
         
         # Customer name - important for calling out
-        story.append(Paragraph(f"CUSTOMER: {order_data.get('customer_name', 'Guest').upper()}", kitchen_item))
+        story.append(Paragraph(f"CUSTOMER: {order.customer_name.upper()}", self.styles['KitchenItem']))
         story.append(Spacer(1, 8))
         
         # Dashed line
-        story.append(Paragraph("-" * 30, kitchen_normal))
+        story.append(static['kitchen_dashes'])
         story.append(Spacer(1, 4))
+        return story
+    
+    def _kitchen_items_story(self, items, heading=None, others=()):
+        """
+        Kitchen ticket item flowables under "ORDER ITEMS:", or under heading
+        for a station ticket; others names the order's other stations
+        """
+        static = self._static_flowables()
+        kitchen_item = self.styles['KitchenItem']
+        kitchen_normal = self.styles['KitchenNormal']
+        large = len(items) >= LARGE_ORDER_ITEMS
+        story = []
         
         # ORDER ITEMS - Large and clear
-        story.append(Paragraph("ORDER ITEMS:", kitchen_item))
+        story.append(Paragraph(heading, kitchen_item) if heading else static['kitchen_items_header'])
         story.append(Spacer(1, 4))
         
-        for item in order_data.get('items', []):
-            qty = item.get('quantity', 1)
-            name = item.get('name', 'Item')
+        for item in items:
+            if large:
+                story.append(self._kitchen_item_block(item))
+                continue
             
             # Item with quantity
-            story.append(Paragraph(f"<b>{qty}x {name.upper()}</b>", kitchen_item))
+            story.append(Paragraph(f"<b>{item.quantity}x {item.name.upper()}</b>", kitchen_item))
             
             # Toppings/customizations if any
-            toppings = item.get('toppings', [])
-            if toppings:
-                for topping in toppings:
-                    story.append(Paragraph(f"   + {topping}", kitchen_normal))
+            for topping in item.toppings:
+                story.append(Paragraph(f"   + {topping}", kitchen_normal))
             
             # Special instructions
-            instructions = item.get('instructions', '')
-            if instructions:
-                story.append(Paragraph(f"   ⚠️ NOTE: {instructions}", kitchen_normal))
+            if item.instructions:
+                story.append(Paragraph(f"   ⚠️ NOTE: {item.instructions}", kitchen_normal))
             
             story.append(Spacer(1, 6))
         
+        if others:
+            story.append(Paragraph(f"Also at: {', '.join(others).upper()}", kitchen_normal))
+            story.append(Spacer(1, 6))
+        return story
+    
+    def _kitchen_footer_story(self, order, print_time=None):
+        """Kitchen ticket flowables after the items: delivery, payment, driver and print time (default now)"""
+        static = self._static_flowables()
+        kitchen_normal = self.styles['KitchenNormal']
+        story = []
+        
         # Dashed line
-        story.append(Paragraph("-" * 30, kitchen_normal))
+        story.append(static['kitchen_dashes'])
         story.append(Spacer(1, 4))
         
         # Delivery info
-        story.append(Paragraph("DELIVERY TO:", kitchen_item))
-        story.append(Paragraph(order_data.get('customer_address', 'N/A'), kitchen_normal))
-        story.append(Paragraph(f"Phone: {self._format_phone(order_data.get('customer_phone', ''))}", kitchen_normal))
+        story.append(static['kitchen_delivery_header'])
+        story.append(Paragraph(order.customer_address, kitchen_normal))
+        story.append(Paragraph(f"Phone: {order.customer_phone}", kitchen_normal))
         story.append(Spacer(1, 8))
         
         # Payment info
-        payment_method = order_data.get('payment_method', 'card')
-        if payment_method == 'cash':
-            story.append(Paragraph("⚠️ CASH ON DELIVERY ⚠️", kitchen_item))
-            story.append(Paragraph(f"Amount due: ${order_data.get('total', 0):.2f}", kitchen_item))
+        if order.payment_method == 'cash':
+            story.append(static['kitchen_cod'])
+            story.append(Paragraph(f"Amount due: {format_money(order.total)}", self.styles['KitchenItem']))
         else:
-            story.append(Paragraph("✓ PAID ONLINE", kitchen_item))
+            story.append(static['kitchen_paid'])
         
         story.append(Spacer(1, 8))
         
         # Dashed line
-        story.append(Paragraph("-" * 30, kitchen_normal))
+        story.append(static['kitchen_dashes'])
         
         # Driver assignment (if available)
-        driver = order_data.get('driver', {})
-        if driver:
+        if order.driver:
             story.append(Spacer(1, 4))
-            story.append(Paragraph(f"DRIVER: {driver.get('name', 'TBD')}", kitchen_normal))
+            story.append(Paragraph(f"DRIVER: {order.driver.name or 'TBD'}", kitchen_normal))
         
         # Print time
         story.append(Spacer(1, 8))
-        story.append(Paragraph(f"Printed: {datetime.now().strftime('%I:%M:%S %p')}", 
-                              ParagraphStyle('PrintTime', fontSize=8, alignment=TA_CENTER, textColor=colors.grey)))
+        story.append(Paragraph(f"Printed: {print_time or _print_time()}", self.styles['PrintTime']))
+        return story
+    
+    def _kitchen_item_block(self, item):
+        """
+        Large-order layout for one kitchen ticket item: a single paragraph
+        however many toppings it has, so layout cost per item stays flat
+        """
+        lines = [f"<font name=\"Helvetica-Bold\" size=\"14\">{item.quantity}x {item.name.upper()}</font>"]
+        lines.extend(f"+ {topping}" for topping in item.toppings)
+        if item.instructions:
+            lines.append(f"⚠️ NOTE: {item.instructions}")
+        return Paragraph('<br/>'.join(lines), self.styles['KitchenItemBlock'])
+    
+    def _continuous_page_height(self, doc, story):
+        """Page height that fits the whole story in one frame, capped at MAX_PAGE_HEIGHT"""
+        frame_padding = 12  # SimpleDocTemplate frames pad 6pt on each side
+        width = doc.width - frame_padding
+        height = doc.topMargin + doc.bottomMargin + frame_padding
+        for flowable in story:
+            height += flowable.wrap(width, MAX_PAGE_HEIGHT)[1] + flowable.getSpaceBefore() + flowable.getSpaceAfter()
+        return min(height, MAX_PAGE_HEIGHT)
+    
+    def _kitchen_rows(self, order, print_time=None):
+        """
+        Canvas lines of a whole kitchen ticket, same content as the platypus
+        ticket. Lines are wrapped with plain string widths; _draw_kitchen_rows
+        makes the page exactly as tall as the ticket, and one taller than
+        MAX_PAGE_HEIGHT carries on over more pages.
+        """
+        rows = self._kitchen_header_rows(order)
+        rows.extend(self._kitchen_items_rows(order.items))
+        rows.extend(self._kitchen_footer_rows(order, print_time))
+        return rows
+    
+    def _kitchen_header_rows(self, order):
+        """Canvas lines of the kitchen ticket down to the items"""
+        rows = _TicketRows(THERMAL_WIDTH - 10*mm)
         
-        # Build PDF
-        doc.build(story)
+        # Header
+        rows.line("🍕 LOCALFIRST YYC", 'Helvetica-Bold', 16, 'center', space_after=4)
+        rows.line("*** KITCHEN ORDER ***", 'Helvetica-Bold', 16, 'center', space_after=4)
+        rows.space(8)
+        
+        # Order number - BIG
+        rows.line(f"#{order.order_number}", 'Helvetica-Bold', 24, 'center', space_after=8)
+        rows.line(f"Time: {order.created_at.strftime('%I:%M %p')}")
+        rows.space(8)
+        rows.line("-" * 30)
+        rows.space(4)
+        
+        # Customer name - important for calling out
+        rows.line(f"CUSTOMER: {order.customer_name.upper()}", 'Helvetica-Bold', 14, space_after=4)
+        rows.space(8)
+        rows.line("-" * 30)
+        rows.space(4)
+        return rows
+    
+    def _kitchen_items_rows(self, items, heading=None, others=()):
+        """Canvas lines of the kitchen ticket items (see _kitchen_items_story)"""
+        rows = _TicketRows(THERMAL_WIDTH - 10*mm)
+        
+        # ORDER ITEMS - Large and clear
+        rows.line(heading or "ORDER ITEMS:", 'Helvetica-Bold', 14, space_after=4)
+        rows.space(4)
+        for item in items:
+            rows.line(f"{item.quantity}x {item.name.upper()}", 'Helvetica-Bold', 14, space_after=4)
+            for topping in item.toppings:
+                rows.line(f"+ {topping}", indent=12)
+            if item.instructions:
+                rows.line(f"⚠️ NOTE: {item.instructions}", indent=12)
+            rows.space(6)
+        if others:
+            rows.line(f"Also at: {', '.join(others).upper()}")
+            rows.space(6)
+        return rows
+    
+    def _kitchen_footer_rows(self, order, print_time=None):
+        """Canvas lines of the kitchen ticket after the items"""
+        rows = _TicketRows(THERMAL_WIDTH - 10*mm)
+        rows.line("-" * 30)
+        rows.space(4)
+        
+        # Delivery info
+        rows.line("DELIVERY TO:", 'Helvetica-Bold', 14, space_after=4)
+        rows.line(order.customer_address)
+        rows.line(f"Phone: {order.customer_phone}")
+        rows.space(8)
+        
+        # Payment info
+        if order.payment_method == 'cash':
+            rows.line("⚠️ CASH ON DELIVERY ⚠️", 'Helvetica-Bold', 14, space_after=4)
+            rows.line(f"Amount due: {format_money(order.total)}", 'Helvetica-Bold', 14, space_after=4)
+        else:
+            rows.line("✓ PAID ONLINE", 'Helvetica-Bold', 14, space_after=4)
+        rows.space(8)
+        rows.line("-" * 30)
+        
+        if order.driver:
+            rows.space(4)
+            rows.line(f"DRIVER: {order.driver.name or 'TBD'}")
+        rows.space(8)
+        rows.line(f"Printed: {print_time or _print_time()}", size=8, align='center', colour=colors.grey)
+        return rows
+    
+    def _draw_kitchen_rows(self, rows, order, output_path, timer, page_compression=None, **details):
+        """Draw _TicketRows onto pages sized to them and return the PDF like _build"""
+        with timer.stage('build'), _binary_streams:
+            target = self._output_target(output_path)
+            start = self._output_position(output_path)
+            pdf = canvas.Canvas(target, pagesize=(THERMAL_WIDTH, MAX_PAGE_HEIGHT), pageCompression=page_compression)
+            pages = self._draw_kitchen_pages(pdf, rows)
+            pdf.save()
+        return self._finish(target, output_path, start, timer, 'kitchen', order, pages, **details)
+    
+    def _draw_kitchen_pages(self, pdf, rows, margin=5*mm):
+        """Draw one ticket's rows onto pages of their own and return how many it took"""
+        # Split into pages no taller than MAX_PAGE_HEIGHT
+        pages = [[]]
+        height = 0
+        for row in rows.rows:
+            row_height = row[6] + row[1] * 1.2
+            if pages[-1] and height + row_height > MAX_PAGE_HEIGHT - 2*margin:
+                pages.append([])
+                height = 0
+                row = row[:6] + (0,)
+                row_height = row[1] * 1.2
+            pages[-1].append(row)
+            height += row_height
+        
+        for page in pages:
+            page_height = 2*margin + sum(row[6] + row[1] * 1.2 for row in page)
+            pdf.setPageSize((THERMAL_WIDTH, page_height))
+            # One text object per page, changing font and colour only when they do
+            text_object = pdf.beginText()
+            current = None
+            y = page_height - margin
+            for font, size, text, align, indent, colour, space_above in page:
+                y -= space_above + size * 1.2
+                if (font, size, colour) != current:
+                    text_object.setFont(font, size)
+                    text_object.setFillColor(colour)
+                    current = (font, size, colour)
+                x = margin + indent
+                if align == 'center':
+                    x = (THERMAL_WIDTH - _string_width(text, font, size)) / 2
+                text_object.setTextOrigin(x, y + size * 0.2)
+                text_object.textOut(text)
+            pdf.drawText(text_object)
+            pdf.showPage()
+        return len(pages)
+    
+    def generate_statement(self, orders, output_path=None, restaurant_name=None, period=''):
+        """
+        End-of-day or weekly statement for a restaurant: one line per order,
+        then totals for discounts, delivery fees, tips and cash on delivery
+        orders is any iterable of order dicts or Orders. It is read once, lazily,
+        and laid out STATEMENT_CHUNK_ROWS orders at a time, so memory stays flat
+        for tens of thousands of orders. restaurant_name defaults to the first
+        order's. output_path works the same as in generate_customer_receipt.
+        """
+        timer = StageTimer()
+        orders = iter(orders)
+        first = next(orders, None)
+        if first is not None:
+            first = as_order(first)
+            orders = itertools.chain([first], orders)
+        if restaurant_name is None:
+            restaurant_name = first.restaurant_name if first is not None else 'Restaurant'
+        
+        doc = SimpleDocTemplate(
+            self._output_target(output_path),
+            pagesize=letter,
+            rightMargin=0.5*inch,
+            leftMargin=0.5*inch,
+            topMargin=0.5*inch,
+            bottomMargin=0.6*inch,
+            title=f"{restaurant_name} statement {period}".strip()
+        )
+        
+        def footer(canv, doc):
+            canv.saveState()
+            canv.setFont('Helvetica', 8)
+            canv.setFillColor(colors.grey)
+            canv.drawString(doc.leftMargin, 0.35*inch, f"LocalFirst YYC - {restaurant_name} {period}".strip())
+            canv.drawRightString(doc.pagesize[0] - doc.rightMargin, 0.35*inch, f"Page {doc.page}")
+            canv.restoreState()
+        
+        totals = _StatementTotals()
+        story = _LazyStory(self._statement_story(orders, totals, restaurant_name, period))
+        return self._build(doc, story, output_path, timer, 'statement', None, on_page=footer)
+    
+    def _statement_story(self, orders, totals, restaurant_name, period):
+        """Flowables for a statement, generated as the build asks for them"""
+        styles = self.styles
+        yield self._static_flowables()['title']
+        yield Paragraph(f"<b>Statement: {restaurant_name}</b>", styles['ReceiptSubtitle'])
+        if period:
+            yield Paragraph(period, styles['ReceiptSubtitle'])
+        yield Spacer(1, 12)
+        
+        rows = [STATEMENT_COLUMNS]
+        for order in orders:
+            order = as_order(order)
+            totals.add(order)
+            rows.append([
+                order.order_number,
+                order.created_at.strftime('%b %d %I:%M %p'),
+                order.customer_name[:24],
+                'Cash' if order.payment_method == 'cash' else 'Card',
+                format_money(order.subtotal),
+                f"-{format_money(order.discount)}" if order.discount else '',
+                format_money(order.delivery_fee) if order.delivery_fee else '',
+                format_money(order.tip) if order.tip else '',
+                format_money(order.total),
+            ])
+            if len(rows) > STATEMENT_CHUNK_ROWS:
+                yield self._statement_table(rows)
+                rows = [STATEMENT_COLUMNS]
+        if len(rows) > 1:
+            yield self._statement_table(rows)
+        if not totals.orders:
+            yield Paragraph("No orders in this period.", styles['Normal'])
+        
+        # Totals, known only now that every order has been read
+        yield Spacer(1, 16)
+        yield Paragraph("<b>TOTALS</b>", styles['SectionHeader'])
+        summary = Table([
+            ['', 'Orders', 'Amount'],
+            ['Items sold', str(totals.items), ''],
+            ['Subtotal', str(totals.orders), format_money(totals.subtotal)],
+            ['Discounts', '', f"-{format_money(totals.discount)}"],
+            ['Delivery fees', '', format_money(totals.delivery_fee)],
+            ['Driver tips', '', format_money(totals.tip)],
+            ['Cash on delivery', str(totals.cash_orders), format_money(totals.cash_total)],
+            ['Paid online', str(totals.orders - totals.cash_orders), format_money(totals.total - totals.cash_total)],
+            ['TOTAL', str(totals.orders), format_money(totals.total)],
+        ], colWidths=[2.5*inch, 1*inch, 1.2*inch], hAlign='LEFT')
+        summary.setStyle(STATEMENT_TOTALS_STYLE)
+        yield summary
+        
+        if len(totals.by_day) > 1:
+            yield Spacer(1, 16)
+            yield Paragraph("<b>BY DAY</b>", styles['SectionHeader'])
+            days = [['Day', 'Orders', 'Total']]
+            for day, (count, total) in totals.by_day.items():
+                days.append([day.strftime('%a %b %d, %Y'), str(count), format_money(total)])
+            by_day = Table(days, colWidths=[2.5*inch, 1*inch, 1.2*inch], hAlign='LEFT', repeatRows=1)
+            by_day.setStyle(STATEMENT_TABLE_STYLE)
+            yield by_day
+    
+    def _statement_table(self, rows):
+        """One chunk of statement lines, with its own header row"""
+        table = Table(rows, colWidths=STATEMENT_COL_WIDTHS, repeatRows=1)
+        table.setStyle(STATEMENT_TABLE_STYLE)
+        return table
+    
+    def generate_combined_pdf(self, orders, output_path=None, kind='customer', compact=False):
+        """
+        Many orders in one PDF, e.g. the backlog after a printer outage or a
+        driver's run of deliveries, each order starting a new page under its
+        own bookmark
+        kind='customer' lays receipts out on letter pages (compact=True uses the
+        first COMPACT_PHOTO_STEPS step and the symbol font, with no size target);
+        kind='kitchen' draws each ticket on pages sized to it, as the fast
+        kitchen path does, so a roll printer cuts between orders.
+        Fonts and photos are embedded once per document, and each distinct
+        photo is decoded once however many orders show it, so the file grows
+        with the orders' text rather than their photos.
+        orders is any iterable of order dicts or Orders, read lazily.
+        output_path works the same as in generate_customer_receipt.
+        """
+        if kind not in ('customer', 'kitchen'):
+            raise ValueError(f"Unknown receipt kind: {kind}")
+        timer = StageTimer()
+        orders = (as_order(order_data) for order_data in orders)
+        
+        if kind == 'kitchen':
+            count = 0
+            with timer.stage('build'), _binary_streams:
+                target = self._output_target(output_path)
+                start = self._output_position(output_path)
+                pdf = canvas.Canvas(target, pagesize=(THERMAL_WIDTH, MAX_PAGE_HEIGHT))
+                pages = 0
+                for count, order in enumerate(orders, 1):
+                    pdf.bookmarkPage(f'order{count}')
+                    pdf.addOutlineEntry(f"Order #{order.order_number}", f'order{count}')
+                    pages += self._draw_kitchen_pages(pdf, self._kitchen_rows(order))
+                pdf.save()
+            return self._finish(target, output_path, start, timer, 'combined_kitchen', None, pages, orders=count)
+        
+        doc = self._customer_doc(output_path)
+        counter = itertools.count(1)
+        story = _LazyStory(self._combined_customer_story(orders, timer, compact, counter))
+        start = self._output_position(output_path)
+        # The lazy story lays receipts out during the build: their images and
+        # tables stages nest inside it and are taken out of the build's time
+        with timer.stage('build'), _binary_streams:
+            doc.build(story)
+        return self._finish(doc.filename, output_path, start, timer, 'combined_customer', None, doc.page,
+                            compact=compact, orders=next(counter) - 1)
+    
+    def _combined_customer_story(self, orders, timer, compact, counter):
+        """Customer receipts one after another, generated as the build asks for them"""
+        photo_dpi, photo_quality = COMPACT_PHOTO_STEPS[0] if compact else (PHOTO_DPI, None)
+        photos = {}  # Shared by every receipt in the document (see _load_card_photo)
+        static = self._static_flowables(compact).values()
+        for order, number in zip(orders, counter):
+            if number > 1:
+                yield PageBreak()
+            # The same static flowables come back for every order
+            _clear_postponed(static)
+            yield _OrderBookmark(f'order{number}', f"Order #{order.order_number}")
+            yield from self._customer_story(order, timer, compact, photo_dpi, photo_quality, photos)
+    
+    def _kitchen_escpos(self, order, print_time=True):
+        """
+        Kitchen ticket as ESC/POS commands, same content as the PDF ticket
+        print_time=False stops before the print time and the cut (see _print_time_escpos)
+        """
+        timer = StageTimer()
+        data = (escpos.INIT + self._kitchen_header_escpos(order) + self._kitchen_items_escpos(order.items)
+                + self._kitchen_footer_escpos(order, print_time))
+        self._report_metrics(timer, 'kitchen', order, output_format='escpos', size=len(data))
+        return data
+    
+    def _kitchen_header_escpos(self, order):
+        """ESC/POS commands for the kitchen ticket down to the items, without the printer reset"""
+        ticket = escpos.EscPosBuilder(init=False)
+        
+        # Header
+        ticket.text("LOCALFIRST YYC", size=escpos.DOUBLE, bold=True, align='center')
+        ticket.text("*** KITCHEN ORDER ***", bold=True, align='center')
+        ticket.feed()
+        
+        # Order number - BIG
+        ticket.text(f"#{order.order_number}", size=escpos.DOUBLE, bold=True, align='center')
+        
+        # Time
+        ticket.text(f"Time: {order.created_at.strftime('%I:%M %p')}")
+        ticket.rule()
+        
+        # Customer name - important for calling out
+        ticket.text(f"CUSTOMER: {order.customer_name.upper()}", size=escpos.DOUBLE_HEIGHT, bold=True)
+        ticket.rule()
+        return ticket.getvalue()
+    
+    def _kitchen_items_escpos(self, items, heading=None, others=()):
+        """ESC/POS commands for the kitchen ticket items (see _kitchen_items_story)"""
+        ticket = escpos.EscPosBuilder(init=False)
+        
+        # ORDER ITEMS - Large and clear
+        ticket.text(heading or "ORDER ITEMS:", bold=True)
+        for item in items:
+            ticket.text(f"{item.quantity}x {item.name.upper()}", size=escpos.DOUBLE, bold=True)
+            for topping in item.toppings:
+                ticket.text(f"+ {topping}", indent='   ')
+            if item.instructions:
+                ticket.text(f"⚠️ NOTE: {item.instructions}", bold=True, indent='   ')
+            ticket.feed()
+        if others:
+            ticket.text(f"Also at: {', '.join(others).upper()}")
+        ticket.rule()
+        return ticket.getvalue()
+    
+    def _kitchen_footer_escpos(self, order, print_time=True):
+        """ESC/POS commands for the kitchen ticket after the items, ending with the print time and the cut"""
+        ticket = escpos.EscPosBuilder(init=False)
+        
+        # Delivery info
+        ticket.text("DELIVERY TO:", bold=True)
+        ticket.text(order.customer_address)
+        ticket.text(f"Phone: {order.customer_phone}")
+        ticket.feed()
+        
+        # Payment info
+        if order.payment_method == 'cash':
+            ticket.text("⚠️ CASH ON DELIVERY ⚠️", size=escpos.DOUBLE_HEIGHT, bold=True, align='center')
+            ticket.text(f"Amount due: {format_money(order.total)}", size=escpos.DOUBLE_HEIGHT, bold=True,
+                        align='center')
+        else:
+            ticket.text("✓ PAID ONLINE", bold=True, align='center')
+        ticket.rule()
+        
+        # Driver assignment (if available)
+        if order.driver:
+            ticket.text(f"DRIVER: {order.driver.name or 'TBD'}")
+        footer = ticket.getvalue()
+        return footer + self._print_time_escpos() if print_time else footer
+    
+    def _print_time_escpos(self):
+        """The end of an ESC/POS kitchen ticket: the time it is printed, then the cut"""
+        ticket = escpos.EscPosBuilder(init=False)
+        ticket.feed()
+        ticket.text(f"Printed: {_print_time()}", align='center')
+        ticket.feed(3)
+        ticket.cut()
+        return ticket.getvalue()
+    
+    def _load_card_photo(self, image_path, who, dpi=PHOTO_DPI, quality=None, shared=None):
+        """
+        Cached, card-sized copy of a photo as a file object (None if unavailable)
+        With a shared dict, every receipt in one document gets the same
+        ImageReader for a photo instead: it is decoded once, and reportlab
+        embeds it once and points every page at that copy.
+        """
+        if shared is None:
+            photo = self._load_photo(image_path, who, round(PHOTO_SIZE / inch * dpi), quality)
+            return io.BytesIO(photo) if photo else None
+        key = (image_path, dpi, quality)
+        if key not in shared:
+            photo = self._load_photo(image_path, who, round(PHOTO_SIZE / inch * dpi), quality)
+            shared[key] = ImageReader(io.BytesIO(photo)) if photo else None
+        return shared[key]
+    
+    def _load_photo(self, image_path, who, size_px, quality=None):
+        """Cached JPEG bytes of a photo, size_px square (None if unavailable)"""
+        if not image_path:
+            return None
+        try:
+            return self.photo_cache.get(image_path, size_px, quality)
+        except Exception as e:
+            print(f"Error loading {who} image: {e}")
+            return None
+    
+    def _render_cached(self, kind, order, output_path, output_format, render, **options):
+        """Serve a receipt from the receipt cache, rendering and storing it on a miss"""
+        timer = StageTimer()
+        key = self.receipt_cache.key(kind, order.to_dict(), TEMPLATE_VERSION, format=output_format, **options)
+        data = self.receipt_cache.get(key)
+        if data is None:
+            data = render()
+            self.receipt_cache.put(key, data)
+        else:
+            self._report_metrics(timer, kind, order, output_format=output_format, pages=None,
+                                 size=len(data), cached=True)
+        return self._write_output(data, output_path)
+    
+    def _output_target(self, output_path):
+        """Where reportlab should write: the caller's path/file, or a fresh buffer"""
+        return io.BytesIO() if output_path is None else output_path
+    
+    def _write_output(self, data, output_path):
+        """Send already-rendered bytes wherever output_path points"""
+        if output_path is None:
+            return data
+        if hasattr(output_path, 'write'):
+            output_path.write(data)
+        else:
+            with open(output_path, 'wb') as f:
+                f.write(data)
+        return output_path
+    
+    def _build(self, doc, story, output_path, timer, kind, order, on_page=None, **details):
+        """
+        Build the document and return the path, file object or PDF bytes
+        on_page(canvas, doc) is called on every page, e.g. to draw a footer
+        """
+        start = self._output_position(output_path)
+        page_callbacks = {'onFirstPage': on_page, 'onLaterPages': on_page} if on_page else {}
+        with timer.stage('build'), _binary_streams:
+            doc.build(story, **page_callbacks)
+        return self._finish(doc.filename, output_path, start, timer, kind, order, doc.page, **details)
+    
+    def _finish(self, target, output_path, start, timer, kind, order, pages, **details):
+        """Report a written PDF's metrics and return the path, file object or PDF bytes"""
+        if self.metrics:
+            if output_path is None:
+                size = target.getbuffer().nbytes
+            elif hasattr(output_path, 'write'):
+                end = self._output_position(output_path)
+                size = end - start if start is not None and end is not None else None
+            else:
+                size = os.path.getsize(output_path)
+            self._report_metrics(timer, kind, order, pages=pages, size=size, **details)
+        
+        if output_path is None:
+            return target.getvalue()
         return output_path
     
-    def _format_phone(self, phone):
-        """Format phone number for display"""
-        if not phone:
-            return ''
-        digits = ''.join(filter(str.isdigit, str(phone)))
-        if len(digits) == 10:
-            return f"({digits[:3]}) {digits[3:6]}-{digits[6:]}"
-        elif len(digits) == 11 and digits[0] == '1':
-            return f"+1 ({digits[1:4]}) {digits[4:7]}-{digits[7:]}"
-        return phone
+    def _output_position(self, output_path):
+        """Current offset of a writable output, if it can tell (pipes and sockets cannot)"""
+        if not self.metrics or not hasattr(output_path, 'tell'):
+            return None
+        try:
+            return output_path.tell()
+        except (OSError, ValueError):
+            return None
+    
+    def _report_metrics(self, timer, kind, order, output_format='pdf', pages=1, size=None, cached=False,
+                        **details):
+        """Hand this render's timings and sizes to the metrics hook, if there is one"""
+        if not self.metrics:
+            return
+        try:
+            self.metrics(timer.report(
+                kind=kind,
+                order_number=order.order_number if order else None,
+                format=output_format,
+                pages=pages,
+                bytes=size,
+                cached=cached,
+                photo_cache=self.photo_cache.stats(),
+                **details
+            ))
+        except Exception as e:
+            print(f"Error reporting receipt metrics: {e}")
+    
+    def generate_receipts_batch(self, orders, output_dir, kind='customer', workers=None,
+                                ordered=True, filename='{kind}_{order_number}.pdf', archive=None):
+        """
+        Render many orders across a pool of worker processes
+        Yields a ReceiptResult per order, in input order (ordered=True)
+        or as each one finishes. A failing order is reported in
+        result.error and does not stop the rest of the batch.
+        With output_dir=None nothing touches disk and each result
+        carries its PDF bytes in result.pdf.
+        With a receipt_archive.ReceiptArchive as archive, output_dir is
+        ignored: each PDF is appended to the archive and result.output_path
+        is the shard it went into.
+        orders can be raw dicts or Orders already parsed and checked with
+        order_model.load_orders, so a bad order is caught before rendering.
+        Worker processes render with generators set up like this one (see
+        worker_config), and their metrics reach this generator's hook.
+        """
+        if kind not in ('customer', 'kitchen'):
+            raise ValueError(f"Unknown receipt kind: {kind}")
+        
+        if archive is not None:
+            # Hold each order until its result is back, to index it by restaurant and date
+            in_flight = {}
+            
+            def track(orders):
+                for index, order_data in enumerate(orders):
+                    in_flight[index] = order_data
+                    yield order_data
+            
+            for result in self.generate_receipts_batch(track(orders), None, kind, workers, ordered):
+                order_data = in_flight.pop(result.index)
+                if result.error is None:
+                    entry = archive.add(order_data, result.pdf, kind)
+                    result = result._replace(output_path=os.path.join(archive.directory, entry.shard), pdf=None)
+                yield result
+            return
+        
+        workers = workers or os.cpu_count() or 1
+        jobs = (
+            (index, order_data, None if output_dir is None else os.path.join(output_dir, filename.format(
+                kind=kind, index=index, order_number=safe_filename(_order_number(order_data, index)))))
+            for index, order_data in enumerate(orders)
+        )
+        
+        # Render in-process when there is nothing to parallelize
+        if workers == 1:
+            for index, order_data, output_path in jobs:
+                yield self._render_batch_job(kind, index, order_data, output_path)
+            return
+        
+        # Imported here: the process pool machinery is slow to import and only batches use it
+        from concurrent.futures import ProcessPoolExecutor
+        
+        # Keep a bounded number of orders in flight so huge batches stay flat in memory
+        max_in_flight = workers * 4
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(type(self), self.worker_config())) as pool:
+            if ordered:
+                pending = deque()
+                for job in jobs:
+                    pending.append((job, pool.submit(call_worker, '_render_batch_job', (kind, *job))))
+                    if len(pending) >= max_in_flight:
+                        yield self._collect_batch_result(*pending.popleft())
+                while pending:
+                    yield self._collect_batch_result(*pending.popleft())
+            else:
+                pending = {}
+                for job in jobs:
+                    pending[pool.submit(call_worker, '_render_batch_job', (kind, *job))] = job
+                    if len(pending) >= max_in_flight:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield self._collect_batch_result(pending.pop(future), future)
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield self._collect_batch_result(pending.pop(future), future)
+    
+    def _render_batch_job(self, kind, index, order_data, output_path):
+        """Render one batch order, turning any failure into a result"""
+        order_number = _order_number(order_data)
+        try:
+            if kind == 'kitchen':
+                result = self.generate_kitchen_receipt(order_data, output_path)
+            else:
+                result = self.generate_customer_receipt(order_data, output_path)
+        except Exception as e:
+            return ReceiptResult(index, order_number, None, f"{type(e).__name__}: {e}")
+        if output_path is None:
+            return ReceiptResult(index, order_number, None, None, result)
+        return ReceiptResult(index, order_number, output_path, None)
+    
+    def _collect_batch_result(self, job, future):
+        """Unwrap a worker's finished future, reporting its metrics and pool-level failures per order"""
+        index, order_data, _ = job
+        try:
+            result, metrics = future.result()
+        except Exception as e:
+            return ReceiptResult(index, _order_number(order_data), None, f"{type(e).__name__}: {e}")
+        self.replay_metrics(metrics)
+        return result
+
+
+# Warm generator held by each worker process, and the metrics of its current call
+_worker_generator = None
+_worker_metrics = []
+
+
+def init_worker(generator_class, config=None):
+    """
+    Process pool initializer: create the worker's generator once, when the
+    process starts, from ReceiptGenerator.worker_config()
+    """
+    global _worker_generator
+    config = dict(config or {})
+    config['metrics'] = _worker_metrics.append if config.get('metrics') else None
+    _worker_generator = generator_class(**config)
+
+
+def call_worker(method, args=(), kwargs=None):
+    """
+    Run one generator method inside a worker process
+    Returns (result, metrics of the renders it made), to be handed to the
+    parent's generator with replay_metrics.
+    """
+    _worker_metrics.clear()
+    result = getattr(_worker_generator, method)(*args, **(kwargs or {}))
+    return result, list(_worker_metrics)
+
+
+@lru_cache(maxsize=4096)
+def _string_width(text, font, size):
+    """pdfmetrics.stringWidth, remembered: ticket lines and words repeat from order to order"""
+    return pdfmetrics.stringWidth(text, font, size)
+
+
+def _wrap_text(text, font, size, width):
+    """Split text into lines no wider than width points, breaking between words where possible"""
+    text = ' '.join(text.split())
+    if _string_width(text, font, size) <= width:
+        return [text]  # Nearly every ticket line
+    
+    space = _string_width(' ', font, size)
+    lines = []
+    line, line_width = '', 0
+    for word in text.split(' '):
+        word_width = _string_width(word, font, size)
+        if line and line_width + space + word_width <= width:
+            line, line_width = f"{line} {word}", line_width + space + word_width
+            continue
+        if line:
+            lines.append(line)
+        # A word wider than the line on its own is broken wherever it runs out
+        while word_width > width and len(word) > 1:
+            cut = len(word) - 1
+            while cut > 1 and _string_width(word[:cut], font, size) > width:
+                cut -= 1
+            lines.append(word[:cut])
+            word = word[cut:]
+            word_width = _string_width(word, font, size)
+        line, line_width = word, word_width
+    lines.append(line)
+    return lines
+
+
+def group_by_station(items, stations, default_station=DEFAULT_STATION):
+    """
+    Split order items between kitchen stations
+    stations maps item names or categories to station names, case-insensitively;
+    an item's name is looked up before its category, and items matching neither
+    go to default_station. Returns an OrderedDict of station -> items for the
+    stations that have any, in the order stations lists them, default last.
+    """
+    lookup = {str(key).casefold(): station for key, station in stations.items()}
+    groups = OrderedDict((station, []) for station in stations.values())
+    groups.setdefault(default_station, [])
+    for item in items:
+        station = lookup.get(item.name.casefold()) or lookup.get(item.category.casefold()) or default_station
+        groups[station].append(item)
+    return OrderedDict((station, items) for station, items in groups.items() if items)
+
+
+def _station_outputs(output_path, groups, order):
+    """Where each station's ticket goes, checked before anything is rendered"""
+    if output_path is None:
+        return dict.fromkeys(groups)
+    if isinstance(output_path, dict):
+        missing = [station for station in groups if station not in output_path]
+        if missing:
+            raise ValueError(f"No output given for station {', '.join(missing)}")
+        return output_path
+    if hasattr(output_path, 'write') or (len(groups) > 1 and '{station}' not in str(output_path)):
+        raise ValueError("Station tickets need an output per station: pass a dict, or a path pattern with {station}")
+    return {station: str(output_path).format(station=safe_filename(station),
+                                             order_number=safe_filename(order.order_number))
+            for station in groups}
+
+
+def _print_time():
+    """The time now as kitchen tickets print it, always as long as PRINT_TIME_PLACEHOLDER"""
+    now = datetime.now()
+    return f"{now:%I:%M:%S} {'AM' if now.hour < 12 else 'PM'}"
+
+
+def _stamp_print_time(pdf):
+    """A cached kitchen PDF with the time now in place of PRINT_TIME_PLACEHOLDER"""
+    return pdf.replace(PRINT_TIME_PLACEHOLDER.encode('ascii'), _print_time().encode('ascii'))
+
+
+def _order_number(order_data, default='N/A'):
+    """Order number of an Order or raw order dict, for naming files and reporting failures"""
+    if isinstance(order_data, Order):
+        return order_data.order_number
+    if isinstance(order_data, dict):
+        return order_data.get('order_number', default)
+    return default
 
 
 def generate_sample_receipts():
@@ -510,6 +2074,21 @@ def generate_sample_receipts():
     generator.generate_customer_receipt(order_data, customer_receipt_path)
     print(f"✅ Customer receipt generated: {customer_receipt_path}")
     
+    # Compact copy, the one sent over WhatsApp
+    compact_receipt_path = '/mnt/user-data/outputs/customer_receipt_compact.pdf'
+    generator.generate_customer_receipt(order_data, compact_receipt_path, compact=True)
+    print(f"✅ Compact customer receipt generated: {compact_receipt_path} "
+          f"({os.path.getsize(compact_receipt_path)} bytes)")
+    
+    # Image copy and order card for WhatsApp image messages
+    image_receipt_path = '/mnt/user-data/outputs/customer_receipt.png'
+    generator.generate_customer_receipt(order_data, image_receipt_path, output_format='png')
+    print(f"✅ Customer receipt image generated: {image_receipt_path} "
+          f"({os.path.getsize(image_receipt_path)} bytes)")
+    order_card_path = '/mnt/user-data/outputs/order_card.png'
+    generator.generate_order_card(order_data, order_card_path)
+    print(f"✅ Order card generated: {order_card_path}")
+    
     # Generate kitchen receipt
     kitchen_receipt_path = '/mnt/user-data/outputs/kitchen_receipt.pdf'
     generator.generate_kitchen_receipt(order_data, kitchen_receipt_path)
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+LocalFirst YYC - Receipt Images
+Draws receipts straight to PNG/JPEG with Pillow, so WhatsApp can show
+them inline instead of sending a PDF the customer has to open
+"""
+
+from functools import lru_cache
+import io
+import re
+
+from PIL import Image, ImageDraw, ImageFont
+
+from receipt_cache import SizedLRU
+
+# Layout sizes are given in pixels at this width and scaled to the one asked for
+BASE_WIDTH = 600
+
+FONT_PATHS = {
+    False: ['/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', 'DejaVuSans.ttf'],
+    True: ['/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf', 'DejaVuSans-Bold.ttf'],
+}
+
+# Receipts are flat colours and text: a 64 colour palette PNG is a fraction of
+# the size of a full colour one and still holds the photos well enough
+PNG_COLORS = 64
+JPEG_QUALITY = 80
+
+# Runs of emoji/symbols, plus the joiners and variation selectors between them
+SYMBOL_RE = re.compile('[\u2190-\u21ff\u2600-\u27bf\u2b00-\u2bff\U0001f000-\U0001faff\u200d\ufe0f]+')
+SYMBOL_JOINERS = '\u200d\ufe0f'
+_SYMBOL_SPACE_RE = re.compile(f'({SYMBOL_RE.pattern})( ?)')
+
+BLACK = '#000000'
+GREY = '#808080'
+
+
+@lru_cache(maxsize=64)
+def _font(size, bold=False):
+    """Text font at a pixel size, loaded once per process"""
+    for path in FONT_PATHS[bold]:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+@lru_cache(maxsize=64)
+def _symbol_face(path, size):
+    return ImageFont.truetype(path, size)
+
+
+class RegionCache(SizedLRU):
+    """
+    Process-wide LRU of pre-drawn image regions, such as owner/driver cards
+    The same restaurant owner and driver appear on receipt after receipt, so
+    their cards are drawn once per width and pasted in after that.
+    Callers key regions on everything that changes how they look;
+    get(key, render) draws a missing one.
+    """
+    
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        super().__init__(max_bytes)
+    
+    def _size(self, region):
+        return region.width * region.height * len(region.getbands())
+
+
+# Regions drawn by one generator are reused by the next
+shared_region_cache = RegionCache()
+
+
+class ImageReceiptBuilder:
+    """
+    Lay out one receipt image top to bottom, then draw it in one go
+    Each call adds a block of known height, so the image is allocated once
+    at its final size. Sizes are pixels at BASE_WIDTH.
+    symbol_font is (path, set of code points) for drawing emoji; symbols
+    it has no glyph for are left out rather than drawn as boxes.
+    """
+    
+    def __init__(self, width, symbol_font=None, margin=30, background='#ffffff'):
+        self.width = width
+        self.scale = width / BASE_WIDTH
+        self.margin = self.px(margin)
+        self.background = background
+        self.symbol_font = symbol_font
+        self._blocks = []  # (height, draw(image, draw, y))
+    
+    @property
+    def content_width(self):
+        return self.width - 2 * self.margin
+    
+    def px(self, value):
+        """Pixels at the output width"""
+        return max(1, round(value * self.scale))
+    
+    def text(self, text, size=11, bold=False, color=BLACK, align='left', space_after=4, background=None,
+             indent=0):
+        """Word-wrapped text; background fills the full width behind it"""
+        size = self.px(size)
+        indent = self.px(indent) if indent else 0
+        lines = self._wrap(text, size, bold, self.content_width - indent)
+        leading = round(size * 1.3)
+        pad = self.px(8) if background else 0
+        height = leading * len(lines) + 2 * pad
+        
+        def draw_text(image, draw, y):
+            if background:
+                draw.rectangle((0, y, self.width, y + height - 1), fill=background)
+            for line in lines:
+                self._draw_line(draw, self.margin + indent, y + pad, self.content_width - indent, line, size, bold,
+                                color, align)
+                y += leading
+        
+        self._blocks.append((height, draw_text))
+        return self.space(space_after)
+    
+    def columns(self, cells, widths, aligns=None, size=10, bold=False, color=BLACK, colors=None,
+                background=None, padding=6, line_above=None, line_below=None):
+        """
+        One table row: cells are word-wrapped into columns whose widths are
+        fractions of the content width; line_above/line_below are (colour, thickness)
+        """
+        size = self.px(size)
+        padding = self.px(padding)
+        aligns = aligns or ['left'] * len(cells)
+        colors = colors or [color] * len(cells)
+        inner = self.px(6)
+        spans = []
+        x = self.margin
+        for cell, fraction in zip(cells, widths):
+            span = round(self.content_width * fraction)
+            spans.append((x, span, self._wrap(str(cell), size, bold, span - 2 * inner)))
+            x += span
+        leading = round(size * 1.3)
+        height = leading * max(len(lines) for _, _, lines in spans) + 2 * padding
+        
+        def draw_row(image, draw, y):
+            right = self.margin + self.content_width - 1
+            if background:
+                draw.rectangle((self.margin, y, right, y + height - 1), fill=background)
+            for line, below in ((line_above, False), (line_below, True)):
+                if line:
+                    colour, thickness = line
+                    thickness = self.px(thickness)
+                    top = y + height - thickness if below else y
+                    draw.rectangle((self.margin, top, right, top + thickness - 1), fill=colour)
+            for (x, span, lines), align, colour in zip(spans, aligns, colors):
+                line_y = y + padding
+                for line in lines:
+                    self._draw_line(draw, x + inner, line_y, span - 2 * inner, line, size, bold, colour, align)
+                    line_y += leading
+        
+        self._blocks.append((height, draw_row))
+        return self
+    
+    def rule(self, color='#25D366', thickness=1, space=8):
+        """Full-width horizontal line with space above and below"""
+        space = self.px(space)
+        thickness = self.px(thickness)
+        
+        def draw_rule(image, draw, y):
+            draw.rectangle((self.margin, y + space, self.margin + self.content_width - 1,
+                            y + space + thickness - 1), fill=color)
+        
+        self._blocks.append((2 * space + thickness, draw_rule))
+        return self
+    
+    def space(self, height):
+        """Blank vertical space"""
+        if height:
+            self._blocks.append((self.px(height), lambda image, draw, y: None))
+        return self
+    
+    def region(self, region, full_width=False, space_after=8):
+        """Paste an already drawn region (see card() and image())"""
+        x = 0 if full_width else self.margin
+        self._blocks.append((region.height, lambda image, draw, y: image.paste(region, (x, y))))
+        return self.space(space_after)
+    
+    def card(self, photo, title, body, background, border, photo_size=110, title_size=11, body_size=10):
+        """
+        Photo + story card as a standalone region, content-width wide
+        photo is an encoded image (bytes) or None; the result can be cached
+        and added to any receipt of the same width with region()
+        """
+        pad = self.px(10)
+        edge = self.px(2)
+        photo_px = self.px(photo_size) if photo else 0
+        text_x = pad + photo_px + (self.px(12) if photo else 0)
+        text_width = self.content_width - text_x - pad
+        title_size, body_size = self.px(title_size), self.px(body_size)
+        title_lines = self._wrap(title, title_size, True, text_width)
+        body_lines = self._wrap(body, body_size, False, text_width) if body else []
+        title_leading, body_leading = round(title_size * 1.3), round(body_size * 1.3)
+        gap = self.px(8) if body_lines else 0
+        text_height = title_leading * len(title_lines) + gap + body_leading * len(body_lines)
+        height = 2 * pad + max(photo_px, text_height)
+        
+        card = Image.new('RGB', (self.content_width, height), background)
+        draw = ImageDraw.Draw(card)
+        draw.rectangle((0, 0, card.width - 1, height - 1), outline=border, width=edge)
+        if photo:
+            with Image.open(io.BytesIO(photo)) as im:
+                card.paste(im.convert('RGB').resize((photo_px, photo_px), Image.LANCZOS), (pad, pad))
+        y = pad
+        for line in title_lines:
+            self._draw_line(draw, text_x, y, text_width, line, title_size, True, '#222222', 'left')
+            y += title_leading
+        y += gap
+        for line in body_lines:
+            self._draw_line(draw, text_x, y, text_width, line, body_size, False, '#444444', 'left')
+            y += body_leading
+        return card
+    
+    def image(self, trim=False):
+        """
+        Draw every block onto one image
+        trim=True leaves out the top and bottom margins, for a region that is
+        pasted into another receipt
+        """
+        margin = 0 if trim else self.margin
+        height = sum(height for height, _ in self._blocks)
+        image = Image.new('RGB', (self.width, max(1, height + 2 * margin)), self.background)
+        draw = ImageDraw.Draw(image)
+        y = margin
+        for height, draw_block in self._blocks:
+            draw_block(image, draw, y)
+            y += height
+        return image
+    
+    def getvalue(self, image_format='png'):
+        """The finished receipt encoded as PNG or JPEG bytes"""
+        return encode(self.image(), image_format)
+    
+    def _printable(self, text):
+        """Leave out symbols the symbol font has no glyph for, and the space after them"""
+        covered = self.symbol_font[1] if self.symbol_font else ()
+        
+        def replace(match):
+            symbols = ''.join(c for c in match.group(1) if c not in SYMBOL_JOINERS and ord(c) in covered)
+            return symbols + match.group(2) if symbols else ''
+        
+        return _SYMBOL_SPACE_RE.sub(replace, text)
+    
+    def _runs(self, text, size, bold):
+        """Split printable text into (string, font) runs, symbols in the symbol font"""
+        font = _font(size, bold)
+        runs = []
+        position = 0
+        for match in SYMBOL_RE.finditer(text):
+            if match.start() > position:
+                runs.append((text[position:match.start()], font))
+            runs.append((match.group(), _symbol_face(self.symbol_font[0], size)))
+            position = match.end()
+        if position < len(text):
+            runs.append((text[position:], font))
+        return runs
+    
+    def _measure(self, text, size, bold):
+        return sum(font.getlength(run) for run, font in self._runs(text, size, bold))
+    
+    def _wrap(self, text, size, bold, width):
+        """Greedy word wrap to a pixel width; newlines start a new line"""
+        lines = []
+        for paragraph in self._printable(text).split('\n'):
+            line = ''
+            for word in paragraph.split():
+                candidate = f"{line} {word}" if line else word
+                if line and self._measure(candidate, size, bold) > width:
+                    lines.append(line)
+                    line = word
+                else:
+                    line = candidate
+            lines.append(line)
+        return lines
+    
+    def _draw_line(self, draw, x, y, width, line, size, bold, color, align):
+        runs = self._runs(line, size, bold)
+        if align != 'left':
+            used = sum(font.getlength(run) for run, font in runs)
+            x += width - used if align == 'right' else (width - used) / 2
+        baseline = y + _font(size, bold).getmetrics()[0]
+        for run, font in runs:
+            draw.text((x, baseline), run, font=font, fill=color, anchor='ls')
+            x += font.getlength(run)
+
+
+def encode(image, image_format='png'):
+    """PNG (palette) or JPEG bytes for an image"""
+    buffer = io.BytesIO()
+    if image_format == 'png':
+        _quantize(image).save(buffer, 'PNG', compress_level=6)
+    elif image_format == 'jpeg':
+        image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        raise ValueError(f"Unknown image format: {image_format}")
+    return buffer.getvalue()
+
+
+def _quantize(image):
+    """
+    The image reduced to PNG_COLORS colours
+    Colours are picked from a half-size copy, which is four times quicker and
+    finds the same ones; median cut keeps the light card tints apart from the
+    page. Pillow maps pixels onto a given palette only approximately, so the
+    entries that white and black land on are set back to exact white and black.
+    """
+    palette = image.reduce(2).quantize(PNG_COLORS, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+    quantized = image.quantize(palette=palette, dither=Image.Dither.NONE)
+    values = quantized.getpalette()
+    for exact in ((255, 255, 255), (0, 0, 0)):
+        index = Image.new('RGB', (1, 1), exact).quantize(palette=palette, dither=Image.Dither.NONE).getpixel((0, 0))
+        values[index * 3:index * 3 + 3] = exact
+    quantized.putpalette(values)
+    return quantized
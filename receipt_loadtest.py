@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+LocalFirst YYC - Receipt Load Test
+Feeds a stream of orders into a PrintServer at a target rate, with a fake
+printer and a fake WhatsApp endpoint on localhost standing in for the real
+ones, and reports whether the server keeps up with a dinner rush
+
+Runs entirely offline. Orders are synthesized (varied item counts, toppings,
+cash on delivery share and photos) or replayed from a JSON Lines order log.
+
+Examples:
+    python receipt_loadtest.py --rate 5 --duration 60
+    python receipt_loadtest.py --kind customer --rate 3 --workers 4 --output rush.json
+    python receipt_loadtest.py --replay /var/log/orders.jsonl --rate 20 --queue-size 64
+"""
+
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import glob
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import escpos
+from order_model import OrderError, parse_json
+from print_server import PrintServer
+from receipt_benchmark import make_order, make_photos
+
+# Relative share of orders by item count: mostly a meal for one or two, now and then catering
+ITEM_COUNT_WEIGHTS = {1: 25, 2: 25, 3: 20, 4: 10, 6: 10, 10: 6, 25: 3, 60: 1}
+
+# Card payments, when an order is not cash on delivery
+CARD_METHODS = ('visa', 'mastercard', 'debit', 'amex')
+
+# Receipts go to a printer or to WhatsApp, in the format each one takes
+DEFAULT_FORMATS = {'kitchen': 'escpos', 'customer': 'png'}
+
+# A server keeps up when no backlog builds: it never holds the feed back (a full
+# queue) for longer than KEEP_UP_MAX_HELD, and once the last order has arrived
+# whatever is still queued is done within KEEP_UP_MAX_DRAIN (seconds)
+KEEP_UP_MAX_HELD = 0.1
+KEEP_UP_MAX_DRAIN = 1.0
+
+
+def synthesize_orders(count=None, cod_share=0.25, photo_share=0.6, photos=None, seed=None):
+    """
+    Orders shaped like a real evening's: mostly small, some with toppings and
+    notes, cod_share paid cash on delivery and photo_share with owner and
+    driver photos (photos is the pair from receipt_benchmark.make_photos)
+    count=None keeps making orders for as long as the caller reads them.
+    """
+    rng = random.Random(seed)
+    counts, weights = zip(*ITEM_COUNT_WEIGHTS.items())
+    numbers = itertools.count(1) if count is None else range(1, count + 1)
+    for number in numbers:
+        order = make_order(
+            item_count=rng.choices(counts, weights)[0],
+            toppings=rng.choice((0, 0, 0, 1, 2, 4)),
+            instructions=rng.random() < 0.2,
+            photos=photos if photos and rng.random() < photo_share else None,
+            payment_method='cash' if rng.random() < cod_share else rng.choice(CARD_METHODS),
+            order_number=f"LT-{number:06d}",
+        )
+        order['created_at'] = datetime.now().isoformat(timespec='seconds')
+        yield order
+
+
+def replay_orders(path):
+    """Raw orders from a JSON Lines order log, as they were logged; blank lines are skipped"""
+    with open(path, 'rb') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield parse_json(line)
+            except ValueError as e:
+                raise OrderError(f"{path}: line {number}: invalid JSON: {e}") from None
+
+
+class FakeWhatsApp:
+    """
+    Local stand-in for the WhatsApp media upload
+    Accepts receipts POSTed to url, counts them and answers with a message
+    id after delay seconds, the round trip the real API would add.
+    """
+    
+    def __init__(self, host='127.0.0.1', port=0, delay=0.0):
+        self.delay = delay
+        self.messages = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        fake = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if fake.delay:
+                    time.sleep(fake.delay)
+                with fake._lock:
+                    fake.messages += 1
+                    fake.bytes_received += len(body)
+                    reply = json.dumps({'messages': [{'id': f"wamid.fake{fake.messages}"}]}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+    
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/messages"
+    
+    def send(self, order_data, data):
+        """PrintServer sink: upload one receipt the way the notification service would"""
+        request = urllib.request.Request(self.url, data=data, headers={
+            'Content-Type': 'application/octet-stream',
+            'X-Order-Number': str(order_data.get('order_number', '')),
+        })
+        with urllib.request.urlopen(request, timeout=10) as response:
+            response.read()
+    
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+    
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _Recorder:
+    """PrintServer metrics hook keeping each render's finish time and timings"""
+    
+    def __init__(self):
+        self.renders = []  # (finished, order_number, queue_wait, render seconds)
+        self._lock = threading.Lock()
+    
+    def __call__(self, metrics):
+        with self._lock:
+            self.renders.append((time.monotonic(), metrics.get('order_number'), metrics['queue_wait'],
+                                 metrics['total']))
+
+
+def _memory_mb(pid):
+    """Resident memory of a process in MB, or None where /proc is not available"""
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+def _children(pid):
+    """Child process ids of a process (Linux)"""
+    children = []
+    for path in glob.glob(f'/proc/{pid}/task/*/children'):
+        try:
+            with open(path) as f:
+                children.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return children
+
+
+def _summary(seconds):
+    """p50/p90/p99/max of a list of seconds, in milliseconds"""
+    if not seconds:
+        return {'p50': None, 'p90': None, 'p99': None, 'max': None}
+    values = sorted(seconds)
+    pick = lambda q: round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 1)
+    return {'p50': pick(0.50), 'p90': pick(0.90), 'p99': pick(0.99), 'max': round(values[-1] * 1000, 1)}
+
+
+def run_load_test(orders, rate, kind='kitchen', output_format=None, workers=2, queue_size=32,
+                  arrivals='poisson', duration=None, sample_interval=1.0, whatsapp_delay=0.0, seed=None):
+    """
+    Submit orders to a PrintServer at rate orders per second and measure how it copes
+    arrivals='poisson' spaces orders randomly, in bursts like real ones;
+    'uniform' spaces them evenly. Kitchen tickets go to a FakePrinter, customer
+    receipts to a FakeWhatsApp. The feed stops when orders run out or after
+    duration seconds, then everything queued is finished; orders can be
+    endless (see synthesize_orders) as long as duration is given.
+    submit() blocks while the server's queue is full, so an overloaded server
+    holds the feed back: that time counts towards each order's queueing delay,
+    measured from when the order was due to arrive. Returns the report.
+    """
+    output_format = output_format or DEFAULT_FORMATS[kind]
+    rng = random.Random(seed)
+    recorder = _Recorder()
+    due = {}  # order_number -> (due at, held back)
+    timeline = []
+    stop = threading.Event()
+    
+    with escpos.FakePrinter(keep=False) as printer, FakeWhatsApp(delay=whatsapp_delay) as whatsapp:
+        server = PrintServer(printer=printer.address if kind == 'kitchen' else None, kind=kind,
+                             output_format=output_format, workers=workers, queue_size=queue_size,
+                             metrics=[recorder], sinks=[whatsapp.send] if kind == 'customer' else [],
+                             verbose=False).start()
+        started = time.monotonic()
+        submitted = 0
+        
+        def sample():
+            last = (0.0, 0)
+            while True:
+                stopping = stop.wait(sample_interval)
+                now = time.monotonic() - started
+                stats = server.stats()
+                rendered = stats['rendered'] + stats['failed']
+                workers_mb = [_memory_mb(child) for child in _children(os.getpid())]
+                point = {
+                    't': round(now, 2),
+                    'submitted': submitted,
+                    'rendered': stats['rendered'],
+                    'failed': stats['failed'],
+                    'queue_depth': stats['queue_depth'],
+                    'throughput_per_s': round((rendered - last[1]) / max(now - last[0], 1e-9), 2),
+                    'rss_mb': round(_memory_mb(os.getpid()) or 0, 1),
+                    # None once the render processes have exited
+                    'workers_rss_mb': round(sum(mb or 0 for mb in workers_mb), 1) if workers_mb else None,
+                }
+                timeline.append(point)
+                last = (now, rendered)
+                workers_rss = ''
+                if point['workers_rss_mb'] is not None:
+                    workers_rss = f" + workers {point['workers_rss_mb']:>6.1f} MB"
+                print(f"  {point['t']:>7.1f}s  submitted {submitted:>6}  rendered {point['rendered']:>6}  "
+                      f"queue {point['queue_depth']:>4}  {point['throughput_per_s']:>7.1f}/s  "
+                      f"{point['rss_mb']:>6.1f} MB{workers_rss}", file=sys.stderr, flush=True)
+                if stopping:
+                    return
+        
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        
+        # Feed orders on schedule
+        due_at = last_due = started
+        for number, order_data in enumerate(orders, 1):
+            if duration is not None and due_at - started >= duration:
+                # No arrival falls in the rest of the window, but it is still part of the run
+                time.sleep(max(0.0, started + duration - time.monotonic()))
+                break
+            order_data.setdefault('order_number', f"LT-R{number:06d}")
+            wait = due_at - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            held_back = max(0.0, time.monotonic() - due_at)
+            if server.submit(order_data):
+                due[str(order_data['order_number'])] = (due_at, held_back)
+            submitted += 1
+            last_due = due_at
+            due_at += rng.expovariate(rate) if arrivals == 'poisson' else 1 / rate
+        fed = time.monotonic() - started
+        
+        server.shutdown()
+        stop.set()
+        sampler.join()
+        sinks = {
+            'printer_jobs': printer.job_count,
+            'printer_bytes': printer.bytes_received,
+            'whatsapp_messages': whatsapp.messages,
+            'whatsapp_bytes': whatsapp.bytes_received,
+        }
+    
+    # Per order: arrival to delivery, and arrival to the start of its render
+    latencies, queue_delays, render_times, held = [], [], [], []
+    for finished, order_number, queue_wait, render_time in recorder.renders:
+        due_at, held_back = due.get(str(order_number), (None, 0.0))
+        if due_at is None:
+            continue
+        latencies.append(finished - due_at)
+        queue_delays.append(held_back + queue_wait)
+        render_times.append(render_time)
+        held.append(held_back)
+    
+    stats = server.stats()
+    finished = [render[0] - started for render in recorder.renders]
+    span = max(finished, default=fed)
+    throughput = stats['rendered'] / span if span else 0.0
+    drain = max(0.0, span - (last_due - started))
+    # Sustained rate: renders finished in the middle 80% of the run, past warm-up and drain
+    # (too few renders to tell for a very short run, which falls back to the overall rate)
+    middle = [t for t in finished if 0.1 * span <= t <= 0.9 * span]
+    sustained = len(middle) / (0.8 * span) if len(middle) >= 10 else throughput
+    # Offered: the schedule's rate, which a full queue holding the feed back does not lower,
+    # less the duplicates the server drops
+    offered = (submitted - 1) / (last_due - started) if last_due > started else submitted / max(fed, 1e-9)
+    offered *= (submitted - stats['duplicates']) / max(submitted, 1)
+    
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'settings': {
+            'kind': kind,
+            'format': output_format,
+            'rate_per_s': rate,
+            'arrivals': arrivals,
+            'duration_s': duration,
+            'workers': workers,
+            'queue_size': queue_size,
+            'whatsapp_delay_s': whatsapp_delay,
+        },
+        'orders': {
+            'submitted': submitted,
+            'rendered': stats['rendered'],
+            'failed': stats['failed'],
+            'duplicates': stats['duplicates'],
+        },
+        'offered_rate_per_s': round(offered, 2),
+        'throughput_per_s': round(throughput, 2),
+        'sustained_throughput_per_s': round(sustained, 2),
+        'fed_s': round(fed, 2),
+        'drain_s': round(drain, 3),
+        'keeps_up': max(held, default=0.0) <= KEEP_UP_MAX_HELD and drain <= KEEP_UP_MAX_DRAIN,
+        'latency_ms': _summary(latencies),
+        'queue_delay_ms': _summary(queue_delays),
+        'held_back_ms': _summary(held),
+        'render_ms': _summary(render_times),
+        'memory_mb': {
+            'start': timeline[0]['rss_mb'] if timeline else None,
+            'peak': max((point['rss_mb'] for point in timeline), default=None),
+            'workers_peak': max((point['workers_rss_mb'] or 0 for point in timeline), default=None),
+            'end': timeline[-1]['rss_mb'] if timeline else None,
+        },
+        'sinks': sinks,
+        'timeline': timeline,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test a LocalFirst YYC print server, offline')
+    parser.add_argument('--replay', metavar='FILE', help='JSON Lines order log to replay (default: synthesize)')
+    parser.add_argument('--rate', type=float, default=5, help='orders per second')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to feed orders for')
+    parser.add_argument('--arrivals', choices=['poisson', 'uniform'], default='poisson')
+    parser.add_argument('--kind', choices=['kitchen', 'customer'], default='kitchen')
+    parser.add_argument('--format', dest='output_format', choices=['pdf', 'escpos', 'png', 'jpeg'],
+                        help='default escpos for kitchen, png for customer')
+    parser.add_argument('--workers', type=int, default=2, help='render processes')
+    parser.add_argument('--queue-size', type=int, default=32, help='orders waiting before the feed is held back')
+    parser.add_argument('--cod-share', type=float, default=0.25, help='share of synthesized orders paid in cash')
+    parser.add_argument('--photo-share', type=float, default=0.6, help='share of synthesized orders with photos')
+    parser.add_argument('--whatsapp-delay', type=float, default=0.0,
+                        help='seconds the fake WhatsApp takes to answer')
+    parser.add_argument('--sample-interval', type=float, default=1.0, help='seconds between timeline samples')
+    parser.add_argument('--seed', type=int, help='seed for synthesized orders and arrivals')
+    parser.add_argument('--output', help='save the report as JSON')
+    args = parser.parse_args(argv)
+    
+    output_format = args.output_format or DEFAULT_FORMATS[args.kind]
+    if output_format == 'escpos' and args.kind != 'kitchen':
+        parser.error('--format escpos is only available for kitchen receipts')
+    if output_format in ('png', 'jpeg') and args.kind != 'customer':
+        parser.error(f'--format {output_format} is only available for customer receipts')
+    
+    with tempfile.TemporaryDirectory() as photo_dir:
+        if args.replay:
+            orders = replay_orders(args.replay)
+        else:
+            photos = make_photos(photo_dir) if args.photo_share > 0 else None
+            # As many as the arrivals schedule fits into --duration
+            orders = synthesize_orders(None, args.cod_share, args.photo_share, photos, args.seed)
+        print(f"🚦 {args.rate:g} orders/s for {args.duration:g}s, {args.workers} workers, "
+              f"queue {args.queue_size}", file=sys.stderr, flush=True)
+        try:
+            report = run_load_test(orders, args.rate, args.kind, output_format, args.workers, args.queue_size,
+                                   args.arrivals, args.duration, args.sample_interval, args.whatsapp_delay,
+                                   args.seed)
+        except (OSError, OrderError) as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 2
+    
+    print(f"{'✅ Keeps up' if report['keeps_up'] else '❌ Falls behind'}: "
+          f"offered {report['offered_rate_per_s']}/s, sustained {report['sustained_throughput_per_s']}/s, "
+          f"latency p50 {report['latency_ms']['p50']} ms p99 {report['latency_ms']['p99']} ms, "
+          f"queueing p99 {report['queue_delay_ms']['p99']} ms, drained in {report['drain_s']}s", file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report saved: {args.output}", file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 0 if report['keeps_up'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
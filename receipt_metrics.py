@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+LocalFirst YYC - Receipt Metrics
+Stage timings for each render, plus exporters that turn them into
+JSON lines or Prometheus text for the print server's monitoring
+"""
+
+from contextlib import contextmanager
+import json
+import threading
+import time
+
+# Render stages, in pipeline order
+STAGES = ('images', 'story', 'tables', 'build')
+
+# Histogram buckets for render/stage durations, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class StageTimer:
+    """
+    Accumulates time per stage for one render
+    Time not spent in a named stage is counted as story assembly. Stages may
+    nest: time in an inner stage counts for it alone, not for the outer one.
+    """
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self._open = []  # [name, time inside inner stages] of the stages entered, innermost last
+    
+    @contextmanager
+    def stage(self, name):
+        """Use as `with timer.stage('tables'):` around the work to time"""
+        entered = time.perf_counter()
+        self._open.append([name, 0.0])
+        try:
+            yield self
+        finally:
+            _, inner = self._open.pop()
+            elapsed = time.perf_counter() - entered
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed - inner
+            if self._open:
+                self._open[-1][1] += elapsed
+    
+    def report(self, **details):
+        """Finished timings plus whatever else the caller knows about the render"""
+        total = time.perf_counter() - self.started
+        stages = dict(self.stages)
+        stages['story'] = max(0.0, total - sum(stages.values()))
+        report = dict(details)
+        report['stages'] = {name: stages[name] for name in STAGES if name in stages}
+        report['total'] = total
+        return report
+
+
+class JsonLinesExporter:
+    """Metrics hook that writes one JSON object per render to a stream"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+    
+    def __call__(self, metrics):
+        line = json.dumps(dict(metrics, time=round(time.time(), 3)))
+        with self._lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+
+class PrometheusExporter:
+    """
+    Metrics hook that aggregates renders into Prometheus counters and histograms
+    render() returns the text exposition format; serve_metrics() exposes it over HTTP.
+    """
+    
+    def __init__(self, prefix='localfirst_receipt'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._renders = {}      # kind -> count
+        self._pages = {}        # kind -> pages
+        self._bytes = {}        # kind -> bytes
+        self._histograms = {}   # (kind, stage) -> [bucket counts..., sum, count]
+        self._gauges = {}       # name -> (help, value)
+    
+    def __call__(self, metrics):
+        kind = metrics.get('kind', 'unknown')
+        with self._lock:
+            self._renders[kind] = self._renders.get(kind, 0) + 1
+            self._pages[kind] = self._pages.get(kind, 0) + (metrics.get('pages') or 0)
+            self._bytes[kind] = self._bytes.get(kind, 0) + (metrics.get('bytes') or 0)
+            self._observe((kind, 'total'), metrics['total'])
+            for stage, seconds in metrics.get('stages', {}).items():
+                self._observe((kind, stage), seconds)
+            for name, value in (metrics.get('photo_cache') or {}).items():
+                self._gauges[f'photo_cache_{name}'] = ('Owner/driver photo cache ' + name.replace('_', ' '), value)
+    
+    def gauge(self, name, value, help_text=''):
+        """Set a point-in-time value, e.g. the print server's queue depth"""
+        with self._lock:
+            self._gauges[name] = (help_text, value)
+    
+    def _observe(self, key, seconds):
+        histogram = self._histograms.setdefault(key, [0] * (len(BUCKETS) + 2))
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram[i] += 1
+        histogram[-2] += seconds
+        histogram[-1] += 1
+    
+    def render(self):
+        """Everything collected so far, in Prometheus text format"""
+        p = self.prefix
+        lines = []
+        with self._lock:
+            for name, help_text, values in (
+                ('renders_total', 'Receipts rendered', self._renders),
+                ('pages_total', 'Pages rendered', self._pages),
+                ('bytes_total', 'Bytes of receipt output', self._bytes),
+            ):
+                lines.append(f'# HELP {p}_{name} {help_text}')
+                lines.append(f'# TYPE {p}_{name} counter')
+                for kind, value in sorted(values.items()):
+                    lines.append(f'{p}_{name}{{kind="{kind}"}} {value}')
+            
+            lines.append(f'# HELP {p}_seconds Render time per stage ("total" is the whole render)')
+            lines.append(f'# TYPE {p}_seconds histogram')
+            for (kind, stage), histogram in sorted(self._histograms.items()):
+                labels = f'kind="{kind}",stage="{stage}"'
+                for bound, count in zip(BUCKETS, histogram):
+                    lines.append(f'{p}_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{p}_seconds_bucket{{{labels},le="+Inf"}} {histogram[-1]}')
+                lines.append(f'{p}_seconds_sum{{{labels}}} {histogram[-2]:.6f}')
+                lines.append(f'{p}_seconds_count{{{labels}}} {histogram[-1]}')
+            
+            for name, (help_text, value) in sorted(self._gauges.items()):
+                if help_text:
+                    lines.append(f'# HELP {p}_{name} {help_text}')
+                lines.append(f'# TYPE {p}_{name} gauge')
+                lines.append(f'{p}_{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def serve_metrics(exporter, port, host='0.0.0.0'):
+    """Serve a PrometheusExporter at http://host:port/metrics from a background thread"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Only servers pay for the import
+    
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = exporter.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass  # Scrapes every few seconds would flood the print server log
+    
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
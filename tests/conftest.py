@@ -0,0 +1,67 @@
+"""Shared fixtures: sample orders and photos, with the repo root importable"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def photos(tmp_path):
+    """Small owner and driver photos on disk"""
+    from PIL import Image
+    paths = {}
+    for who, colour in (('owner', '#e07020'), ('driver', '#25d366')):
+        paths[who] = str(tmp_path / f'{who}.jpg')
+        Image.new('RGB', (240, 240), colour).save(paths[who], 'JPEG')
+    return paths
+
+
+@pytest.fixture
+def order_data(photos):
+    """An order as the app sends it, with owner and driver photos"""
+    return {
+        'order_number': 'LF-1001',
+        'customer_name': 'Sarah',
+        'customer_phone': '4035551234',
+        'customer_address': '123 Main St NW',
+        'restaurant_name': 'AB King Pizza',
+        'restaurant_owner': {'name': 'Fatima', 'image': photos['owner'], 'story': 'Family recipes since 1998.'},
+        'driver': {'name': 'Ahmed', 'image': photos['driver'], 'story': 'Thanks for the tip!'},
+        'items': [
+            {'name': 'Pepperoni Pizza', 'quantity': 2, 'price': 20.99, 'toppings': ['Extra Cheese'],
+             'instructions': 'Well done', 'category': 'pizza'},
+            {'name': 'Garlic Bread', 'quantity': 1, 'price': 5.99, 'category': 'sides'},
+            {'name': 'Coke', 'quantity': 1, 'price': 3.99, 'category': 'drinks'},
+        ],
+        'subtotal': 51.96,
+        'discount': 5.20,
+        'discount_type': 'first_order',
+        'delivery_fee': 3.50,
+        'tip': 6.00,
+        'total': 56.26,
+        'payment_method': 'visa',
+        'created_at': '2026-01-15T18:30:00',
+    }
+
+
+@pytest.fixture
+def pdf_words():
+    """Function giving the words a PDF draws, in drawing order, with the print time blanked out"""
+    import re
+    import zlib
+    
+    def words(pdf):
+        content = b''
+        for match in re.finditer(rb'stream\r?\n(.*?)endstream', pdf, re.S):
+            try:
+                content += zlib.decompress(match.group(1))
+            except zlib.error:
+                content += match.group(1)
+        text = b' '.join(re.findall(rb'\(((?:\\.|[^\\)])*)\) Tj', content)).decode('latin-1')
+        text = re.sub(r'\\([()\\])', r'\1', text)
+        return re.sub(r'Printed: \S+ \S+', 'Printed:', text).split()
+    
+    return words
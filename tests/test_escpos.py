@@ -0,0 +1,28 @@
+import escpos
+from receipt_generator import ReceiptGenerator
+
+
+def test_builder_wraps_and_replaces_symbols():
+    job = escpos.EscPosBuilder(columns=20).text('⚠️ NOTE: extra crispy please, well done').cut().getvalue()
+    assert job.startswith(escpos.INIT)
+    assert job.endswith(escpos.FEED_AND_CUT)
+    lines = escpos.strip_commands(job).splitlines()
+    assert lines[0].startswith('!! NOTE')
+    assert all(len(line) <= 20 for line in lines)
+
+
+def test_double_width_text_wraps_at_half_the_columns():
+    job = escpos.EscPosBuilder(columns=20, init=False).text('1x PEPPERONI PIZZA LARGE', size=escpos.DOUBLE)
+    assert all(len(line) <= 10 for line in escpos.strip_commands(job.getvalue()).splitlines())
+
+
+def test_kitchen_ticket_reaches_a_fake_printer(order_data):
+    ticket = ReceiptGenerator().generate_kitchen_receipt(order_data, output_format='escpos')
+    text = escpos.strip_commands(ticket)
+    for expected in ('#LF-1001', 'CUSTOMER: SARAH', '2x PEPPERONI PIZZA', '+ Extra Cheese', '* PAID ONLINE'):
+        assert expected in text
+    
+    with escpos.FakePrinter() as printer:
+        escpos.send_to_printer(ticket, *printer.address)
+        printer.wait_for_jobs(1)
+        assert printer.jobs == [ticket]
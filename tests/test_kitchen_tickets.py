@@ -0,0 +1,65 @@
+import re
+
+import pytest
+
+from receipt_benchmark import make_order
+from receipt_generator import ReceiptGenerator, THERMAL_WIDTH
+
+
+def page_sizes(pdf):
+    """(width, height) of every page, in points"""
+    return [tuple(float(n) for n in box.split()[2:]) for box in
+            re.findall(rb'/MediaBox \[\s*([\d.\s]+?)\s*\]', pdf)]
+
+
+def test_large_order_keeps_every_item_across_pages(pdf_words):
+    order = make_order(120, toppings=2, instructions=True)
+    pdf = ReceiptGenerator().generate_kitchen_receipt(order)
+    assert len(page_sizes(pdf)) > 1
+    words = pdf_words(pdf)
+    assert words.count('NOTE:') == 120
+
+
+def test_continuous_ticket_is_one_page_sized_to_it(pdf_words):
+    generator = ReceiptGenerator()
+    order = make_order(12, toppings=2, instructions=True)
+    paged = generator.generate_kitchen_receipt(order)
+    continuous = generator.generate_kitchen_receipt(order, continuous=True)
+    
+    [(width, height)] = page_sizes(continuous)
+    assert width == pytest.approx(THERMAL_WIDTH, abs=0.01)
+    assert height != page_sizes(paged)[0][1]
+    assert pdf_words(continuous) == pdf_words(paged)
+
+
+def test_large_customer_receipt_lists_every_item(pdf_words):
+    order = make_order(150)
+    pdf = ReceiptGenerator().generate_customer_receipt(order)
+    assert len(page_sizes(pdf)) > 1
+    words = pdf_words(pdf)
+    assert all(item['name'].split()[0] in words for item in order['items'])
+
+
+@pytest.mark.parametrize('count', [3, 40])
+def test_fast_ticket_draws_the_same_text_as_platypus(pdf_words, count):
+    generator = ReceiptGenerator()
+    order = make_order(count, toppings=2, instructions=True)
+    platypus = generator.generate_kitchen_receipt(order, use_cache=False)
+    fast = generator.generate_kitchen_receipt(order, use_cache=False, fast=True)
+    
+    assert pdf_words(fast) == pdf_words(platypus)
+    assert page_sizes(fast)[0][0] == pytest.approx(THERMAL_WIDTH, abs=0.01)
+
+
+def test_escpos_ticket_lists_the_same_items(pdf_words):
+    generator = ReceiptGenerator()
+    order = make_order(5, toppings=1, instructions=True)
+    words = pdf_words(generator.generate_kitchen_receipt(order, fast=True))
+    escpos = generator.generate_kitchen_receipt(order, output_format='escpos').decode('latin-1')
+    
+    assert f"#{order['order_number']}" in words
+    assert f"#{order['order_number']}" in escpos
+    for item in order['items']:
+        name = item['name'].upper().split()[0]
+        assert name in words
+        assert name in escpos
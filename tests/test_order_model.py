@@ -0,0 +1,95 @@
+from datetime import datetime
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from order_model import Order, OrderError, parse_orders, safe_filename
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_parses_amounts_to_cents_and_formats_the_phone(order_data):
+    order = Order.from_dict(order_data)
+    assert (order.subtotal, order.discount, order.tip, order.total) == (5196, 520, 600, 5626)
+    assert order.items[0].price == 2099
+    assert order.customer_phone == '(403) 555-1234'
+    assert order.created_at == datetime(2026, 1, 15, 18, 30)
+
+
+def test_totals_that_do_not_add_up_are_rejected(order_data):
+    with pytest.raises(OrderError, match='total'):
+        Order.from_dict(dict(order_data, total=99.00))
+    assert Order.from_dict(dict(order_data, total=99.00), validate=False).total == 9900
+
+
+def test_malformed_values_always_raise(order_data):
+    with pytest.raises(OrderError, match='item price'):
+        Order.from_dict(dict(order_data, items=[{'name': 'Pizza', 'price': 'twenty'}]), validate=False)
+    with pytest.raises(OrderError, match='created_at'):
+        Order.from_dict(dict(order_data, created_at='yesterday'), validate=False)
+
+
+@pytest.mark.parametrize('bad', [
+    {'subtotal': 'Infinity'},
+    {'tip': 'NaN'},
+    {'total': 1e308},
+    {'items': ['pizza']},
+    {'items': 'not a list'},
+    {'items': [{'name': 'Pizza', 'quantity': 1e400}]},
+    {'driver': 'Ahmed'},
+    {'restaurant_owner': ['Fatima']},
+])
+def test_garbage_values_raise_order_error(order_data, bad):
+    with pytest.raises(OrderError):
+        Order.from_dict(dict(order_data, **bad), validate=False)
+
+
+def test_check_reports_garbage_orders_without_a_traceback(order_data, tmp_path):
+    path = tmp_path / 'orders.jsonl'
+    path.write_text(json.dumps(dict(order_data, subtotal='Infinity')) + '\n')
+    result = subprocess.run([sys.executable, os.path.join(ROOT, 'receipt_cli.py'), 'check', str(path)],
+                            capture_output=True, text=True)
+    assert result.returncode == 1
+    assert 'Traceback' not in result.stderr and 'subtotal' in result.stderr
+
+
+def test_order_does_not_keep_its_raw_dict(order_data):
+    order = Order.from_dict(order_data)
+    assert not hasattr(order, 'source')
+    assert not hasattr(order, '__dict__')
+
+
+def test_to_dict_round_trips_and_ignores_raw_formatting(order_data):
+    order = Order.from_dict(order_data)
+    assert Order.from_dict(order.to_dict()) == order
+    
+    reordered = json.loads(json.dumps(dict(reversed(list(order_data.items())), status='printed')))
+    reordered['customer_phone'] = '(403) 555-1234'
+    assert Order.from_dict(reordered).to_dict() == order.to_dict()
+
+
+def test_to_dict_leaves_out_a_defaulted_created_at(order_data):
+    del order_data['created_at']
+    order = Order.from_dict(order_data)
+    assert order.created_at and not order.created_at_given
+    assert 'created_at' not in order.to_dict()
+    assert Order.from_dict(order_data).to_dict() == order.to_dict()
+
+
+def test_parse_orders_accepts_arrays_objects_and_json_lines(order_data):
+    line = json.dumps(order_data)
+    assert len(parse_orders(f'[{line}, {line}]'.encode())) == 2
+    assert len(parse_orders(line.encode())) == 1
+    assert len(parse_orders(f'{line}\n\n{line}\n'.encode())) == 2
+    with pytest.raises(OrderError, match='line 2'):
+        parse_orders(f'{line}\n{{"total": "x"}}\n'.encode())
+
+
+def test_safe_filename_stays_one_path_component():
+    assert safe_filename('LF-1001') == 'LF-1001'
+    assert safe_filename('../../etc/passwd') == 'etc-passwd'
+    assert safe_filename('..') == '_'
+    assert safe_filename('AB King Pizza') == 'AB-King-Pizza'
@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from print_server import PrintServer, _submit_line
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = PrintServer(output_dir=str(tmp_path), workers=1, verbose=False).start()
+    yield server
+    server.shutdown()
+
+
+def wait_for(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_prints_each_order_once(server, tmp_path, order_data):
+    assert server.submit(order_data)
+    assert not server.submit(dict(order_data))
+    server.shutdown()
+    
+    assert (tmp_path / 'kitchen_LF-1001.pdf').read_bytes().startswith(b'%PDF')
+    stats = server.stats()
+    assert (stats['received'], stats['rendered'], stats['duplicates']) == (2, 1, 1)
+
+
+def test_failed_order_prints_when_resent(server, tmp_path, order_data):
+    bad = dict(order_data, order_number='LF-BAD', items=[{'name': 'Pizza', 'price': 'twenty'}])
+    assert server.submit(bad)
+    wait_for(lambda: server.stats()['failed'] == 1)
+    
+    assert server.submit(dict(order_data, order_number='LF-BAD'))
+    server.shutdown()
+    
+    assert (tmp_path / 'kitchen_LF-BAD.pdf').exists()
+    stats = server.stats()
+    assert (stats['rendered'], stats['failed'], stats['duplicates']) == (1, 1, 0)
+
+
+def test_order_number_cannot_leave_output_dir(tmp_path, order_data):
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+    server = PrintServer(output_dir=str(output_dir), workers=1, verbose=False).start()
+    server.submit(dict(order_data, order_number='../../etc/LF-1'))
+    server.shutdown()
+    
+    assert [path.name for path in output_dir.iterdir()] == ['kitchen_etc-LF-1.pdf']
+    assert not (tmp_path / 'etc').exists()
+
+
+def test_bad_lines_are_counted_not_fatal(server, tmp_path, order_data):
+    lines = ['{"order_number": ["x"]}', '{"order_number": {"a": 1}}', 'not json', '[1, 2]']
+    assert [_submit_line(server, line) for line in lines] == ['queued', 'queued', 'invalid', 'invalid']
+    assert _submit_line(server, '{"order_number": ["x"]}') == 'duplicate'
+    
+    server.submit(dict(order_data))
+    server.shutdown()
+    stats = server.stats()
+    assert (stats['invalid'], stats['duplicates']) == (2, 1)
+    assert (tmp_path / 'kitchen_LF-1001.pdf').exists()
@@ -0,0 +1,141 @@
+import csv
+import io
+import os
+import sqlite3
+import tarfile
+import zipfile
+
+from receipt_archive import ReceiptArchive
+
+
+def make_order(number, restaurant='AB King Pizza', day=15):
+    return {'order_number': number, 'restaurant_name': restaurant, 'created_at': f'2025-03-{day:02d}T18:30:00',
+            'items': [], 'total': 10.0}
+
+
+def test_add_then_get_round_trips(tmp_path):
+    with ReceiptArchive(str(tmp_path)) as archive:
+        archive.add(make_order('LF-1'), b'%PDF customer')
+        archive.add(make_order('LF-1'), b'kitchen ticket', kind='kitchen', output_format='escpos')
+        
+        assert archive.get('LF-1') == b'%PDF customer'
+        assert archive.get('LF-1', 'kitchen') == b'kitchen ticket'
+        assert archive.get('LF-2') is None
+        assert archive.entry('LF-1', 'kitchen').name == 'AB-King-Pizza/2025-03-15/kitchen_LF-1.bin'
+        assert len(archive) == 2
+    
+    with ReceiptArchive(str(tmp_path)) as archive:
+        assert archive.get('LF-1') == b'%PDF customer'
+
+
+def test_reprint_replaces_the_index_entry(tmp_path):
+    with ReceiptArchive(str(tmp_path)) as archive:
+        archive.add(make_order('LF-1'), b'first')
+        archive.add(make_order('LF-1'), b'second copy')
+        
+        assert archive.get('LF-1') == b'second copy'
+        assert len(archive) == 1
+
+
+def test_find_by_restaurant_and_dates(tmp_path):
+    with ReceiptArchive(str(tmp_path)) as archive:
+        archive.add(make_order('LF-3', day=20), b'3')
+        archive.add(make_order('LF-1', day=1), b'1')
+        archive.add(make_order('LF-2', day=10), b'2')
+        archive.add(make_order('LF-9', 'Noodle Bar', day=10), b'9')
+        
+        def numbers(**filters):
+            return [entry.order_number for entry in archive.find(**filters)]
+        
+        assert numbers() == ['LF-1', 'LF-2', 'LF-9', 'LF-3']
+        assert numbers(restaurant='AB King Pizza') == ['LF-1', 'LF-2', 'LF-3']
+        assert numbers(start='2025-03-10', end='2025-03-10') == ['LF-2', 'LF-9']
+        assert numbers(end='2025-03-10T12:00:00') == ['LF-1']
+        assert numbers(kind='kitchen') == []
+
+
+def test_shards_roll_over_and_are_readable_tars(tmp_path):
+    with ReceiptArchive(str(tmp_path), max_shard_bytes=4096) as archive:
+        for number in range(6):
+            archive.add(make_order(f'LF-{number}'), bytes([number]) * 1500)
+        
+        assert archive.stats()['shards'] == 3
+        assert all(archive.get(f'LF-{number}') == bytes([number]) * 1500 for number in range(6))
+    
+    shards = sorted(name for name in os.listdir(tmp_path) if name.endswith('.tar'))
+    with tarfile.open(tmp_path / shards[0]) as tar:
+        assert tar.getnames() == ['AB-King-Pizza/2025-03-15/customer_LF-0.pdf',
+                                  'AB-King-Pizza/2025-03-15/customer_LF-1.pdf']
+
+
+def test_reopen_cuts_off_uncommitted_bytes(tmp_path):
+    archive = ReceiptArchive(str(tmp_path))
+    archive.add(make_order('LF-1'), b'kept')
+    shard = tmp_path / archive.entry('LF-1').shard
+    committed = archive.stats()['shard_bytes']
+    archive._file.write(b'torn write from a crash')
+    archive._file.close()
+    archive._file = None
+    archive._db.close()
+    
+    with ReceiptArchive(str(tmp_path)) as archive:
+        archive.add(make_order('LF-2'), b'after')
+        assert archive.get('LF-1') == b'kept'
+        assert archive.get('LF-2') == b'after'
+    assert b'torn write' not in shard.read_bytes()
+    assert shard.stat().st_size > committed
+
+
+def test_export_writes_matching_receipts_and_a_manifest(tmp_path):
+    output = io.BytesIO()
+    with ReceiptArchive(str(tmp_path / 'archive'), max_shard_bytes=2048) as archive:
+        archive.add(make_order('LF-1'), b'one')
+        archive.add(make_order('../LF 2', day=16), b'two' * 500)
+        archive.add(make_order('LF-3', 'Noodle Bar'), b'three')
+        
+        assert archive.export(output, restaurant='AB King Pizza') == 2
+    
+    with zipfile.ZipFile(output) as bundle:
+        assert sorted(bundle.namelist()) == ['AB-King-Pizza/2025-03-15/customer_LF-1.pdf',
+                                             'AB-King-Pizza/2025-03-16/customer_LF-2.pdf', 'manifest.csv']
+        assert bundle.read('AB-King-Pizza/2025-03-15/customer_LF-1.pdf') == b'one'
+        manifest = list(csv.DictReader(io.StringIO(bundle.read('manifest.csv').decode())))
+    assert [row['order_number'] for row in manifest] == ['LF-1', '../LF 2']
+
+
+def test_each_format_of_a_receipt_is_kept(tmp_path):
+    with ReceiptArchive(str(tmp_path)) as archive:
+        archive.add(make_order('LF-1'), b'%PDF ticket', kind='kitchen')
+        archive.add(make_order('LF-1'), b'escpos ticket', kind='kitchen', output_format='escpos')
+        
+        assert archive.get('LF-1', 'kitchen', 'pdf') == b'%PDF ticket'
+        assert archive.get('LF-1', 'kitchen', 'escpos') == b'escpos ticket'
+        assert archive.get('LF-1', 'kitchen') == b'escpos ticket'
+        assert archive.get('LF-1', 'kitchen', 'png') is None
+        assert len(archive) == 2
+
+
+def test_index_keyed_without_format_is_upgraded(tmp_path):
+    with ReceiptArchive(str(tmp_path)) as archive:
+        archive.add(make_order('LF-1'), b'%PDF customer')
+    db = sqlite3.connect(str(tmp_path / 'index.sqlite'))
+    with db:
+        # The index as it was before the format was part of the key
+        db.executescript("""
+            CREATE TABLE old (order_number TEXT NOT NULL, kind TEXT NOT NULL, restaurant TEXT NOT NULL,
+                              created_at TEXT NOT NULL, format TEXT NOT NULL, shard TEXT NOT NULL,
+                              offset INTEGER NOT NULL, size INTEGER NOT NULL, name TEXT NOT NULL,
+                              PRIMARY KEY (order_number, kind));
+            INSERT INTO old SELECT * FROM receipts;
+            DROP TABLE receipts;
+            ALTER TABLE old RENAME TO receipts;
+            CREATE INDEX receipts_by_restaurant ON receipts (restaurant, created_at);
+            CREATE INDEX receipts_by_date ON receipts (created_at);
+        """)
+    db.close()
+    
+    with ReceiptArchive(str(tmp_path)) as archive:
+        archive.add(make_order('LF-1'), b'escpos copy', output_format='escpos')
+        assert archive.get('LF-1', output_format='pdf') == b'%PDF customer'
+        assert archive.get('LF-1', output_format='escpos') == b'escpos copy'
+        assert [entry.restaurant for entry in archive.find(restaurant='AB King Pizza')] == ['AB King Pizza'] * 2
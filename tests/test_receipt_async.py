@@ -0,0 +1,118 @@
+import asyncio
+import threading
+
+import pytest
+
+from receipt_async import AsyncReceiptGenerator
+from receipt_generator import ReceiptGenerator
+
+
+class SlowGenerator(ReceiptGenerator):
+    """Customer receipts that block until released, counting how many run at once"""
+    
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+        self.running = self.peak = self.started = 0
+    
+    def generate_customer_receipt(self, order_data, output_path=None, **options):
+        with self.lock:
+            self.started += 1
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        self.release.wait(5)
+        with self.lock:
+            self.running -= 1
+        return order_data['order_number'].encode()
+
+
+def test_thread_executor_renders(order_data):
+    async def main():
+        async with AsyncReceiptGenerator(workers=2) as receipts:
+            pdf = await receipts.generate_customer_receipt(order_data)
+            return pdf, receipts.stats()
+    
+    pdf, stats = asyncio.run(main())
+    assert pdf.startswith(b'%PDF')
+    assert stats['rendered'] == 1 and stats['in_pool'] == 0
+
+
+def test_timeout_raises_and_is_counted(order_data):
+    generator = SlowGenerator()
+    
+    async def main():
+        async with AsyncReceiptGenerator(generator, workers=1, timeout=0.05) as receipts:
+            with pytest.raises(TimeoutError):
+                await receipts.generate_customer_receipt(order_data)
+            generator.release.set()
+            result = await receipts.generate_customer_receipt(order_data, timeout=None)
+            return result, receipts.stats()
+    
+    result, stats = asyncio.run(main())
+    assert result == b'LF-1001'
+    assert stats['timeouts'] == 1 and stats['rendered'] == 1
+
+
+def test_concurrency_cap_holds_and_cancelled_calls_never_run(order_data):
+    generator = SlowGenerator()
+    
+    async def main():
+        async with AsyncReceiptGenerator(generator, workers=4, max_concurrent=2) as receipts:
+            tasks = [asyncio.create_task(receipts.generate_customer_receipt(order_data)) for _ in range(5)]
+            await asyncio.sleep(0.1)
+            waiting = tasks[-1]
+            waiting.cancel()
+            await asyncio.sleep(0)
+            generator.release.set()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            return results, receipts.stats()
+    
+    results, stats = asyncio.run(main())
+    assert generator.peak == 2
+    assert isinstance(results[-1], asyncio.CancelledError)
+    assert results[:4] == [b'LF-1001'] * 4
+    assert generator.started == 4
+    assert stats['cancelled'] == 1 and stats['rendered'] == 4
+
+
+def test_cancelled_running_render_keeps_its_slot(order_data):
+    generator = SlowGenerator()
+    
+    async def main():
+        async with AsyncReceiptGenerator(generator, workers=2, max_concurrent=1) as receipts:
+            first = asyncio.create_task(receipts.generate_customer_receipt(order_data))
+            await asyncio.sleep(0.1)
+            first.cancel()
+            second = asyncio.create_task(receipts.generate_customer_receipt(order_data))
+            await asyncio.sleep(0.1)
+            started_while_held = generator.started
+            generator.release.set()
+            await second
+            return started_while_held
+    
+    assert asyncio.run(main()) == 1
+    assert generator.peak == 1
+
+
+def test_closed_generator_refuses_work(order_data):
+    async def main():
+        receipts = AsyncReceiptGenerator(workers=1)
+        await receipts.close()
+        with pytest.raises(RuntimeError):
+            await receipts.generate_customer_receipt(order_data)
+    
+    asyncio.run(main())
+
+
+def test_process_executor_replays_worker_metrics(order_data):
+    reported = []
+    generator = ReceiptGenerator(metrics=reported.append)
+    
+    async def main():
+        async with AsyncReceiptGenerator(generator, executor='process', workers=1) as receipts:
+            return await receipts.generate_kitchen_receipt(order_data, output_format='escpos')
+    
+    ticket = asyncio.run(main())
+    assert b'KITCHEN ORDER' in ticket
+    assert [metrics['kind'] for metrics in reported] == ['kitchen']
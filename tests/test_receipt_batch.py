@@ -0,0 +1,57 @@
+import os
+
+from receipt_archive import ReceiptArchive
+from receipt_benchmark import make_order
+from receipt_cache import ReceiptCache
+from receipt_generator import ReceiptGenerator
+
+
+def batch_orders(count):
+    return [dict(make_order(2), order_number=f'LF-{number}') for number in range(count)]
+
+
+def test_batch_writes_files_and_reports_bad_orders(tmp_path):
+    orders = batch_orders(3)
+    orders.insert(1, {'order_number': '../LF-bad', 'items': 'not a list'})
+    
+    results = list(ReceiptGenerator().generate_receipts_batch(orders, str(tmp_path), workers=2))
+    
+    assert [result.index for result in results] == [0, 1, 2, 3]
+    assert results[1].order_number == '../LF-bad'
+    assert results[1].error.startswith('OrderError: item is not a JSON object')
+    assert sorted(os.listdir(tmp_path)) == ['customer_LF-0.pdf', 'customer_LF-1.pdf', 'customer_LF-2.pdf']
+    assert all(result.output_path.startswith(str(tmp_path)) for result in results if not result.error)
+
+
+def test_batch_workers_report_to_the_parents_metrics_hook():
+    reported = []
+    generator = ReceiptGenerator(metrics=reported.append)
+    
+    results = list(generator.generate_receipts_batch(batch_orders(4), None, 'kitchen', workers=2,
+                                                     ordered=False))
+    
+    assert sorted(result.index for result in results) == [0, 1, 2, 3]
+    assert all(result.pdf.startswith(b'%PDF') for result in results)
+    assert sorted(metrics['order_number'] for metrics in reported) == ['LF-0', 'LF-1', 'LF-2', 'LF-3']
+
+
+def test_batch_workers_share_the_parents_receipt_cache_directory(tmp_path):
+    cache = ReceiptCache(directory=str(tmp_path / 'cache'))
+    generator = ReceiptGenerator(receipt_cache=cache)
+    orders = batch_orders(2)
+    
+    first = list(generator.generate_receipts_batch(orders, None, workers=2))
+    assert os.listdir(tmp_path / 'cache')
+    
+    assert generator.generate_customer_receipt(orders[1]) == first[1].pdf
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_batch_into_an_archive(tmp_path):
+    with ReceiptArchive(str(tmp_path / 'archive')) as archive:
+        results = list(ReceiptGenerator().generate_receipts_batch(batch_orders(3), None, workers=1,
+                                                                  archive=archive))
+        
+        assert all(result.pdf is None and result.output_path.endswith('.tar') for result in results)
+        assert archive.get('LF-2').startswith(b'%PDF')
+        assert len(archive) == 3
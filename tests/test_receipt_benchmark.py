@@ -0,0 +1,18 @@
+import receipt_benchmark
+from receipt_benchmark import compare, run_benchmark
+
+
+def test_benchmark_runs_one_scenario_and_compares(monkeypatch, capsys):
+    monkeypatch.setattr(receipt_benchmark, 'measure_startup', lambda: {})
+    run = run_benchmark(['typical_photos'], iterations=1, warmup=0)
+    
+    assert [(result['scenario'], result['kind']) for result in run['results']] == [
+        ('typical_photos', 'customer'), ('typical_photos', 'kitchen')]
+    for result in run['results']:
+        assert result['latency_ms']['p50'] > 0 and result['output_bytes'] > 0
+        assert 10 < result['peak_rss_mb'] < 4096
+    
+    capsys.readouterr()
+    compare(run, run)
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 3 and lines[1].startswith('typical_photos') and '+0.0%' in lines[1]
@@ -0,0 +1,126 @@
+import os
+import pickle
+
+import pytest
+
+import escpos
+import receipt_generator
+from receipt_cache import ReceiptCache, SizedLRU
+from receipt_generator import TEMPLATE_VERSION, ReceiptGenerator
+
+
+class FrozenClock(receipt_generator.datetime):
+    now_value = None
+    
+    @classmethod
+    def now(cls, tz=None):
+        return cls.now_value
+
+
+def test_status_fields_do_not_change_the_receipt(order_data):
+    generator = ReceiptGenerator(receipt_cache=ReceiptCache())
+    pdf = generator.generate_customer_receipt(order_data)
+    
+    assert generator.generate_customer_receipt(dict(order_data, status='printed', print_count=3)) == pdf
+    assert generator.receipt_cache.stats()['hits'] == 1
+
+
+def test_order_without_created_at_is_served_from_the_cache(order_data):
+    del order_data['created_at']
+    generator = ReceiptGenerator(receipt_cache=ReceiptCache())
+    
+    pdf = generator.generate_customer_receipt(order_data)
+    assert generator.generate_customer_receipt(order_data) == pdf
+    assert generator.receipt_cache.stats()['hits'] == 1
+
+
+def test_key_changes_with_order_kind_template_and_options(order_data):
+    cache = ReceiptCache()
+    key = cache.key('customer', order_data, TEMPLATE_VERSION)
+    assert cache.key('customer', dict(order_data, tip=7.00), TEMPLATE_VERSION) != key
+    assert cache.key('kitchen', order_data, TEMPLATE_VERSION) != key
+    assert cache.key('customer', order_data, TEMPLATE_VERSION + 1) != key
+    assert cache.key('customer', order_data, TEMPLATE_VERSION, compact=True) != key
+
+
+def test_key_changes_when_a_photo_is_edited(order_data, photos):
+    cache = ReceiptCache()
+    key = cache.key('customer', order_data, TEMPLATE_VERSION)
+    stat = os.stat(photos['owner'])
+    os.utime(photos['owner'], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.key('customer', order_data, TEMPLATE_VERSION) != key
+
+
+def test_reprint_is_served_from_cache(order_data):
+    cache = ReceiptCache()
+    generator = ReceiptGenerator(receipt_cache=cache)
+    first = generator.generate_customer_receipt(order_data)
+    assert generator.generate_customer_receipt(order_data) == first
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_disk_tier_survives_a_new_cache(order_data, tmp_path):
+    first = ReceiptGenerator(receipt_cache=ReceiptCache(directory=str(tmp_path)))
+    pdf = first.generate_customer_receipt(order_data)
+    
+    cache = ReceiptCache(directory=str(tmp_path))
+    assert ReceiptGenerator(receipt_cache=cache).generate_customer_receipt(order_data) == pdf
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_cached_kitchen_ticket_shows_the_time_it_is_printed(order_data, monkeypatch):
+    monkeypatch.setattr(receipt_generator, 'datetime', FrozenClock)
+    generator = ReceiptGenerator(receipt_cache=ReceiptCache())
+    
+    FrozenClock.now_value = FrozenClock(2026, 1, 15, 18, 31, 0)
+    first = escpos.strip_commands(generator.generate_kitchen_receipt(order_data, output_format='escpos'))
+    FrozenClock.now_value = FrozenClock(2026, 1, 15, 19, 45, 10)
+    reprint = escpos.strip_commands(generator.generate_kitchen_receipt(order_data, output_format='escpos'))
+    
+    assert generator.receipt_cache.stats()['hits'] == 1
+    assert 'Printed: 06:31:00 PM' in first
+    assert 'Printed: 07:45:10 PM' in reprint
+    assert reprint.replace('07:45:10', '06:31:00') == first
+
+
+@pytest.mark.parametrize('fast', [False, True])
+def test_cached_kitchen_pdf_shows_the_time_it_is_printed(order_data, monkeypatch, pdf_words, fast):
+    monkeypatch.setattr(receipt_generator, 'datetime', FrozenClock)
+    generator = ReceiptGenerator(receipt_cache=ReceiptCache())
+    
+    FrozenClock.now_value = FrozenClock(2026, 1, 15, 18, 31, 0)
+    first = generator.generate_kitchen_receipt(order_data, fast=fast)
+    FrozenClock.now_value = FrozenClock(2026, 1, 16, 9, 5, 10)
+    reprint = generator.generate_kitchen_receipt(order_data, fast=fast)
+    
+    assert generator.receipt_cache.stats()['hits'] == 1
+    assert b'Printed: 06:31:00 PM' in first
+    assert b'Printed: 09:05:10 AM' in reprint
+    assert reprint.replace(b'09:05:10 AM', b'06:31:00 PM') == first
+    uncached = ReceiptGenerator().generate_kitchen_receipt(order_data, fast=fast)
+    assert pdf_words(reprint) == pdf_words(uncached)
+
+
+def test_sized_lru_evicts_least_recently_used():
+    lru = SizedLRU(10)
+    lru.put('a', b'1234')
+    lru.put('b', b'1234')
+    assert lru.get('a') == b'1234'
+    lru.put('c', b'1234')
+    assert lru.get('b') is None
+    assert lru.get('a') and lru.get('c')
+    assert lru.stats()['evictions'] == 1
+    
+    lru.put('huge', b'x' * 11)
+    assert lru.get('huge') is None
+    assert lru.get('huge', lambda: b'made') == b'made'
+
+
+def test_caches_pickle_empty_with_the_same_settings(tmp_path):
+    cache = ReceiptCache(max_bytes=1000, directory=str(tmp_path))
+    cache.put('k' * 64, b'data')
+    copy = pickle.loads(pickle.dumps(cache))
+    assert copy.stats()['entries'] == 0
+    assert copy.directory == cache.directory
+    assert copy.get('k' * 64) == b'data'
@@ -0,0 +1,77 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import receipt_cli
+from receipt_benchmark import make_order, measure_startup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs receipt_cli in a fresh interpreter and reports which heavy modules got imported
+_PROBE = """
+import sys
+import receipt_cli
+try:
+    receipt_cli.main(sys.argv[1:])
+except SystemExit:
+    pass
+print(sorted({name.split('.')[0] for name in sys.modules} & {'reportlab', 'PIL', 'receipt_generator'}))
+"""
+
+
+@pytest.fixture
+def orders_file(tmp_path):
+    """Three orders as JSON Lines"""
+    path = tmp_path / 'orders.jsonl'
+    orders = [dict(make_order(2), order_number=f'LF-{number}') for number in (1, 2, 3)]
+    path.write_text(''.join(json.dumps(order) + '\n' for order in orders))
+    return path
+
+
+@pytest.mark.parametrize('path', ['help', 'check'])
+def test_light_paths_do_not_import_reportlab_or_pillow(orders_file, path):
+    argv = ['--help'] if path == 'help' else ['check', str(orders_file)]
+    probe = subprocess.run([sys.executable, '-c', _PROBE, *argv], cwd=ROOT, capture_output=True, text=True,
+                           check=True)
+    assert probe.stdout.splitlines()[-1] == '[]'
+
+
+def test_light_paths_stay_within_startup_budget():
+    results = measure_startup(runs=5)
+    for name in receipt_cli.STARTUP_BUDGET_MS:
+        assert results[name]['within_budget'], results[name]
+
+
+def test_check_reports_bad_orders(tmp_path, capsys):
+    path = tmp_path / 'order.json'
+    path.write_text(json.dumps(dict(make_order(2), total=1.0)))
+    
+    assert receipt_cli.main(['check', str(path)]) == 1
+    assert '❌' in capsys.readouterr().err
+
+
+def test_renders_each_order_to_a_pattern(orders_file, tmp_path):
+    pattern = str(tmp_path / 'out' / '{order_number}.bin')
+    
+    assert receipt_cli.main(['kitchen', str(orders_file), '--format', 'escpos', '-o', pattern]) == 0
+    assert sorted(os.listdir(tmp_path / 'out')) == ['LF-1.bin', 'LF-2.bin', 'LF-3.bin']
+    assert b'#LF-2' in (tmp_path / 'out' / 'LF-2.bin').read_bytes()
+
+
+def test_several_orders_need_a_pattern(orders_file, tmp_path):
+    with pytest.raises(SystemExit):
+        receipt_cli.main(['customer', str(orders_file), '-o', str(tmp_path / 'receipt.pdf')])
+
+
+@pytest.mark.parametrize('kind', ['customer', 'kitchen'])
+def test_combined_pdf_bookmarks_every_order(orders_file, tmp_path, kind):
+    output = tmp_path / 'backlog.pdf'
+    
+    assert receipt_cli.main([kind, str(orders_file), '--combined', '-o', str(output)]) == 0
+    pdf = output.read_bytes()
+    assert pdf.startswith(b'%PDF')
+    assert [f'/Title (Order #LF-{number})'.encode() in pdf for number in (1, 2, 3)] == [True] * 3
+    assert pdf.count(b'/Type /Page\n') >= 3
@@ -0,0 +1,139 @@
+from concurrent.futures import ThreadPoolExecutor
+import io
+import os
+import time
+
+import pytest
+from reportlab import rl_config
+
+from receipt_benchmark import make_order
+from receipt_generator import COMPACT_SIZE_TARGET, PhotoCache, ReceiptGenerator
+
+
+def test_pdf_streams_are_binary_without_changing_global_settings(order_data):
+    assert rl_config.useA85
+    pdf = ReceiptGenerator().generate_customer_receipt(order_data)
+    assert b'/ASCII85Decode' not in pdf
+    assert rl_config.useA85
+
+
+def test_compact_receipt_meets_its_size_target(order_data):
+    generator = ReceiptGenerator()
+    full = generator.generate_customer_receipt(order_data)
+    compact = generator.generate_customer_receipt(order_data, compact=True)
+    assert len(compact) <= COMPACT_SIZE_TARGET
+    assert len(compact) < len(full)
+
+
+def test_combined_pdf_embeds_each_photo_once(pdf_words, order_data):
+    orders = [dict(order_data, order_number=f'LF-{number}') for number in range(5)]
+    generator = ReceiptGenerator()
+    combined = generator.generate_combined_pdf(iter(orders))
+    
+    assert combined.count(b'/Subtype /Image') == 2
+    assert len(combined) < sum(len(generator.generate_customer_receipt(order)) for order in orders)
+    assert [f'/Title (Order #LF-{number})'.encode() in combined for number in range(5)] == [True] * 5
+    assert [word for word in pdf_words(combined) if word.startswith('#LF-')] == [f'#LF-{n}' for n in range(5)]
+
+
+def test_combined_pdf_metrics_time_the_build(order_data):
+    reported = []
+    generator = ReceiptGenerator(metrics=reported.append)
+    orders = [dict(order_data, order_number=f'LF-{number}') for number in range(3)]
+    generator.generate_combined_pdf(orders)
+    generator.generate_combined_pdf(orders, kind='kitchen')
+    
+    customer, kitchen = reported
+    assert (customer['kind'], customer['orders']) == ('combined_customer', 3)
+    assert {'build', 'images', 'tables'} <= set(customer['stages'])
+    assert customer['stages']['build'] > 0
+    assert sum(customer['stages'].values()) == pytest.approx(customer['total'])
+    assert 'build' in kitchen['stages']
+
+
+def test_combined_kitchen_pdf_has_a_ticket_sized_page_per_order(pdf_words, order_data):
+    orders = [dict(order_data, order_number=f'LF-{number}') for number in range(3)]
+    combined = ReceiptGenerator().generate_combined_pdf(orders, kind='kitchen')
+    
+    assert combined.count(b'/Type /Page\n') == 3
+    assert [word for word in pdf_words(combined) if word.startswith('#LF-')] == ['#LF-0', '#LF-1', '#LF-2']
+
+
+@pytest.mark.parametrize('kind', ['customer', 'kitchen'])
+def test_output_to_bytes_path_or_file_object(order_data, tmp_path, kind):
+    reported = []
+    generator = ReceiptGenerator(metrics=reported.append)
+    render = getattr(generator, f'generate_{kind}_receipt')
+    
+    pdf = render(order_data)
+    path = str(tmp_path / 'receipt.pdf')
+    assert render(order_data, path) == path
+    stream = io.BytesIO(b'prefix')
+    stream.seek(0, io.SEEK_END)
+    assert render(order_data, stream) is stream
+    
+    assert pdf.startswith(b'%PDF')
+    assert os.path.getsize(path) == len(pdf) == len(stream.getvalue()) - len(b'prefix')
+    assert [metrics['bytes'] for metrics in reported] == [len(pdf)] * 3
+
+
+def test_photos_are_decoded_once_until_edited(order_data, photos):
+    cache = PhotoCache()
+    generator = ReceiptGenerator(photo_cache=cache)
+    generator.generate_customer_receipt(order_data)
+    generator.generate_customer_receipt(dict(order_data, order_number='LF-1002'))
+    assert cache.stats()['misses'] == 2 and cache.stats()['hits'] == 2
+    
+    stat = os.stat(photos['driver'])
+    os.utime(photos['driver'], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    generator.generate_customer_receipt(order_data)
+    assert cache.stats()['misses'] == 3
+
+
+def test_missing_photo_still_renders(order_data):
+    order_data['driver'] = dict(order_data['driver'], image='/no/such/photo.jpg')
+    cache = PhotoCache()
+    pdf = ReceiptGenerator(photo_cache=cache).generate_customer_receipt(order_data)
+    
+    assert pdf.count(b'/Subtype /Image') == 1
+    assert cache.get('/no/such/photo.jpg', 100) is None
+
+
+def test_static_flowables_are_shared_per_thread():
+    generator = ReceiptGenerator()
+    static = generator._static_flowables()
+    assert ReceiptGenerator()._static_flowables() is static
+    assert generator._static_flowables(compact=True) is not static
+    
+    with ThreadPoolExecutor(1) as pool:
+        assert pool.submit(generator._static_flowables).result() is not static
+
+
+def test_reused_flowables_survive_a_multi_page_receipt(pdf_words, order_data):
+    generator = ReceiptGenerator()
+    small = pdf_words(generator.generate_customer_receipt(order_data))
+    generator.generate_customer_receipt(make_order(150))
+    
+    assert pdf_words(generator.generate_customer_receipt(order_data)) == small
+
+
+def test_threads_render_the_same_receipts(pdf_words, order_data):
+    generator = ReceiptGenerator()
+    orders = [dict(order_data, order_number=f'LF-{number}') for number in range(8)]
+    expected = [pdf_words(generator.generate_customer_receipt(order)) for order in orders]
+    
+    with ThreadPoolExecutor(4) as pool:
+        assert [pdf_words(pdf) for pdf in pool.map(generator.generate_customer_receipt, orders)] == expected
+
+
+def test_styles_are_published_only_once_complete():
+    class SlowStyles(ReceiptGenerator):
+        def _create_custom_styles(self, styles):
+            time.sleep(0.05)
+            super()._create_custom_styles(styles)
+    
+    generator = SlowStyles()
+    with ThreadPoolExecutor(4) as pool:
+        titles = list(pool.map(lambda _: generator.styles['ReceiptTitle'], range(4)))
+    assert all(title is titles[0] for title in titles)
+    assert SlowStyles().styles is generator.styles
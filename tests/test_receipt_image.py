@@ -0,0 +1,63 @@
+import io
+
+import pytest
+from PIL import Image
+
+from receipt_generator import CARD_IMAGE_WIDTH, IMAGE_WIDTH, ReceiptGenerator
+from receipt_image import ImageReceiptBuilder, RegionCache, encode
+
+
+@pytest.mark.parametrize('output_format, image_format', [('png', 'PNG'), ('jpeg', 'JPEG')])
+def test_customer_receipt_as_image(order_data, output_format, image_format):
+    data = ReceiptGenerator().generate_customer_receipt(order_data, output_format=output_format)
+    
+    image = Image.open(io.BytesIO(data))
+    assert image.format == image_format
+    assert image.width == IMAGE_WIDTH and image.height > image.width
+
+
+def test_image_width_and_order_card(order_data, tmp_path):
+    generator = ReceiptGenerator()
+    narrow = generator.generate_customer_receipt(order_data, output_format='png', width=360)
+    path = generator.generate_order_card(order_data, str(tmp_path / 'card.png'))
+    
+    assert Image.open(io.BytesIO(narrow)).width == 360
+    with Image.open(path) as card:
+        assert card.format == 'PNG' and card.width == CARD_IMAGE_WIDTH
+
+
+def test_unknown_image_format_is_refused(order_data):
+    with pytest.raises(ValueError):
+        ReceiptGenerator().generate_order_card(order_data, output_format='gif')
+
+
+def test_owner_and_driver_cards_are_drawn_once(order_data):
+    regions = RegionCache()
+    generator = ReceiptGenerator(region_cache=regions)
+    first = generator.generate_customer_receipt(order_data, output_format='png')
+    drawn = regions.stats()['misses']
+    assert drawn
+    
+    assert generator.generate_customer_receipt(order_data, output_format='png') == first
+    assert regions.stats()['misses'] == drawn
+    assert regions.stats()['hits'] >= drawn
+
+
+def test_builder_sizes_the_image_to_its_blocks():
+    builder = ImageReceiptBuilder(300, margin=10)
+    builder.text('Order #LF-1001', size=16, bold=True, align='center')
+    builder.rule()
+    builder.text('A line long enough that it has to wrap onto a second line at this width')
+    height = builder.image(trim=True).height
+    
+    assert builder.image().size == (300, height + 2 * builder.margin)
+    assert Image.open(io.BytesIO(builder.getvalue())).mode == 'P'
+
+
+def test_png_keeps_exact_black_and_white():
+    image = Image.new('RGB', (40, 20), '#ffffff')
+    image.paste((0, 0, 0), (0, 0, 20, 20))
+    
+    decoded = Image.open(io.BytesIO(encode(image))).convert('RGB')
+    assert decoded.getpixel((5, 5)) == (0, 0, 0)
+    assert decoded.getpixel((30, 5)) == (255, 255, 255)
@@ -0,0 +1,17 @@
+import itertools
+
+from receipt_loadtest import run_load_test, synthesize_orders
+
+
+def test_synthesized_orders_are_endless_without_a_count():
+    orders = list(itertools.islice(synthesize_orders(seed=1), 500))
+    assert len({order['order_number'] for order in orders}) == 500
+    assert len(list(synthesize_orders(3, seed=1))) == 3
+
+
+def test_run_covers_the_whole_duration():
+    report = run_load_test(synthesize_orders(seed=2), rate=20, duration=1.0, sample_interval=0.5, seed=2)
+    assert report['fed_s'] >= 1.0
+    assert report['orders']['submitted'] > 5
+    assert report['orders']['rendered'] == report['orders']['submitted']
+    assert report['sinks']['printer_jobs'] == report['orders']['rendered']
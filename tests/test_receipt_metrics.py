@@ -0,0 +1,87 @@
+import io
+import json
+import time
+import urllib.request
+
+import pytest
+
+from receipt_generator import ReceiptGenerator
+from receipt_metrics import JsonLinesExporter, PrometheusExporter, StageTimer, serve_metrics
+
+
+def test_stage_timer_accumulates_stages_and_counts_the_rest_as_story():
+    timer = StageTimer()
+    for _ in range(2):
+        with timer.stage('build'):
+            time.sleep(0.01)
+    report = timer.report(kind='customer', pages=1)
+    
+    assert report['kind'] == 'customer' and report['pages'] == 1
+    assert list(report['stages']) == ['story', 'build']
+    assert report['stages']['build'] >= 0.02
+    assert sum(report['stages'].values()) == pytest.approx(report['total'])
+
+
+def test_nested_stages_count_only_for_the_innermost():
+    timer = StageTimer()
+    with timer.stage('build'):
+        time.sleep(0.02)
+        with timer.stage('tables'):
+            time.sleep(0.03)
+        with timer.stage('images'):
+            time.sleep(0.01)
+    stages = timer.report()['stages']
+    
+    assert 0.02 <= stages['build'] < 0.05  # Not the 0.06s it spans
+    assert stages['tables'] >= 0.03 and stages['images'] >= 0.01
+    assert sum(stages.values()) == pytest.approx(timer.report()['total'], abs=0.005)
+
+
+def test_generator_reports_every_render(order_data):
+    reported = []
+    ReceiptGenerator(metrics=reported.append).generate_customer_receipt(order_data)
+    
+    [metrics] = reported
+    assert metrics['kind'] == 'customer' and metrics['order_number'] == 'LF-1001'
+    assert metrics['pages'] >= 1 and metrics['bytes'] > 0
+    assert set(metrics['stages']) <= {'images', 'story', 'tables', 'build'}
+
+
+def test_json_lines_exporter_writes_one_object_per_render():
+    stream = io.StringIO()
+    exporter = JsonLinesExporter(stream)
+    exporter({'kind': 'kitchen', 'total': 0.01})
+    exporter({'kind': 'customer', 'total': 0.02})
+    
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line['kind'] for line in lines] == ['kitchen', 'customer']
+    assert all('time' in line for line in lines)
+
+
+def test_prometheus_exporter_counts_and_buckets_renders():
+    exporter = PrometheusExporter(prefix='test')
+    exporter({'kind': 'kitchen', 'pages': 1, 'bytes': 100, 'total': 0.003, 'stages': {'build': 0.002}})
+    exporter({'kind': 'kitchen', 'pages': 2, 'bytes': 300, 'total': 0.2, 'stages': {'build': 0.15}})
+    exporter.gauge('queue_depth', 4, 'Orders waiting')
+    
+    text = exporter.render()
+    assert 'test_renders_total{kind="kitchen"} 2' in text
+    assert 'test_pages_total{kind="kitchen"} 3' in text
+    assert 'test_bytes_total{kind="kitchen"} 400' in text
+    assert 'test_seconds_bucket{kind="kitchen",stage="total",le="0.005"} 1' in text
+    assert 'test_seconds_bucket{kind="kitchen",stage="total",le="+Inf"} 2' in text
+    assert 'test_seconds_count{kind="kitchen",stage="build"} 2' in text
+    assert 'test_queue_depth 4' in text
+
+
+def test_serve_metrics_exposes_the_exporter():
+    exporter = PrometheusExporter()
+    exporter({'kind': 'customer', 'total': 0.01})
+    server = serve_metrics(exporter, 0, host='127.0.0.1')
+    try:
+        url = f'http://127.0.0.1:{server.server_address[1]}/metrics'
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert 'localfirst_receipt_renders_total{kind="customer"} 1' in response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,41 @@
+from receipt_generator import ReceiptGenerator
+
+
+def day_orders(order_data, days=(15,), per_day=3):
+    for day in days:
+        for number in range(per_day):
+            yield dict(order_data, order_number=f'LF-{day}{number:02d}', created_at=f'2026-01-{day}T18:30:00',
+                       payment_method='cash' if number == 0 else 'visa')
+
+
+def test_statement_totals_every_order(pdf_words, order_data):
+    words = ' '.join(pdf_words(ReceiptGenerator().generate_statement(day_orders(order_data), period='Jan 15')))
+    
+    assert 'Statement: AB King Pizza' in words and 'Jan 15' in words
+    assert all(f'LF-15{number:02d}' in words for number in range(3))
+    assert 'TOTAL 3 $168.78' in words
+    assert 'Cash on delivery 1 $56.26' in words
+    assert 'Paid online 2 $112.52' in words
+    assert 'BY DAY' not in words
+
+
+def test_statement_reads_orders_once_and_adds_a_day_breakdown(pdf_words, order_data):
+    read = []
+    
+    def orders():
+        for order in day_orders(order_data, days=(15, 16, 17), per_day=150):
+            read.append(order['order_number'])
+            yield order
+    
+    words = ' '.join(pdf_words(ReceiptGenerator().generate_statement(orders())))
+    assert len(read) == len(set(read)) == 450
+    assert 'TOTAL 450' in words
+    assert 'BY DAY' in words and 'Sat Jan 17, 2026 150' in words
+    assert 'Page 2' in words
+
+
+def test_empty_statement(pdf_words):
+    words = ' '.join(pdf_words(ReceiptGenerator().generate_statement([], restaurant_name='AB King Pizza')))
+    
+    assert 'No orders in this period.' in words
+    assert 'TOTAL 0 $0.00' in words
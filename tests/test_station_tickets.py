@@ -0,0 +1,69 @@
+import pytest
+
+from order_model import as_order
+from receipt_generator import ReceiptGenerator, group_by_station
+
+STATIONS = {'pizza': 'oven', 'sides': 'fryer', 'COKE': 'fridge'}
+
+
+def test_group_by_station_matches_names_before_categories(order_data):
+    order_data['items'][2]['category'] = 'sides'
+    groups = group_by_station(as_order(order_data).items, STATIONS)
+    
+    assert list(groups) == ['oven', 'fryer', 'fridge']
+    assert [item.name for item in groups['fryer']] == ['Garlic Bread']
+    assert [item.name for item in groups['fridge']] == ['Coke']
+
+
+def test_group_by_station_sends_unknown_items_to_the_default(order_data):
+    groups = group_by_station(as_order(order_data).items, {'Pizza': 'oven'}, default_station='pass')
+    
+    assert list(groups) == ['oven', 'pass']
+    assert [item.name for item in groups['pass']] == ['Garlic Bread', 'Coke']
+
+
+@pytest.mark.parametrize('fast', [False, True])
+def test_each_station_ticket_lists_its_items_and_the_other_stations(pdf_words, order_data, fast):
+    tickets = ReceiptGenerator().generate_station_tickets(order_data, STATIONS, fast=fast)
+    
+    assert list(tickets) == ['oven', 'fryer', 'fridge']
+    oven = ' '.join(pdf_words(tickets['oven']))
+    assert 'OVEN ITEMS (1 of 3):' in oven
+    assert 'Also at: FRYER, FRIDGE' in oven
+    assert 'PEPPERONI' in oven and 'GARLIC' not in oven
+    assert 'GARLIC' in ' '.join(pdf_words(tickets['fryer']))
+
+
+def test_single_station_ticket_has_no_station_heading(pdf_words, order_data):
+    tickets = ReceiptGenerator().generate_station_tickets(order_data, {})
+    
+    words = ' '.join(pdf_words(tickets['kitchen']))
+    assert 'ITEMS (' not in words and 'Also at' not in words
+    assert all(name in words for name in ('PEPPERONI', 'GARLIC', 'COKE'))
+
+
+def test_escpos_station_tickets(order_data):
+    tickets = ReceiptGenerator().generate_station_tickets(order_data, STATIONS, output_format='escpos')
+    
+    assert b'FRIDGE ITEMS (3 of 3):' in tickets['fridge']
+    assert b'Also at: OVEN, FRYER' in tickets['fridge']
+    assert b'COKE' in tickets['fridge'] and b'PEPPERONI' not in tickets['fridge']
+
+
+def test_station_tickets_written_from_a_path_pattern(order_data, tmp_path):
+    order_data['order_number'] = '../../LF 1001'
+    pattern = str(tmp_path / 'tickets' / '{order_number}-{station}.pdf')
+    (tmp_path / 'tickets').mkdir()
+    tickets = ReceiptGenerator().generate_station_tickets(order_data, {'pizza': 'Pizza Oven'}, pattern)
+    
+    assert sorted(p.name for p in (tmp_path / 'tickets').iterdir()) == ['LF-1001-Pizza-Oven.pdf', 'LF-1001-kitchen.pdf']
+    assert all(path.startswith(str(tmp_path)) for path in tickets.values())
+
+
+@pytest.mark.parametrize('output_path', ['tickets.pdf', {'oven': 'oven.pdf'}])
+def test_station_tickets_need_an_output_per_station(order_data, tmp_path, monkeypatch, output_path):
+    (tmp_path / 'tickets').mkdir()
+    monkeypatch.chdir(tmp_path / 'tickets')
+    with pytest.raises(ValueError):
+        ReceiptGenerator().generate_station_tickets(order_data, STATIONS, output_path)
+    assert not list((tmp_path / 'tickets').iterdir())